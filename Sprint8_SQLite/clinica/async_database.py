@@ -0,0 +1,197 @@
+"""
+Módulo de Base de Datos Asíncrona para la Clínica Veterinaria "Amigos Peludos"
+
+Este módulo implementa la clase AsyncDatabase, una fachada asyncio sobre Database
+para poder usar la persistencia de la clínica desde un servicio asíncrono sin
+bloquear el bucle de eventos.
+
+Funcionamiento:
+- Todas las llamadas a SQLite se ejecutan en un único hilo dedicado, que es el
+  dueño de la conexión (SQLite no permite usar una conexión desde varios hilos)
+- Cada método de Database tiene su equivalente awaitable con el mismo nombre
+  y los mismos argumentos
+- Un semáforo limita las peticiones pendientes para no acumular trabajo sin límite
+- Los listados grandes se recorren con async for página a página
+
+Uso:
+    async with await AsyncDatabase.open("clinica_veterinaria.db") as db:
+        pet = await db.get_pet_by_name("Rex")
+        async for row in db.iter_pets():
+            ...
+"""
+
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from database import DEFAULT_PAGE_SIZE, MAINTENANCE_METHODS, READ_METHODS, WRITE_METHODS, Database
+
+# Peticiones que pueden estar en curso o en cola a la vez por defecto
+DEFAULT_MAX_CONCURRENCY = 64
+
+# Métodos de Database que se exponen como corrutinas con el mismo nombre
+_OFFLOADED_METHODS = WRITE_METHODS + READ_METHODS + MAINTENANCE_METHODS
+
+
+class AsyncDatabase:
+    def __init__(self, executor, db, max_concurrency):
+        """
+        Inicializa la fachada sobre una base de datos ya abierta.
+        Normalmente no se llama directamente: se usa AsyncDatabase.open().
+
+        Args:
+            executor (ThreadPoolExecutor): Ejecutor de un solo hilo dueño de la conexión
+            db (Database): Base de datos creada dentro de ese hilo
+            max_concurrency (int): Máximo de peticiones en curso o en cola
+        """
+        self._executor = executor
+        self._db = db
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @classmethod
+    async def open(cls, db_name="clinica_veterinaria.db", max_concurrency=DEFAULT_MAX_CONCURRENCY, **options):
+        """
+        Abre la base de datos en un hilo dedicado sin bloquear el bucle de eventos.
+
+        Args:
+            db_name (str): Nombre del archivo de base de datos SQLite
+            max_concurrency (int): Máximo de peticiones en curso o en cola
+            **options: Argumentos adicionales para Database (profile, slow_query_ms...)
+
+        Returns:
+            AsyncDatabase: Fachada lista para usar
+        """
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="clinica-db")
+        loop = asyncio.get_running_loop()
+        try:
+            db = await loop.run_in_executor(executor, functools.partial(Database, db_name, **options))
+        except Exception:
+            executor.shutdown(wait=False)
+            raise
+        logging.info(f"Base de datos asíncrona abierta: {db_name}")
+        return cls(executor, db, max_concurrency)
+
+    async def __aenter__(self):
+        """
+        Permite usar la fachada como gestor de contexto asíncrono.
+
+        Returns:
+            AsyncDatabase: La propia instancia
+        """
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        """
+        Cierra la conexión y el hilo al salir del bloque async with.
+        """
+        await self.close()
+        return False
+
+    async def _run(self, func, *args, **kwargs):
+        """
+        Ejecuta una función en el hilo de la base de datos y espera su resultado.
+
+        Args:
+            func (callable): Función a ejecutar
+            *args: Argumentos posicionales
+            **kwargs: Argumentos con nombre
+
+        Returns:
+            object: Resultado de la función
+        """
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def run_transaction(self, func, *args, **kwargs):
+        """
+        Ejecuta varias operaciones como una unidad de trabajo.
+        La función recibe la Database síncrona y se ejecuta completa en el hilo
+        de la base de datos dentro de db.transaction().
+
+        Args:
+            func (callable): Función que recibe la Database como primer argumento
+            *args: Argumentos posicionales adicionales
+            **kwargs: Argumentos con nombre adicionales
+
+        Returns:
+            object: Resultado de la función
+        """
+        def run():
+            with self._db.transaction():
+                return func(self._db, *args, **kwargs)
+
+        return await self._run(run)
+
+    async def iter_pets(self, batch_size=DEFAULT_PAGE_SIZE, **filters):
+        """
+        Recorre las mascotas con la información de sus dueños página a página.
+        Entre páginas se devuelve el control al bucle de eventos.
+
+        Args:
+            batch_size (int): Mascotas leídas por página
+            **filters: Filtros de Database.get_pets_page (species, owner_id)
+
+        Yields:
+            tuple: Cada mascota con el formato de fila de get_all_pets
+        """
+        after_id = 0
+        while True:
+            page = await self.get_pets_page(after_id, batch_size, **filters)
+            for row in page:
+                yield row
+            if len(page) < batch_size:
+                break
+            after_id = page[-1][0]
+
+    async def iter_consultations(self, batch_size=DEFAULT_PAGE_SIZE, **filters):
+        """
+        Recorre las consultas página a página.
+
+        Args:
+            batch_size (int): Consultas leídas por página
+            **filters: Filtros de Database.get_consultations_page (pet_id)
+
+        Yields:
+            tuple: Cada consulta
+        """
+        after_id = 0
+        while True:
+            page = await self.get_consultations_page(after_id, batch_size, **filters)
+            for row in page:
+                yield row
+            if len(page) < batch_size:
+                break
+            after_id = page[-1][0]
+
+    async def close(self):
+        """
+        Cierra la conexión en su hilo y libera el ejecutor.
+        """
+        await self._run(self._db.close)
+        self._executor.shutdown(wait=False)
+        logging.info("Base de datos asíncrona cerrada")
+
+
+def _offload(name):
+    """
+    Crea la corrutina que ejecuta Database.<name> en el hilo de la base de datos.
+
+    Args:
+        name (str): Nombre del método de Database
+
+    Returns:
+        function: Corrutina con el mismo nombre y argumentos
+    """
+    async def method(self, *args, **kwargs):
+        return await self._run(getattr(self._db, name), *args, **kwargs)
+
+    method.__name__ = name
+    method.__qualname__ = f"AsyncDatabase.{name}"
+    method.__doc__ = f"Versión asíncrona de Database.{name}."
+    return method
+
+
+for _name in _OFFLOADED_METHODS:
+    setattr(AsyncDatabase, _name, _offload(_name))
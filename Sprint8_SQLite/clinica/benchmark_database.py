@@ -0,0 +1,76 @@
+"""
+Banco de Pruebas de Rendimiento de la Base de Datos de la Clínica Veterinaria
+
+Este módulo compara el rendimiento de los perfiles de SQLite definidos en
+database.PROFILES. Para cada perfil crea una base de datos temporal y mide:
+
+- Escrituras: altas individuales de dueños y mascotas, cada una con su propio commit
+- Lecturas: búsquedas de mascotas por nombre sobre los datos insertados
+
+Uso:
+    python benchmark_database.py [--writes N] [--reads N] [--profiles default performance]
+
+Los resultados se muestran como operaciones por segundo para cada perfil.
+"""
+
+import argparse
+import logging
+import os
+import random
+import tempfile
+import time
+
+from database import PROFILES, Database
+
+
+def run_benchmark(profile, writes, reads):
+    """
+    Ejecuta las mediciones de escritura y lectura para un perfil.
+
+    Args:
+        profile (str): Nombre del perfil a medir
+        writes (int): Número de mascotas a dar de alta
+        reads (int): Número de búsquedas por nombre
+
+    Returns:
+        tuple: (escrituras por segundo, lecturas por segundo)
+    """
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with Database(os.path.join(tmpdir, "benchmark.db"), profile=profile) as db:
+            start = time.perf_counter()
+            for i in range(writes):
+                owner_id = db.add_owner(f"Dueno {i}", "600000000", "Calle Mayor")
+                db.add_pet(f"Mascota {i}", "Perro", "Mestizo", i % 15, owner_id)
+            write_elapsed = time.perf_counter() - start
+
+            names = [f"Mascota {random.randrange(writes)}" for _ in range(reads)]
+            start = time.perf_counter()
+            for name in names:
+                db.get_pet_by_name(name)
+            read_elapsed = time.perf_counter() - start
+
+    # Cada alta de mascota incluye dos sentencias INSERT con su commit
+    return 2 * writes / write_elapsed, reads / read_elapsed
+
+
+def main():
+    """
+    Función principal que ejecuta el banco de pruebas y muestra los resultados.
+    """
+    parser = argparse.ArgumentParser(description="Compara los perfiles de rendimiento de SQLite")
+    parser.add_argument("--writes", type=int, default=1000, help="Altas de mascotas por perfil")
+    parser.add_argument("--reads", type=int, default=20000, help="Búsquedas por nombre por perfil")
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES), choices=list(PROFILES))
+    args = parser.parse_args()
+
+    # Evitar que el log de cada operación distorsione las mediciones
+    logging.disable(logging.INFO)
+
+    print(f"{'Perfil':<14}{'Escrituras/s':>14}{'Lecturas/s':>14}")
+    for profile in args.profiles:
+        writes_per_sec, reads_per_sec = run_benchmark(profile, args.writes, args.reads)
+        print(f"{profile:<14}{writes_per_sec:>14.0f}{reads_per_sec:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,7 +10,14 @@ Características implementadas:
 - Validación de datos de entrada
 - Manejo de excepciones y logging
 - Integración con base de datos SQLite
-- Mantenimiento de datos en memoria para mejor rendimiento
+- Mantenimiento de datos en memoria para mejor rendimiento, con índices por
+  ID y por nombre que evitan recorrer las listas en cada búsqueda
+- Historial de consultas cargado bajo demanda por mascota y guardado en una
+  caché LRU de tamaño limitado, con contadores de aciertos y fallos
+- Lecturas servidas desde memoria; las escrituras van a la base de datos y,
+  confirmadas, se reflejan en memoria. Si otra conexión modifica la base de
+  datos (PRAGMA data_version), los datos en memoria se recargan
+- Listados escritos por lotes con Renderer (texto, tabla, CSV o JSONL)
 
 Estructura de clases:
 - Clinic: Clase principal que gestiona todas las operaciones
@@ -25,12 +32,14 @@ import json
 import logging
 import os
 import re
+from collections import OrderedDict
 from datetime import datetime
 
 from consultation import Consultation
 from owner import Owner
 from pet import Pet
-from database import Database
+from database import DATE_FORMAT, Database
+from render import Column, Renderer
 
 logging.basicConfig(
     level=logging.INFO,
@@ -38,24 +47,228 @@ logging.basicConfig(
     handlers=[logging.FileHandler("veterinary_clinic.log"), logging.StreamHandler()],
 )
 
+# Mascotas cuyo historial de consultas se mantiene en memoria por defecto
+DEFAULT_CONSULTATION_CACHE_SIZE = 256
+
+# Columnas de los listados de mascotas y de consultas
+PET_COLUMNS = (
+    Column("id", "ID", lambda pet: pet.id),
+    Column("name", "Nombre", lambda pet: pet.name),
+    Column("species", "Especie", lambda pet: pet.species),
+    Column("breed", "Raza", lambda pet: pet.breed),
+    Column("age", "Edad", lambda pet: pet.age),
+    Column("owner_name", "Dueño", lambda pet: pet.owner.name),
+    Column("phone", "Teléfono del dueño", lambda pet: pet.owner.phone),
+    Column("address", "Dirección del dueño", lambda pet: pet.owner.address),
+)
+CONSULTATION_COLUMNS = (
+    Column("date", "Fecha", lambda consultation: consultation.date.strftime(DATE_FORMAT)),
+    Column("reason", "Motivo", lambda consultation: consultation.reason),
+    Column("diagnosis", "Diagnóstico", lambda consultation: consultation.diagnosis),
+)
+
 
 class Clinic:
-    def __init__(self):
+    def __init__(self, db=None, consultation_cache_size=DEFAULT_CONSULTATION_CACHE_SIZE):
         """
         Inicializa el sistema de la clínica.
-        Crea las estructuras de datos necesarias y carga la información desde la base de datos.
+        Crea las estructuras de datos necesarias y carga dueños y mascotas desde la
+        base de datos. Las consultas no se cargan al arrancar: el historial de cada
+        mascota se lee la primera vez que se necesita.
+        
+        Args:
+            db (Database, optional): Base de datos ya abierta para compartir su conexión.
+                Si no se indica, se crea una nueva.
+            consultation_cache_size (int): Máximo de mascotas cuyo historial se
+                mantiene en memoria; al superarlo se descarta el menos usado
+                
+        Raises:
+            ValueError: Si la base de datos no devuelve registros con nombre
         """
+        if db is not None and db.row_mode != "record":
+            raise ValueError("La clínica necesita una base de datos con row_mode='record'")
         self.owners = []
         self.pets = []
         self.consultations = []
-        self.db = Database()
+        # Índices en memoria; se actualizan junto con las listas en cada alta y baja
+        self._owners_by_id = {}
+        self._owners_by_name = {}
+        self._owners_by_key = {}  # (nombre, teléfono): la misma clave única que en la base de datos
+        self._pets_by_id = {}
+        self._pets_by_name = {}
+        # Historial por mascota (pet_id -> consultas), del menos al más usado
+        self._consultation_cache = OrderedDict()
+        self.consultation_cache_size = consultation_cache_size
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._data_version = None  # Versión de la base de datos cargada en memoria
+        self.db = db if db is not None else Database()
         logging.info("Sistema de clínica inicializado")
         self.load_pets_and_owners()
-        self.load_consultations()
+
+    def close(self):
+        """
+        Cierra la conexión con la base de datos de la clínica.
+        """
+        logging.info(
+            f"Caché de consultas: {self.cache_hits} aciertos, {self.cache_misses} fallos, "
+            f"{len(self._consultation_cache)} mascotas en memoria"
+        )
+        self.db.close()
+        logging.info("Sistema de clínica cerrado")
+
+    def _index_owner(self, owner):
+        """
+        Registra un dueño en la lista y en los índices en memoria.
+        
+        Args:
+            owner (Owner): Dueño con su ID asignado
+        """
+        self.owners.append(owner)
+        self._owners_by_id[owner.id] = owner
+        self._owners_by_name.setdefault(owner.name, []).append(owner)
+        self._owners_by_key[(owner.name, owner.phone)] = owner
+
+    def _index_pet(self, pet):
+        """
+        Registra una mascota en la lista y en los índices en memoria.
+        
+        Args:
+            pet (Pet): Mascota con su ID asignado
+        """
+        self.pets.append(pet)
+        self._pets_by_id[pet.id] = pet
+        self._pets_by_name.setdefault(pet.name, []).append(pet)
+
+    def _index_consultation(self, consultation):
+        """
+        Añade una consulta nueva al historial de su mascota si está en la caché.
+        No se guarda en self.consultations, para que una carga masiva no
+        acumule en memoria todas las consultas registradas.
+        
+        Args:
+            consultation (Consultation): Consulta con su ID y su pet_id asignados
+        """
+        history = self._consultation_cache.get(consultation.pet_id)
+        if history is not None:
+            history.append(consultation)
+            history.sort(key=lambda c: (c.date, c.id))
+
+    def _unindex_pets(self, pet_ids):
+        """
+        Quita de la memoria varias mascotas y sus consultas.
+        Las listas se filtran una sola vez para todo el grupo.
+        
+        Args:
+            pet_ids (set): IDs de las mascotas eliminadas
+        """
+        for pet_id in pet_ids:
+            pet = self._pets_by_id.pop(pet_id, None)
+            if pet is None:
+                continue
+            same_name = self._pets_by_name.get(pet.name, [])
+            same_name.remove(pet)
+            if not same_name:
+                del self._pets_by_name[pet.name]
+            self._consultation_cache.pop(pet_id, None)
+        self.pets = [pet for pet in self.pets if pet.id not in pet_ids]
+        self.consultations = [c for c in self.consultations if c.pet_id not in pet_ids]
+
+    def refresh(self, force=False):
+        """
+        Recarga dueños y mascotas si otra conexión ha modificado la base de datos
+        desde la última carga. Comprobarlo cuesta una sola sentencia PRAGMA.
+        
+        Args:
+            force (bool): Recargar aunque la versión no haya cambiado
+            
+        Returns:
+            bool: True si se han recargado los datos
+        """
+        if not force and self.db.data_version() == self._data_version:
+            return False
+        logging.info("La base de datos ha cambiado: recargando los datos en memoria")
+        self.load_pets_and_owners()
+        return True
+
+    def find_owner(self, name, phone=None):
+        """
+        Busca un dueño en memoria por su nombre o, si se indica el teléfono,
+        por su clave única (nombre, teléfono).
+        
+        Args:
+            name (str): Nombre del dueño
+            phone (str, optional): Teléfono del dueño
+            
+        Returns:
+            Owner: Dueño con ese nombre y teléfono, o el primero con ese nombre
+            si no se indica teléfono; None si no existe
+        """
+        if phone is not None:
+            return self._owners_by_key.get((name, phone))
+        owners = self._owners_by_name.get(name)
+        return owners[0] if owners else None
+
+    def find_pet(self, name):
+        """
+        Busca una mascota en memoria por su nombre.
+        
+        Args:
+            name (str): Nombre de la mascota
+            
+        Returns:
+            Pet: Primera mascota registrada con ese nombre o None
+        """
+        pets = self._pets_by_name.get(name)
+        return pets[0] if pets else None
+
+    def get_pet_consultations(self, pet_id):
+        """
+        Devuelve el historial completo de una mascota, incluidas las consultas
+        archivadas. La primera vez se lee de la base de datos y se guarda en la
+        caché LRU; las siguientes se sirve desde memoria.
+        
+        Args:
+            pet_id (int): ID de la mascota
+            
+        Returns:
+            list: Consultas de la mascota ordenadas por fecha
+            
+        Raises:
+            PetNotFoundError: Si la mascota no está cargada en la clínica
+        """
+        history = self._consultation_cache.get(pet_id)
+        if history is not None:
+            self.cache_hits += 1
+            self._consultation_cache.move_to_end(pet_id)
+            return list(history)
+
+        pet = self._pets_by_id.get(pet_id)
+        if pet is None:
+            raise self.PetNotFoundError(pet_id)
+        self.cache_misses += 1
+        history = [
+            Consultation.from_row(row, pet.name)
+            for row in self.db.get_consultations_by_pet_id(pet_id, include_archive=True)
+        ]
+        if self.consultation_cache_size > 0:
+            self._consultation_cache[pet_id] = history
+            while len(self._consultation_cache) > self.consultation_cache_size:
+                self._consultation_cache.popitem(last=False)
+        return list(history)
+
+    def clear_consultation_cache(self):
+        """
+        Vacía la caché de historiales para liberar memoria. Los contadores de
+        aciertos y fallos se conservan.
+        """
+        self._consultation_cache.clear()
 
     def add_owner(self, name, phone, address):
         """
         Añade un nuevo dueño al sistema.
+        Si ya existe un dueño con el mismo nombre y teléfono se reutiliza y se
+        actualiza su dirección.
         
         Args:
             name (str): Nombre del dueño
@@ -63,23 +276,59 @@ class Clinic:
             address (str): Dirección del dueño
             
         Returns:
-            Owner: Objeto dueño creado
+            Owner: Objeto dueño creado o existente
         """
         try:
-            owner_id = self.db.add_owner(name, phone, address)
+            owner_id = self.db.upsert_owner(name, phone, address)
+            o = self._owners_by_id.get(owner_id)
+            if o is not None:
+                o.address = address
+                logging.info(f"Dueño existente actualizado: {name}")
+                return o
             o = Owner(name, phone, address)
             o.id = owner_id
-            self.owners.append(o)
+            self._index_owner(o)
             logging.info(f"Nuevo dueño registrado: {name}")
             return o
         except Exception as e:
             logging.error(f"Error al añadir dueño a la base de datos: {e}")
             raise
 
-    def add_pet(self):
+    def add_pet(self, name=None, species=None, breed=None, age=None, owner_name=None, phone=None, address=None):
         """
         Añade una nueva mascota al sistema.
-        Solicita la información necesaria al usuario y valida los datos.
+        Sin argumentos, solicita la información al usuario y muestra los errores
+        de validación. Con argumentos, registra la mascota directamente (carga
+        por lotes, scripts) y los errores se lanzan como excepciones.
+        
+        Args:
+            name (str, optional): Nombre de la mascota
+            species (str): Especie del animal
+            breed (str): Raza de la mascota
+            age (int | str): Edad en años
+            owner_name (str): Nombre del dueño
+            phone (str, optional): Teléfono del dueño. Con teléfono, el dueño se
+                identifica por (nombre, teléfono); sin él, por el nombre
+            address (str, optional): Dirección del dueño; obligatoria si el dueño es nuevo
+                y, si se indica para un dueño existente, lo actualiza
+        
+        Returns:
+            Pet: Objeto mascota creado o None si hay error en el modo interactivo
+            
+        Raises:
+            ValueError: Si algún dato no es válido (solo con argumentos)
+        """
+        if name is None:
+            return self._prompt_pet()
+        age = self.validate_pet(name, species, breed, age, owner_name)
+        phone = phone or None
+        if self.find_owner(owner_name, phone) is None and (not phone or not address):
+            raise ValueError(f"El dueño {owner_name} no existe: indique su teléfono y dirección")
+        return self._save_pet(name, species, breed, age, owner_name, phone, address)
+
+    def _prompt_pet(self):
+        """
+        Solicita al usuario los datos de una mascota y la registra.
         
         Returns:
             Pet: Objeto mascota creado o None si hay error
@@ -109,24 +358,85 @@ class Clinic:
             print("La edad debe ser positiva")
             return
 
-        owner = None
-        for o in self.owners:
-            if o.name == owner_name:
-                owner = o
-                logging.info(f"Dueño existente encontrado: {owner_name}")
-                break
-
-        if owner is None:
+        phone = address = None
+        if self.find_owner(owner_name) is not None:
+            logging.info(f"Dueño existente encontrado: {owner_name}")
+        else:
             logging.info(f"Creando nuevo dueño: {owner_name}")
             phone = input("Teléfono del dueño: ")
             address = input("Dirección del dueño: ")
-            owner = self.add_owner(owner_name, phone, address)
+        return self._save_pet(name, species, breed, age, owner_name, phone, address)
 
+    def validate_pet(self, name, species, breed, age, owner_name):
+        """
+        Valida los datos de una mascota sin guardarla.
+        
+        Args:
+            name (str): Nombre de la mascota
+            species (str): Especie del animal
+            breed (str): Raza de la mascota
+            age (int | str): Edad en años
+            owner_name (str): Nombre del dueño
+            
+        Returns:
+            int: Edad convertida a entero
+            
+        Raises:
+            ValueError: Si algún campo no es válido
+        """
+        self.validar_ascii_letras(name=name, species=species, breed=breed, owner=owner_name)
         try:
-            pet_id = self.db.add_pet(name, species, breed, age, owner.id)
+            age = int(age)
+        except (TypeError, ValueError):
+            raise ValueError(f"La edad debe contener números: {age}") from None
+        if age < 0:
+            raise ValueError(f"La edad debe ser positiva: {age}")
+        return age
+
+    def _save_pet(self, name, species, breed, age, owner_name, phone, address):
+        """
+        Guarda una mascota ya validada y la añade a la memoria. Con teléfono, el
+        dueño se resuelve con upsert_owner por (nombre, teléfono): se crea si no
+        existe y, si existe, se actualiza su dirección. Sin teléfono se usa el
+        dueño registrado con ese nombre.
+        
+        Args:
+            name (str): Nombre de la mascota
+            species (str): Especie del animal
+            breed (str): Raza de la mascota
+            age (int): Edad en años
+            owner_name (str): Nombre del dueño
+            phone (str): Teléfono del dueño o None para buscarlo por nombre
+            address (str): Dirección del dueño o None para conservar la actual
+            
+        Returns:
+            Pet: Objeto mascota creado
+        """
+        owner = self.find_owner(owner_name, phone)
+        new_owner = None
+        if owner is None:
+            owner = new_owner = Owner(owner_name, phone, address)
+        address = address or owner.address
+
+        try:
+            # Dueño y mascota se guardan juntos: un solo commit y, si algo
+            # falla, no queda un dueño sin la mascota que se estaba registrando.
+            # El upsert reutiliza el dueño si otro terminal ya lo ha creado.
+            with self.db.transaction():
+                if phone is not None:
+                    owner_id = self.db.upsert_owner(owner_name, phone, address)
+                    if new_owner is not None:
+                        new_owner.id = owner_id
+                pet_id = self.db.add_pet(name, species, breed, age, owner.id)
+            if new_owner is not None:
+                self._index_owner(new_owner)
+                logging.info(f"Nuevo dueño registrado: {owner_name}")
+            elif owner.address != address:
+                owner.address = address
+                logging.info(f"Dirección actualizada del dueño: {owner_name}")
             p = Pet(name, species, breed, age, owner)
             p.id = pet_id
-            self.pets.append(p)
+            self._index_pet(p)
             logging.info(
                 f"Nueva mascota registrada: {name} ({species}, {breed}) para dueño {owner.name}"
             )
@@ -135,10 +445,34 @@ class Clinic:
             logging.error(f"Error al añadir mascota a la base de datos: {e}")
             raise
 
-    def add_consultation(self):
+    def add_consultation(self, date=None, reason=None, diagnosis=None, pet_name=None):
         """
         Añade una nueva consulta al sistema.
-        Solicita la información necesaria al usuario y valida los datos.
+        Sin argumentos, solicita la información al usuario y muestra los errores
+        de validación. Con argumentos, registra la consulta directamente y los
+        errores se lanzan como excepciones.
+        
+        Args:
+            date (str, optional): Fecha y hora en formato "YYYY-MM-DD HH:mm"
+            reason (str): Motivo de la consulta
+            diagnosis (str): Diagnóstico realizado
+            pet_name (str): Nombre de la mascota atendida
+        
+        Returns:
+            Consultation: Objeto consulta creado o None si hay error en el modo interactivo
+            
+        Raises:
+            ValueError: Si algún dato no es válido (solo con argumentos)
+            PetNotFoundError: Si la mascota no existe (solo con argumentos)
+        """
+        if date is None:
+            return self._prompt_consultation()
+        pet = self.validate_consultation(date, reason, diagnosis, pet_name)
+        return self._save_consultation(date, reason, diagnosis, pet)
+
+    def _prompt_consultation(self):
+        """
+        Solicita al usuario los datos de una consulta y la registra.
         
         Returns:
             Consultation: Objeto consulta creado o None si hay error
@@ -146,19 +480,14 @@ class Clinic:
         date_input = input("Fecha (YYYY-MM-DD HH:mm): ")
         pet_name = input("Nombre de la mascota: ")
         
-        pet = None
-        for p in self.pets:
-            if p.name == pet_name:
-                pet = p
-                break
-        
+        pet = self.find_pet(pet_name)
         if pet is None:
             logging.error(f"Mascota no encontrada: {pet_name}")
             self.PetNotFoundError(pet_name)
             return
 
         try:
-            _ = datetime.strptime(date_input, "%Y-%m-%d %H:%M")
+            _ = datetime.strptime(date_input, DATE_FORMAT)
         except ValueError:
             logging.error(f"Formato de fecha inválido: {date_input}")
             print("❌ Fecha inválida. Debe estar en formato YYYY-MM-DD HH:mm ❌")
@@ -172,83 +501,235 @@ class Clinic:
             logging.error(f"Error de validación en add_consultation: {str(e)}")
             print("Error: ", e)
             return
+        return self._save_consultation(date_input, reason, diagnosis, pet)
 
+    def validate_consultation(self, date, reason, diagnosis, pet_name):
+        """
+        Valida los datos de una consulta sin guardarla.
+        
+        Args:
+            date (str): Fecha y hora en formato "YYYY-MM-DD HH:mm"
+            reason (str): Motivo de la consulta
+            diagnosis (str): Diagnóstico realizado
+            pet_name (str): Nombre de la mascota atendida
+            
+        Returns:
+            Pet: Mascota atendida
+            
+        Raises:
+            ValueError: Si la fecha o algún texto no son válidos
+            PetNotFoundError: Si la mascota no existe
+        """
+        pet = self.find_pet(pet_name)
+        if pet is None:
+            raise self.PetNotFoundError(pet_name)
         try:
-            consultation_id = self.db.add_consultation(date_input, reason, diagnosis, pet.id)
-            c = Consultation(date_input, reason, diagnosis, pet_name)
+            datetime.strptime(date, DATE_FORMAT)
+        except (TypeError, ValueError):
+            raise ValueError(f"Fecha inválida, debe estar en formato YYYY-MM-DD HH:mm: {date}") from None
+        self.validar_ascii_letras(reason=reason, diagnosis=diagnosis)
+        return pet
+
+    def _save_consultation(self, date, reason, diagnosis, pet):
+        """
+        Guarda una consulta ya validada y la añade al historial en memoria.
+        
+        Args:
+            date (str): Fecha y hora en formato "YYYY-MM-DD HH:mm"
+            reason (str): Motivo de la consulta
+            diagnosis (str): Diagnóstico realizado
+            pet (Pet): Mascota atendida
+            
+        Returns:
+            Consultation: Objeto consulta creado
+        """
+        try:
+            consultation_id = self.db.add_consultation(date, reason, diagnosis, pet.id)
+            c = Consultation(date, reason, diagnosis, pet.name)
             c.id = consultation_id
-            self.consultations.append(c)
-            logging.info(f"Nueva consulta registrada para mascota {pet_name} en {date_input}")
+            c.pet_id = pet.id
+            self._index_consultation(c)
+            logging.info(f"Nueva consulta registrada para mascota {pet.name} en {date}")
             return c
         except Exception as e:
             logging.error(f"Error al añadir consulta a la base de datos: {e}")
             raise
 
-    def list_pets(self):
+    def list_pets(self, page_size=20, output_format="text", stream=None):
         """
         Lista todas las mascotas registradas en el sistema.
-        Muestra la información detallada de cada mascota y su dueño.
+        Muestra la información detallada de cada mascota y su dueño. Los datos se
+        sirven desde memoria; solo se vuelven a leer de la base de datos si otra
+        conexión la ha modificado. La salida se escribe por lotes con Renderer.
+        
+        Args:
+            page_size (int): Número de mascotas por página; None para escribirlas
+                todas sin pausas (exportación a un archivo o a una tubería)
+            output_format (str): Formato de salida: "text", "table", "csv" o "jsonl"
+            stream (file, optional): Destino de la salida; por defecto, sys.stdout
+            
+        Returns:
+            int: Número de mascotas mostradas
         """
         try:
-            pets = self.db.get_all_pets()
+            renderer = Renderer(PET_COLUMNS, output_format, stream)
+            self.refresh()
+            pets = sorted(self.pets, key=lambda pet: pet.id)
             if not pets:
                 logging.warning("No se encontraron mascotas en la base de datos")
                 self.NoPetsRegisteredError()
-                return
-            
-            for pet in pets:
-                print(f"ID: {pet[0]}")
-                print(f"Nombre: {pet[1]}")
-                print(f"Especie: {pet[2]}")
-                print(f"Raza: {pet[3]}")
-                print(f"Edad: {pet[4]}")
-                print(f"Dueño: {pet[6]}")
-                print(f"Teléfono del dueño: {pet[7]}")
-                print(f"Dirección del dueño: {pet[8]}")
-                print("-" * 50)
+                return 0
+
+            if page_size is None:
+                listed = renderer.write(pets)
+            else:
+                listed = renderer.page(lambda offset, limit: pets[offset:offset + limit], page_size)
             
-            logging.info(f"Listadas {len(pets)} mascotas de la base de datos")
+            logging.info(f"Listadas {listed} mascotas")
+            return listed
         except Exception as e:
-            logging.error(f"Error al listar mascotas de la base de datos: {e}")
+            logging.error(f"Error al listar mascotas: {e}")
             raise
 
-    def search_consultation(self):
+    def search_consultation(self, page_size=20, output_format="text", stream=None):
         """
         Busca y muestra las consultas de una mascota específica.
-        Solicita el nombre de la mascota y muestra todas sus consultas.
+        Solicita el nombre de la mascota y muestra sus consultas página a página.
+        
+        Args:
+            page_size (int): Número de consultas por página; None para escribirlas
+                todas sin pausas
+            output_format (str): Formato de salida: "text", "table", "csv" o "jsonl"
+            stream (file, optional): Destino de la salida; por defecto, sys.stdout
         """
+        renderer = Renderer(CONSULTATION_COLUMNS, output_format, stream)
         pet_name = input("Nombre de la mascota: ")
         
-        # Buscar mascota en la lista local primero
-        pet = None
-        for p in self.pets:
-            if p.name == pet_name:
-                pet = p
-                break
-        
+        # Buscar mascota en el índice local primero
+        self.refresh()
+        pet = self.find_pet(pet_name)
         if pet is None:
             logging.warning(f"Mascota no encontrada: {pet_name}")
             self.PetNotFoundError(pet_name)
             return
 
         try:
-            consultations = self.db.get_consultations_by_pet_id(pet.id)
+            consultations = self.get_pet_consultations(pet.id)
             if not consultations:
                 logging.warning(f"No se encontraron consultas para la mascota: {pet_name}")
                 self.NoConsultationPet()
                 return
 
+            if page_size is None:
+                renderer.write(consultations)
+            else:
+                renderer.page(lambda offset, limit: consultations[offset:offset + limit], page_size)
+            logging.info(f"Encontradas {len(consultations)} consultas para mascota {pet_name}")
+        except Exception as e:
+            logging.error(f"Error al buscar consultas en la base de datos: {e}")
+            raise
+
+    def search_clinical_history(self):
+        """
+        Busca consultas de cualquier mascota por texto en el motivo o el diagnóstico.
+        Solicita el texto a buscar y muestra las consultas más relevantes.
+        """
+        text = input("Texto a buscar (motivo o diagnóstico): ").strip()
+        if not text:
+            print("Debe indicar un texto a buscar")
+            return
+
+        try:
+            consultations = self.db.search_consultations(text)
+            if not consultations:
+                logging.warning(f"No se encontraron consultas para la búsqueda: {text}")
+                print(f"No se encontraron consultas que contengan '{text}'")
+                return
+
             for consultation in consultations:
-                print(f"Fecha: {consultation[1]}")
-                print(f"Motivo: {consultation[2]}")
-                print(f"Diagnóstico: {consultation[3]}")
+                print(f"Mascota: {consultation.pet_name}")
+                print(f"Fecha: {consultation.date}")
+                print(f"Motivo: {consultation.reason}")
+                print(f"Diagnóstico: {consultation.diagnosis}")
                 print("-" * 50)
 
-            logging.info(f"Encontradas {len(consultations)} consultas para mascota {pet_name}")
+            logging.info(f"Encontradas {len(consultations)} consultas para la búsqueda: {text}")
         except Exception as e:
-            logging.error(f"Error al buscar consultas en la base de datos: {e}")
+            logging.error(f"Error al buscar en el historial clínico: {e}")
+            raise
+
+    def show_agenda(self):
+        """
+        Muestra las consultas de un día con la mascota y el teléfono del dueño.
+        Solicita el día (por defecto, hoy).
+        """
+        day = input("Día (YYYY-MM-DD, Enter para hoy): ").strip() or None
+        try:
+            agenda = self.db.get_agenda(day)
+        except ValueError:
+            logging.error(f"Formato de día inválido: {day}")
+            print("❌ Día inválido. Debe estar en formato YYYY-MM-DD ❌")
+            return
+
+        try:
+            if not agenda:
+                print("No hay consultas para ese día")
+                return
+
+            for consultation in agenda:
+                print(f"Hora: {consultation.date[11:]}")
+                print(f"Mascota: {consultation.pet_name}")
+                print(f"Dueño: {consultation.owner_name} ({consultation.phone})")
+                print(f"Motivo: {consultation.reason}")
+                print("-" * 50)
+
+            logging.info(f"Mostradas {len(agenda)} consultas de la agenda")
+        except Exception as e:
+            logging.error(f"Error al mostrar la agenda: {e}")
             raise
 
+    def delete_owner(self, owner_id):
+        """
+        Elimina un dueño con sus mascotas y consultas, en la base de datos y en memoria.
+        
+        Args:
+            owner_id (int): ID del dueño a eliminar
+            
+        Raises:
+            OwnerNotFoundError: Si el dueño no está cargado en la clínica
+        """
+        owner = self._owners_by_id.get(owner_id)
+        if owner is None:
+            raise self.OwnerNotFoundError(owner_id)
+        self.db.delete_owner(owner_id)
+
+        del self._owners_by_id[owner_id]
+        del self._owners_by_key[(owner.name, owner.phone)]
+        same_name = self._owners_by_name[owner.name]
+        same_name.remove(owner)
+        if not same_name:
+            del self._owners_by_name[owner.name]
+        self.owners = [o for o in self.owners if o.id != owner_id]
+        self._unindex_pets({pet.id for pet in self.pets if pet.owner is owner})
+        logging.info(f"Dueño eliminado de la clínica: {owner.name}")
+
+    def delete_pet(self, pet_id):
+        """
+        Elimina una mascota con sus consultas, en la base de datos y en memoria.
+        
+        Args:
+            pet_id (int): ID de la mascota a eliminar
+            
+        Raises:
+            PetNotFoundError: Si la mascota no está cargada en la clínica
+        """
+        pet = self._pets_by_id.get(pet_id)
+        if pet is None:
+            raise self.PetNotFoundError(pet_id)
+        self.db.delete_pet(pet_id)
+        self._unindex_pets({pet_id})
+        logging.info(f"Mascota eliminada de la clínica: {pet.name}")
+
     def validar_ascii_letras(self, **campos):
         """
         Valida que los campos contengan solo letras y espacios.
@@ -280,26 +761,38 @@ class Clinic:
         """
         Carga mascotas y dueños desde la base de datos.
         Mantiene los objetos en memoria para mejor rendimiento.
+        Las filas llegan ordenadas por dueño, así que el grafo se construye en
+        una sola pasada sin buscar el dueño de cada mascota. Cada fila se
+        convierte directamente en objetos Owner y Pet (row_factory), sin pasar
+        por un registro intermedio. Lo que hubiera en memoria se descarta,
+        incluida la caché de historiales.
         """
         try:
-            pets = self.db.get_all_pets()
-            for pet in pets:
-                # Crear dueño si no existe
-                owner = None
-                for o in self.owners:
-                    if o.name == pet[6]:  # nombre_dueño del join
-                        owner = o
-                        break
-                
-                if owner is None:
-                    owner = Owner(pet[6], pet[7], pet[8])  # nombre, teléfono, dirección
-                    owner.id = pet[5]  # owner_id
-                    self.owners.append(owner)
-
-                # Crear mascota
-                p = Pet(pet[1], pet[2], pet[3], pet[4], owner)  # nombre, especie, raza, edad, dueño
-                p.id = pet[0]  # pet_id
-                self.pets.append(p)
+            self.owners = []
+            self.pets = []
+            self._owners_by_id = {}
+            self._owners_by_name = {}
+            self._owners_by_key = {}
+            self._pets_by_id = {}
+            self._pets_by_name = {}
+            self._consultation_cache.clear()
+            # El sello se lee antes de cargar: un cambio durante la carga forzará otra recarga
+            self._data_version = self.db.data_version()
+            owner = None
+
+            def hydrate(_cursor, row):
+                # Fila (owner_id, owner_name, phone, address, pet_id, pet_name, species, breed, age)
+                nonlocal owner
+                # Crear el dueño al llegar a su primera fila
+                if owner is None or owner.id != row[0]:
+                    owner = Owner.from_row(row)
+                    self._index_owner(owner)
+                # Crear mascota (None si el dueño no tiene mascotas)
+                return None if row[4] is None else Pet.from_row(row, owner, start=4)
+
+            for pet in self.db.iter_owners_with_pets(row_factory=hydrate):
+                if pet is not None:
+                    self._index_pet(pet)
 
             logging.info(f"Cargadas {len(self.pets)} mascotas y {len(self.owners)} dueños de la base de datos")
         except Exception as e:
@@ -308,16 +801,20 @@ class Clinic:
 
     def load_consultations(self):
         """
-        Carga las consultas desde la base de datos.
-        Mantiene los objetos en memoria para mejor rendimiento.
+        Carga todas las consultas desde la base de datos en self.consultations.
+        Ya no se llama al arrancar: solo hace falta para exportar el historial
+        completo; las búsquedas por mascota usan get_pet_consultations().
         """
+        def hydrate(_cursor, row):
+            # Fila (id, date, reason, diagnosis, pet_id)
+            pet = self._pets_by_id.get(row[4])
+            # None si es una consulta de una mascota que ya no existe
+            return None if pet is None else Consultation.from_row(row, pet.name)
+
         try:
-            for pet in self.pets:
-                consultations = self.db.get_consultations_by_pet_id(pet.id)
-                for consultation in consultations:
-                    c = Consultation(consultation[1], consultation[2], consultation[3], pet.name)
-                    c.id = consultation[0]
-                    self.consultations.append(c)
+            for consultation in self.db.iter_all_consultations(row_factory=hydrate):
+                if consultation is not None:
+                    self.consultations.append(consultation)
             
             logging.info(f"Cargadas {len(self.consultations)} consultas de la base de datos")
         except Exception as e:
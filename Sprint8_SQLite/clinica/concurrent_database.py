@@ -0,0 +1,439 @@
+"""
+Módulo de Base de Datos Concurrente para la Clínica Veterinaria "Amigos Peludos"
+
+Este módulo implementa la clase ConcurrentDatabase, una variante de Database que
+puede compartirse entre varios hilos. Database guarda una única conexión como
+estado de la instancia, por lo que dos hilos a la vez se pisarían el cursor.
+
+Funcionamiento:
+- Lecturas: cada llamada toma prestada una conexión de un grupo de como mucho
+  max_readers conexiones y la devuelve al terminar, así que el número de
+  conexiones abiertas no crece con el número de hilos. Con el perfil
+  "performance" (WAL) los lectores no bloquean al escritor.
+- Escrituras: los métodos de escritura se encolan y un hilo escritor dedicado las
+  ejecuta por lotes. Cada lote se confirma con un único commit (group commit) y
+  cada operación va en su propio SAVEPOINT, así que un error solo afecta a la
+  operación que lo provocó. La llamada devuelve el resultado cuando su lote se ha
+  confirmado.
+- Unidades de trabajo: transaction() toma una conexión del grupo durante todo
+  el bloque y las escrituras se ejecutan directamente en ella.
+- Para SQL directo, connection() presta una conexión del grupo durante un bloque with.
+- data_version() solo cambia con los commits de otros procesos: se lee en una
+  conexión fija (el PRAGMA es propio de cada conexión) y los commits de esta
+  instancia, hechos desde el escritor o desde el grupo, se descuentan.
+
+Las bases de datos en memoria no están soportadas en este modo: ":memory:" no se
+comparte entre conexiones y la memoria compartida bloquea tablas enteras.
+"""
+
+import inspect
+import logging
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from database import MAINTENANCE_METHODS, READ_METHODS, WRITE_METHODS, Database, is_memory_database
+
+# Máximo de operaciones de escritura confirmadas en un mismo commit
+DEFAULT_MAX_BATCH = 256
+
+# Máximo de conexiones de lectura abiertas a la vez por defecto
+DEFAULT_MAX_READERS = 8
+
+# Métodos que necesitan una conexión prestada del grupo mientras se ejecutan,
+# además de las lecturas y el mantenimiento; los iter_* la retienen mientras
+# se recorren
+_LEASED_METHODS = READ_METHODS + MAINTENANCE_METHODS + (
+    "iter_owners_with_pets",
+    "iter_all_consultations",
+    "iter_pets",
+    "iter_consultations",
+    "initialize_database",
+    "ensure_healthy",
+)
+
+# Marca que indica al hilo escritor que debe terminar
+_STOP = object()
+
+
+class ConcurrentDatabase(Database):
+    def __init__(self, db_name="clinica_veterinaria.db", profile="performance", max_batch=DEFAULT_MAX_BATCH,
+                 max_readers=DEFAULT_MAX_READERS, **options):
+        """
+        Inicializa la base de datos y arranca el hilo escritor.
+
+        Args:
+            db_name (str): Nombre del archivo de base de datos SQLite
+            profile (str): Perfil de rendimiento; por defecto "performance" (WAL)
+            max_batch (int): Máximo de escrituras confirmadas en un mismo commit
+            max_readers (int): Máximo de conexiones de lectura abiertas a la vez
+            **options: Argumentos adicionales para Database (slow_query_ms...)
+
+        Raises:
+            ValueError: Si se pide una base de datos en memoria
+        """
+        if is_memory_database(db_name):
+            raise ValueError("ConcurrentDatabase necesita un archivo: las bases en memoria no admiten escritores concurrentes")
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        # Conexiones de lectura libres; se abren bajo demanda hasta max_readers
+        self._readers = queue.LifoQueue()
+        self._readers_opened = 0
+        self.max_readers = max_readers
+        self._queue = queue.Queue()
+        self._closed = False
+        self.max_batch = max_batch
+        self.writes_committed = 0
+        self.batches_committed = 0
+        # Sello de versión: último PRAGMA data_version leído en la conexión fija
+        # _watcher y número de cambios ajenos detectados
+        self._version_lock = threading.Lock()
+        self._watched_version = None
+        self._external_changes = 0
+        super().__init__(db_name, profile=profile, **options)
+        self._watcher = self._open_connection()
+        self._writer = threading.Thread(target=self._writer_loop, name="clinica-db-writer", daemon=True)
+        self._writer.start()
+
+    # La conexión, el cursor y la profundidad de transacción son propios de cada hilo
+    @property
+    def conn(self):
+        return getattr(self._local, "conn", None)
+
+    @conn.setter
+    def conn(self, value):
+        self._local.conn = value
+
+    @property
+    def cursor(self):
+        return getattr(self._local, "cursor", None)
+
+    @cursor.setter
+    def cursor(self, value):
+        self._local.cursor = value
+
+    @property
+    def _tx_depth(self):
+        return getattr(self._local, "tx_depth", 0)
+
+    @_tx_depth.setter
+    def _tx_depth(self, value):
+        self._local.tx_depth = value
+
+    def connect(self):
+        """
+        Devuelve la conexión prestada al hilo actual. Las conexiones solo se
+        prestan dentro de los métodos de Database, de transaction() o de connection().
+
+        Returns:
+            sqlite3.Connection: Conexión prestada
+
+        Raises:
+            RuntimeError: Si el hilo no tiene ninguna conexión prestada
+        """
+        if self.conn is None:
+            raise RuntimeError("No hay ninguna conexión prestada a este hilo: use connection()")
+        return self.conn
+
+    def _acquire_reader(self):
+        """
+        Toma una conexión libre del grupo, abre una nueva si aún no se ha llegado
+        a max_readers o, si no, espera a que otro hilo devuelva la suya.
+
+        Returns:
+            sqlite3.Connection: Conexión prestada
+        """
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            pass
+        with self._connections_lock:
+            can_open = self._readers_opened < self.max_readers
+            if can_open:
+                self._readers_opened += 1
+        if not can_open:
+            return self._readers.get()
+        try:
+            return self._open_connection()
+        except Exception:
+            with self._connections_lock:
+                self._readers_opened -= 1
+            raise
+
+    def _release_reader(self, conn):
+        """
+        Devuelve una conexión al grupo, deshaciendo lo que hubiera quedado a medias.
+
+        Args:
+            conn (sqlite3.Connection): Conexión prestada
+        """
+        if self._closed:
+            return
+        if conn.in_transaction:
+            conn.rollback()
+        self._readers.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """
+        Presta una conexión del grupo al hilo actual durante el bloque with.
+        Si el hilo ya tiene una (bloques anidados, hilo escritor), se reutiliza.
+
+        Uso:
+            with db.connection() as conn:
+                conn.execute("SELECT COUNT(*) FROM pets").fetchone()
+
+        Yields:
+            sqlite3.Connection: Conexión prestada
+        """
+        depth = getattr(self._local, "lease_depth", 0)
+        if depth == 0 and self.conn is None:
+            conn = self._acquire_reader()
+            self.conn = conn
+            self.cursor = conn.cursor()
+            leased = True
+        else:
+            leased = False
+        self._local.lease_depth = depth + 1
+        try:
+            yield self.conn
+        finally:
+            self._local.lease_depth = depth
+            if leased:
+                conn = self.conn
+                self.conn = None
+                self.cursor = None
+                self._release_reader(conn)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Unidad de trabajo sobre una conexión del grupo, retenida durante todo el
+        bloque. Ver Database.transaction.
+
+        Yields:
+            ConcurrentDatabase: La propia instancia
+        """
+        with self.connection():
+            outer = self._tx_depth == 0
+            with Database.transaction(self):
+                if outer:
+                    # Con el bloqueo de escritura tomado nadie más puede confirmar:
+                    # lo que haya cambiado hasta aquí es ajeno
+                    self._watch_version(own=False)
+                yield self
+            if outer:
+                self._watch_version(own=True)
+
+    def _watch_version(self, own):
+        """
+        Lee PRAGMA data_version en la conexión fija y cuenta el cambio como
+        ajeno salvo que venga del commit que esta instancia acaba de hacer.
+
+        Args:
+            own (bool): True justo después de un commit propio
+        """
+        with self._version_lock:
+            version = self._watcher.execute("PRAGMA data_version").fetchone()[0]
+            if not own and self._watched_version is not None and version != self._watched_version:
+                self._external_changes += 1
+            self._watched_version = version
+
+    def data_version(self):
+        """
+        Devuelve un sello que solo cambia cuando otro proceso confirma cambios.
+        Los commits de esta instancia (lotes del escritor y unidades de trabajo)
+        no lo modifican, igual que en Database con su única conexión.
+
+        Returns:
+            int: Número de cambios ajenos detectados
+        """
+        self._watch_version(own=False)
+        return self._external_changes
+
+    def _open_connection(self):
+        """
+        Abre una conexión nueva y la registra para cerrarla en close(). Cada
+        conexión la usa un solo hilo a la vez, pero pasa de un hilo a otro y
+        close() las cierra todas desde el hilo que lo llama, de ahí
+        check_same_thread=False.
+
+        Returns:
+            sqlite3.Connection: Conexión recién abierta
+        """
+        if self._closed:
+            raise RuntimeError("La base de datos concurrente está cerrada")
+        conn = sqlite3.connect(self.db_name, uri=self.db_name.startswith("file:"), check_same_thread=False)
+        self._configure_connection(conn)
+        with self._connections_lock:
+            self._connections.append(conn)
+        return conn
+
+    def _submit_write(self, func, args, kwargs):
+        """
+        Encola una escritura para el hilo escritor y espera a que se confirme.
+
+        Args:
+            func (callable): Método de Database a ejecutar
+            args (tuple): Argumentos posicionales
+            kwargs (dict): Argumentos con nombre
+
+        Returns:
+            object: Resultado del método
+        """
+        if self._closed:
+            raise RuntimeError("La base de datos concurrente está cerrada")
+        future = Future()
+        self._queue.put((future, func, args, kwargs))
+        return future.result()
+
+    def _writer_loop(self):
+        """
+        Bucle del hilo escritor: toma todas las escrituras pendientes (hasta
+        max_batch) y las confirma juntas. El escritor tiene su propia conexión,
+        fuera del grupo de lectores, para no competir con ellos por una.
+        """
+        self.conn = self._open_connection()
+        self.cursor = self.conn.cursor()
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            stop = False
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._run_batch(batch)
+            if stop:
+                break
+
+    def _run_batch(self, batch):
+        """
+        Ejecuta un lote de escrituras en una transacción, cada una en su propio
+        savepoint, y entrega los resultados tras el commit.
+
+        Args:
+            batch (list): Tuplas (future, func, args, kwargs)
+        """
+        results = []
+        try:
+            with self.transaction():
+                for future, func, args, kwargs in batch:
+                    try:
+                        with self.transaction():
+                            results.append((future, func(self, *args, **kwargs), None))
+                    except Exception as e:
+                        results.append((future, None, e))
+        except Exception as e:
+            logging.error(f"Error al confirmar un lote de {len(batch)} escrituras: {e}")
+            for future, _, _, _ in batch:
+                future.set_exception(e)
+            return
+
+        self.writes_committed += len(batch)
+        self.batches_committed += 1
+        for future, result, error in results:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def close(self):
+        """
+        Detiene el hilo escritor tras confirmar las escrituras pendientes y
+        cierra las conexiones de todos los hilos. La instancia no puede volver
+        a usarse después.
+        """
+        if self._closed:
+            return
+        self._queue.put(_STOP)
+        self._writer.join()
+        self._closed = True
+        self._readers = queue.LifoQueue()
+        report = self.query_stats.report()
+        if report:
+            logging.info(f"Estadísticas de consultas:\n{report}")
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except Exception as e:
+                logging.warning(f"Error al cerrar una conexión: {e}")
+        self.conn = None
+        self.cursor = None
+        logging.info(
+            f"Base de datos concurrente cerrada: {self.writes_committed} escrituras "
+            f"en {self.batches_committed} commits"
+        )
+
+
+def _write_method(name):
+    """
+    Crea la versión de un método de escritura que pasa por el hilo escritor.
+
+    Args:
+        name (str): Nombre del método de Database
+
+    Returns:
+        function: Método con el mismo nombre y argumentos
+    """
+    base = getattr(Database, name)
+
+    def method(self, *args, **kwargs):
+        # Dentro de una unidad de trabajo, o ya en el hilo escritor, se ejecuta directamente
+        if self._tx_depth > 0 or threading.current_thread() is self._writer:
+            return base(self, *args, **kwargs)
+        return self._submit_write(base, args, kwargs)
+
+    method.__name__ = name
+    method.__qualname__ = f"ConcurrentDatabase.{name}"
+    method.__doc__ = base.__doc__
+    return method
+
+
+def _leased_method(name):
+    """
+    Crea la versión de un método que se ejecuta con una conexión prestada del
+    grupo. Los métodos generadores la retienen hasta terminar el recorrido.
+
+    Args:
+        name (str): Nombre del método de Database
+
+    Returns:
+        function: Método con el mismo nombre y argumentos
+    """
+    base = getattr(Database, name)
+
+    if inspect.isgeneratorfunction(base):
+        def method(self, *args, **kwargs):
+            with self.connection():
+                yield from base(self, *args, **kwargs)
+    else:
+        def method(self, *args, **kwargs):
+            with self.connection():
+                return base(self, *args, **kwargs)
+
+    method.__name__ = name
+    method.__qualname__ = f"ConcurrentDatabase.{name}"
+    method.__doc__ = base.__doc__
+    return method
+
+
+for _name in WRITE_METHODS:
+    setattr(ConcurrentDatabase, _name, _write_method(_name))
+
+for _name in _LEASED_METHODS:
+    # Los que la clase redefine (data_version) ya gestionan su conexión
+    if _name not in vars(ConcurrentDatabase):
+        setattr(ConcurrentDatabase, _name, _leased_method(_name))
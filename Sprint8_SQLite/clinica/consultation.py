@@ -13,6 +13,7 @@ tiene la siguiente información:
 
 La clase proporciona métodos para:
 - Inicializar una nueva consulta
+- Construir una consulta a partir de una fila de la base de datos
 - Obtener una representación en cadena de la consulta
 """
 
@@ -31,11 +32,35 @@ class Consultation:
             pet_name (str): Nombre de la mascota atendida
         """
         self.id = None  # Se establecerá cuando se guarde en la base de datos
+        self.pet_id = None  # Se establecerá cuando se guarde en la base de datos
         self.date = datetime.strptime(date, "%Y-%m-%d %H:%M")
         self.reason = reason
         self.diagnosis = diagnosis
         self.pet_name = pet_name
 
+    @classmethod
+    def from_row(cls, row, pet_name):
+        """
+        Construye una consulta a partir de una fila de la tabla consultations.
+        Las fechas guardadas ya están validadas, así que se leen con
+        datetime.fromisoformat, mucho más rápido que strptime en cargas grandes.
+        
+        Args:
+            row (tuple): Fila (id, date, reason, diagnosis, pet_id), p. ej. un ConsultationRow
+            pet_name (str): Nombre de la mascota atendida
+            
+        Returns:
+            Consultation: Consulta con su ID asignado
+        """
+        consultation = cls.__new__(cls)
+        consultation.id = row[0]
+        consultation.pet_id = row[4]
+        consultation.date = datetime.fromisoformat(row[1])
+        consultation.reason = row[2]
+        consultation.diagnosis = row[3]
+        consultation.pet_name = pet_name
+        return consultation
+
     def __str__(self):
         """
         Retorna una representación en cadena de la consulta.
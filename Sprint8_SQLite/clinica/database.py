@@ -10,6 +10,7 @@ Estructura de la Base de Datos:
   • name: Nombre del dueño
   • phone: Teléfono de contacto
   • address: Dirección del dueño
+  • (name, phone): Clave natural única del dueño
 
 - Tabla 'pets': Almacena información de las mascotas
   • id: Identificador único autoincremental
@@ -17,111 +18,1234 @@ Estructura de la Base de Datos:
   • species: Especie de la mascota
   • breed: Raza de la mascota
   • age: Edad de la mascota
-  • owner_id: Referencia al dueño (clave foránea)
+  • owner_id: Referencia al dueño (clave foránea, borrado en cascada)
 
 - Tabla 'consultations': Almacena información de las consultas
   • id: Identificador único autoincremental
-  • date: Fecha y hora de la consulta
+  • date: Fecha y hora de la consulta ('YYYY-MM-DD HH:MM', ordenable como texto)
   • reason: Motivo de la consulta
   • diagnosis: Diagnóstico realizado
-  • pet_id: Referencia a la mascota (clave foránea)
+  • pet_id: Referencia a la mascota (clave foránea, borrado en cascada)
+
+- Tablas de resumen para los informes, mantenidas por triggers al insertar,
+  modificar o borrar mascotas y consultas:
+  • pet_summary: Consultas por mascota
+  • owner_summary: Mascotas por dueño
+  • species_summary: Mascotas y consultas por especie
+  • month_summary: Consultas por mes ('YYYY-MM')
+
+- Tabla 'quarantined_consultations': Consultas antiguas cuya fecha no se pudo
+  interpretar, apartadas para revisarlas a mano (mismas columnas que consultations)
 
 Características implementadas:
 - Creación automática de tablas si no existen
-- Gestión de conexiones a la base de datos
+- Migraciones versionadas del esquema (PRAGMA user_version) que actualizan
+  en el sitio las bases de datos existentes
+- Índices secundarios sobre nombres y claves foráneas
+- Perfiles de rendimiento (WAL, synchronous, caché, mmap) configurables por
+  parámetro o por la variable de entorno CLINICA_DB_PROFILE
+- Conexión persistente reutilizada entre operaciones, con cierre explícito,
+  soporte de gestor de contexto (with) y comprobación de salud
+- Modo en memoria compartida (Database.in_memory()) para pruebas y datos de
+  ejemplo sin tocar el disco
+- Archivado de las consultas antiguas en una base de datos aparte
+  ("<base>.archive.db", adjuntada con ATTACH) para mantener pequeña la base principal
+- Copias de seguridad en caliente por pasos (API de backup de SQLite), sin
+  bloquear a los terminales que escriben mientras se copian
 - Operaciones CRUD completas (Crear, Leer, Actualizar, Eliminar)
-- Manejo de transacciones y errores
-- Integridad referencial mediante claves foráneas
+- Inserciones masivas por bloques (executemany) en una única transacción
+- Listados paginados por clave (id > ?) que no cargan la tabla completa
+- Búsqueda de texto completo (FTS5) sobre motivo y diagnóstico de las consultas
+- Fechas normalizadas y consultas por rango de fechas (agenda del día) que
+  recorren solo el tramo correspondiente del índice
+- Filas devueltas como registros con nombre (namedtuple) o como tuplas
+- Métricas por sentencia (llamadas, filas, histograma de latencias) y registro
+  de consultas lentas con su plan de ejecución (EXPLAIN QUERY PLAN)
+- Manejo de transacciones y errores, con unidades de trabajo anidables
+  (transaction()) que agrupan varias operaciones en un solo commit
+- Integridad referencial mediante claves foráneas activadas en cada conexión,
+  con borrado en cascada (ON DELETE CASCADE) de mascotas y consultas
+- Borrado masivo de dueños y mascotas en una sola sentencia
+- Informes (consultas por mascota, mes y especie; mascotas por dueño) que
+  leen una fila por grupo en lugar de agregar todo el historial
+- Alta o actualización de dueños por su clave natural (upsert) en una sola
+  sentencia indexada, sin duplicados aunque escriban varios terminales
 """
 
+import json
+import os
 import sqlite3
 import logging
-from datetime import datetime
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from itertools import islice
+
+from query_stats import QueryStats
+from rows import (
+    ConsultationMatchRow,
+    ConsultationRow,
+    AgendaRow,
+    MonthConsultationsRow,
+    OwnerPetsRow,
+    OwnerRow,
+    OwnerWithPetRow,
+    PetConsultationsRow,
+    PetRow,
+    PetWithOwnerRow,
+    SpeciesSummaryRow,
+    record_factory,
+)
+
+# Filas por llamada a executemany en las inserciones masivas
+DEFAULT_CHUNK_SIZE = 500
+
+# Filas por página en los listados paginados
+DEFAULT_PAGE_SIZE = 100
+
+# Triggers que mantienen el índice de texto completo al día con la tabla consultations.
+# Se reutilizan en las migraciones que reconstruyen la tabla.
+_CONSULTATIONS_FTS_TRIGGERS = [
+    '''
+    CREATE TRIGGER IF NOT EXISTS consultations_fts_insert AFTER INSERT ON consultations BEGIN
+        INSERT INTO consultations_fts (rowid, reason, diagnosis)
+        VALUES (new.id, new.reason, new.diagnosis);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS consultations_fts_delete AFTER DELETE ON consultations BEGIN
+        INSERT INTO consultations_fts (consultations_fts, rowid, reason, diagnosis)
+        VALUES ('delete', old.id, old.reason, old.diagnosis);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS consultations_fts_update AFTER UPDATE OF reason, diagnosis ON consultations BEGIN
+        INSERT INTO consultations_fts (consultations_fts, rowid, reason, diagnosis)
+        VALUES ('delete', old.id, old.reason, old.diagnosis);
+        INSERT INTO consultations_fts (rowid, reason, diagnosis)
+        VALUES (new.id, new.reason, new.diagnosis);
+    END
+    ''',
+]
+
+# Triggers que mantienen al día las tablas de resumen de los informes. Cada
+# alta, cambio o baja ajusta solo los contadores de los grupos afectados.
+# Las migraciones que reconstruyan pets o consultations deben volver a crearlos.
+#
+# En un borrado en cascada las consultas se eliminan cuando su mascota ya no
+# existe, así que no se puede saber su especie: el trigger BEFORE DELETE de
+# pets descuenta de una vez todas sus consultas de la especie y elimina su
+# fila de pet_summary, y los triggers de consultations solo ajustan lo que
+# aún encuentran (el mes siempre; la mascota y la especie si sigue existiendo).
+_SUMMARY_TRIGGERS = [
+    '''
+    CREATE TRIGGER IF NOT EXISTS summary_pets_insert AFTER INSERT ON pets BEGIN
+        INSERT INTO pet_summary (pet_id, consultations) VALUES (new.id, 0);
+        INSERT INTO owner_summary (owner_id, pets) VALUES (new.owner_id, 1)
+            ON CONFLICT (owner_id) DO UPDATE SET pets = pets + 1;
+        INSERT INTO species_summary (species, pets, consultations) VALUES (new.species, 1, 0)
+            ON CONFLICT (species) DO UPDATE SET pets = pets + 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS summary_pets_delete BEFORE DELETE ON pets BEGIN
+        UPDATE species_summary
+            SET pets = pets - 1,
+                consultations = consultations - (SELECT consultations FROM pet_summary WHERE pet_id = old.id)
+            WHERE species = old.species;
+        DELETE FROM species_summary WHERE species = old.species AND pets = 0;
+        UPDATE owner_summary SET pets = pets - 1 WHERE owner_id = old.owner_id;
+        DELETE FROM owner_summary WHERE owner_id = old.owner_id AND pets = 0;
+        DELETE FROM pet_summary WHERE pet_id = old.id;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS summary_pets_species AFTER UPDATE OF species ON pets
+    WHEN old.species IS NOT new.species BEGIN
+        UPDATE species_summary
+            SET pets = pets - 1,
+                consultations = consultations - (SELECT consultations FROM pet_summary WHERE pet_id = new.id)
+            WHERE species = old.species;
+        DELETE FROM species_summary WHERE species = old.species AND pets = 0;
+        INSERT INTO species_summary (species, pets, consultations)
+            VALUES (new.species, 1, (SELECT consultations FROM pet_summary WHERE pet_id = new.id))
+            ON CONFLICT (species) DO UPDATE SET pets = pets + 1, consultations = consultations + excluded.consultations;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS summary_pets_owner AFTER UPDATE OF owner_id ON pets
+    WHEN old.owner_id IS NOT new.owner_id BEGIN
+        UPDATE owner_summary SET pets = pets - 1 WHERE owner_id = old.owner_id;
+        DELETE FROM owner_summary WHERE owner_id = old.owner_id AND pets = 0;
+        INSERT INTO owner_summary (owner_id, pets) VALUES (new.owner_id, 1)
+            ON CONFLICT (owner_id) DO UPDATE SET pets = pets + 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS summary_consultations_insert AFTER INSERT ON consultations BEGIN
+        UPDATE pet_summary SET consultations = consultations + 1 WHERE pet_id = new.pet_id;
+        UPDATE species_summary SET consultations = consultations + 1
+            WHERE species = (SELECT species FROM pets WHERE id = new.pet_id);
+        INSERT INTO month_summary (month, consultations) VALUES (substr(new.date, 1, 7), 1)
+            ON CONFLICT (month) DO UPDATE SET consultations = consultations + 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS summary_consultations_delete AFTER DELETE ON consultations BEGIN
+        UPDATE pet_summary SET consultations = consultations - 1 WHERE pet_id = old.pet_id;
+        UPDATE species_summary SET consultations = consultations - 1
+            WHERE species = (SELECT species FROM pets WHERE id = old.pet_id);
+        UPDATE month_summary SET consultations = consultations - 1 WHERE month = substr(old.date, 1, 7);
+        DELETE FROM month_summary WHERE month = substr(old.date, 1, 7) AND consultations = 0;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS summary_consultations_update AFTER UPDATE OF date, pet_id ON consultations BEGIN
+        UPDATE pet_summary SET consultations = consultations - 1 WHERE pet_id = old.pet_id;
+        UPDATE species_summary SET consultations = consultations - 1
+            WHERE species = (SELECT species FROM pets WHERE id = old.pet_id);
+        UPDATE month_summary SET consultations = consultations - 1 WHERE month = substr(old.date, 1, 7);
+        DELETE FROM month_summary WHERE month = substr(old.date, 1, 7) AND consultations = 0;
+        UPDATE pet_summary SET consultations = consultations + 1 WHERE pet_id = new.pet_id;
+        UPDATE species_summary SET consultations = consultations + 1
+            WHERE species = (SELECT species FROM pets WHERE id = new.pet_id);
+        INSERT INTO month_summary (month, consultations) VALUES (substr(new.date, 1, 7), 1)
+            ON CONFLICT (month) DO UPDATE SET consultations = consultations + 1;
+    END
+    ''',
+]
+
+# Migraciones del esquema. La migración en la posición i lleva la base de datos
+# de la versión i a la i + 1 (guardada en PRAGMA user_version). Nunca se
+# modifica una migración publicada: los cambios se añaden al final.
+MIGRATIONS = [
+    # 1: Tablas iniciales
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS owners (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            phone TEXT NOT NULL,
+            address TEXT NOT NULL
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS pets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            species TEXT NOT NULL,
+            breed TEXT NOT NULL,
+            age INTEGER NOT NULL,
+            owner_id INTEGER NOT NULL,
+            FOREIGN KEY (owner_id) REFERENCES owners (id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS consultations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            reason TEXT NOT NULL,
+            diagnosis TEXT NOT NULL,
+            pet_id INTEGER NOT NULL,
+            FOREIGN KEY (pet_id) REFERENCES pets (id)
+        )
+        ''',
+    ],
+    # 2: Índices secundarios para las búsquedas por nombre y por clave foránea.
+    # (pet_id, date) sirve tanto para filtrar por mascota como para devolver
+    # el historial ya ordenado por fecha sin un paso de ordenación.
+    [
+        "CREATE INDEX IF NOT EXISTS idx_owners_name ON owners (name)",
+        "CREATE INDEX IF NOT EXISTS idx_pets_name ON pets (name)",
+        "CREATE INDEX IF NOT EXISTS idx_pets_owner_id ON pets (owner_id)",
+        "CREATE INDEX IF NOT EXISTS idx_consultations_pet_id_date ON consultations (pet_id, date)",
+    ],
+    # 3: Búsqueda de texto completo (FTS5) sobre motivo y diagnóstico. La tabla
+    # virtual no duplica el texto (content='consultations'); los triggers la
+    # mantienen sincronizada y 'rebuild' indexa las consultas ya existentes.
+    [
+        '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS consultations_fts USING fts5(
+            reason,
+            diagnosis,
+            content='consultations',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        ''',
+        *_CONSULTATIONS_FTS_TRIGGERS,
+        "INSERT INTO consultations_fts (consultations_fts) VALUES ('rebuild')",
+    ],
+    # 4: Borrado en cascada declarativo. SQLite no permite cambiar una clave
+    # foránea con ALTER TABLE, así que pets y consultations se reconstruyen con
+    # ON DELETE CASCADE conservando IDs y contador AUTOINCREMENT. Antes se
+    # eliminan las filas huérfanas que dejaban los borrados manuales anteriores.
+    [
+        "DELETE FROM pets WHERE owner_id NOT IN (SELECT id FROM owners)",
+        "DELETE FROM consultations WHERE pet_id NOT IN (SELECT id FROM pets)",
+        '''
+        CREATE TABLE pets_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            species TEXT NOT NULL,
+            breed TEXT NOT NULL,
+            age INTEGER NOT NULL,
+            owner_id INTEGER NOT NULL,
+            FOREIGN KEY (owner_id) REFERENCES owners (id) ON DELETE CASCADE
+        )
+        ''',
+        "UPDATE sqlite_sequence SET name = 'pets_new' WHERE name = 'pets'",
+        "INSERT INTO pets_new (id, name, species, breed, age, owner_id) SELECT id, name, species, breed, age, owner_id FROM pets",
+        "DROP TABLE pets",
+        "ALTER TABLE pets_new RENAME TO pets",
+        "CREATE INDEX idx_pets_name ON pets (name)",
+        "CREATE INDEX idx_pets_owner_id ON pets (owner_id)",
+        '''
+        CREATE TABLE consultations_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            reason TEXT NOT NULL,
+            diagnosis TEXT NOT NULL,
+            pet_id INTEGER NOT NULL,
+            FOREIGN KEY (pet_id) REFERENCES pets (id) ON DELETE CASCADE
+        )
+        ''',
+        "UPDATE sqlite_sequence SET name = 'consultations_new' WHERE name = 'consultations'",
+        "INSERT INTO consultations_new (id, date, reason, diagnosis, pet_id) SELECT id, date, reason, diagnosis, pet_id FROM consultations",
+        "DROP TABLE consultations",
+        "ALTER TABLE consultations_new RENAME TO consultations",
+        "CREATE INDEX idx_consultations_pet_id_date ON consultations (pet_id, date)",
+        *_CONSULTATIONS_FTS_TRIGGERS,
+    ],
+    # 5: Clave natural única (name, phone) en owners para resolver dueños con un
+    # upsert. Antes se fusionan los duplicados: sus mascotas pasan al dueño con
+    # el ID más bajo, que conserva su dirección. El índice único empieza por
+    # name, así que también sirve las búsquedas por nombre y sustituye al anterior.
+    [
+        '''
+        UPDATE pets SET owner_id = (
+            SELECT MIN(d.id) FROM owners o JOIN owners d ON d.name = o.name AND d.phone = o.phone
+            WHERE o.id = pets.owner_id
+        )
+        WHERE owner_id IN (
+            SELECT o.id FROM owners o
+            WHERE EXISTS (SELECT 1 FROM owners d WHERE d.name = o.name AND d.phone = o.phone AND d.id < o.id)
+        )
+        ''',
+        '''
+        DELETE FROM owners
+        WHERE EXISTS (
+            SELECT 1 FROM owners d
+            WHERE d.name = owners.name AND d.phone = owners.phone AND d.id < owners.id
+        )
+        ''',
+        "CREATE UNIQUE INDEX idx_owners_name_phone ON owners (name, phone)",
+        "DROP INDEX IF EXISTS idx_owners_name",
+    ],
+    # 6: Fechas de consulta normalizadas a DATE_FORMAT para que el orden de texto
+    # sea el cronológico, e índice sobre date para las consultas por rango. Las
+    # fechas que no se pueden interpretar se dejan como estaban (ver la 8).
+    [
+        "UPDATE consultations SET date = normalize_date(date) WHERE date IS NOT normalize_date(date)",
+        "CREATE INDEX idx_consultations_date ON consultations (date)",
+    ],
+    # 7: Tablas de resumen para los informes, rellenadas a partir de los datos
+    # existentes y mantenidas desde entonces por _SUMMARY_TRIGGERS.
+    [
+        "CREATE TABLE pet_summary (pet_id INTEGER PRIMARY KEY, consultations INTEGER NOT NULL)",
+        "CREATE TABLE owner_summary (owner_id INTEGER PRIMARY KEY, pets INTEGER NOT NULL)",
+        '''
+        CREATE TABLE species_summary (
+            species TEXT PRIMARY KEY,
+            pets INTEGER NOT NULL,
+            consultations INTEGER NOT NULL
+        ) WITHOUT ROWID
+        ''',
+        "CREATE TABLE month_summary (month TEXT PRIMARY KEY, consultations INTEGER NOT NULL) WITHOUT ROWID",
+        '''
+        INSERT INTO pet_summary (pet_id, consultations)
+        SELECT p.id, COUNT(c.id) FROM pets p LEFT JOIN consultations c ON c.pet_id = p.id GROUP BY p.id
+        ''',
+        "INSERT INTO owner_summary (owner_id, pets) SELECT owner_id, COUNT(*) FROM pets GROUP BY owner_id",
+        '''
+        INSERT INTO species_summary (species, pets, consultations)
+        SELECT p.species, COUNT(*), SUM(s.consultations)
+        FROM pets p JOIN pet_summary s ON s.pet_id = p.id
+        GROUP BY p.species
+        ''',
+        '''
+        INSERT INTO month_summary (month, consultations)
+        SELECT substr(date, 1, 7), COUNT(*) FROM consultations GROUP BY substr(date, 1, 7)
+        ''',
+        *_SUMMARY_TRIGGERS,
+    ],
+    # 8: Las consultas cuya fecha no tiene el formato DATE_FORMAT (las que la 6
+    # no pudo interpretar) se apartan a quarantined_consultations, así el resto
+    # del código puede leer cualquier fecha guardada sin comprobarla. strftime
+    # devuelve NULL o una fecha distinta si el texto no es una fecha válida.
+    [
+        '''
+        CREATE TABLE quarantined_consultations (
+            id INTEGER PRIMARY KEY,
+            date TEXT,
+            reason TEXT,
+            diagnosis TEXT,
+            pet_id INTEGER
+        )
+        ''',
+        '''
+        INSERT INTO quarantined_consultations (id, date, reason, diagnosis, pet_id)
+        SELECT id, date, reason, diagnosis, pet_id FROM consultations
+        WHERE date IS NOT strftime('%Y-%m-%d %H:%M', date)
+        ''',
+        "DELETE FROM consultations WHERE id IN (SELECT id FROM quarantined_consultations)",
+    ],
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+# Primera versión sin filas huérfanas: a partir de ella cada migración debe
+# dejar las claves foráneas íntegras (las anteriores pueden heredar huérfanos)
+FOREIGN_KEYS_CLEAN_VERSION = 4
+
+# Perfiles de ajuste que se aplican mediante PRAGMA a cada conexión nueva.
+# "performance" usa WAL para que los lectores no bloqueen al escritor y
+# synchronous=NORMAL para hacer fsync solo en los checkpoints, no en cada commit.
+PROFILES = {
+    "default": {},
+    "performance": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -65536,      # En KiB al ser negativo: 64 MiB de caché de páginas
+        "mmap_size": 268435456,    # 256 MiB de lectura por memoria mapeada
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,      # Milisegundos de espera si otro terminal escribe
+    },
+}
+
+# Variable de entorno con el perfil a usar cuando no se indica en Database(...)
+PROFILE_ENV_VAR = "CLINICA_DB_PROFILE"
+
+# Formatos de fila: "record" devuelve registros con nombre (namedtuple, ver rows.py)
+# y "tuple" las tuplas posicionales sin procesar de sqlite3
+ROW_MODES = ("record", "tuple")
+
+# Umbral por defecto (en milisegundos) a partir del cual una consulta se registra como lenta
+DEFAULT_SLOW_QUERY_MS = 100
+
+# URI de una base de datos en memoria compartida por todas las conexiones del
+# proceso que usen el mismo nombre. Existe mientras quede una conexión abierta.
+MEMORY_URI = "file:{name}?mode=memory&cache=shared"
+
+# Sufijo del archivo histórico: cada base de datos tiene el suyo junto a ella
+# ("clinica.db" -> "clinica.archive.db"), así dos bases de la misma carpeta no
+# mezclan sus historiales
+ARCHIVE_SUFFIX = ".archive.db"
+
+# Esquema del archivo histórico, que se adjunta como "archive". La tabla tiene
+# otro nombre que la principal para que los triggers TEMP, que no admiten
+# nombres cualificados, la distingan de main.consultations. No hay claves
+# foráneas entre bases de datos: el trigger TEMP borra el historial de las
+# mascotas eliminadas y descuenta sus consultas del resumen mensual.
+_ARCHIVE_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS archive.archived_consultations (
+        id INTEGER PRIMARY KEY,
+        date TEXT NOT NULL,
+        reason TEXT NOT NULL,
+        diagnosis TEXT NOT NULL,
+        pet_id INTEGER NOT NULL
+    )
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS archive.idx_archived_consultations_pet_id_date
+    ON archived_consultations (pet_id, date)
+    ''',
+    '''
+    CREATE TEMP TRIGGER IF NOT EXISTS archive_pets_delete AFTER DELETE ON main.pets BEGIN
+        UPDATE month_summary SET consultations = consultations - (
+            SELECT COUNT(*) FROM archived_consultations a
+            WHERE a.pet_id = old.id AND substr(a.date, 1, 7) = month_summary.month
+        )
+        WHERE month IN (SELECT substr(date, 1, 7) FROM archived_consultations WHERE pet_id = old.id);
+        DELETE FROM month_summary WHERE consultations = 0;
+        DELETE FROM archived_consultations WHERE pet_id = old.id;
+    END
+    ''',
+]
+
+# Páginas copiadas en cada paso de una copia de seguridad. Entre pasos se
+# libera el bloqueo de lectura, así que los escritores nunca esperan más que un paso.
+DEFAULT_BACKUP_PAGES = 256
+
+# Métodos públicos de Database que exponen las fachadas (AsyncDatabase,
+# ShardedDatabase, ConcurrentDatabase). Es la única lista: un método nuevo se
+# añade aquí y todas las fachadas lo reciben.
+
+# Métodos que modifican datos; ConcurrentDatabase los pasa por su hilo escritor
+WRITE_METHODS = (
+    "add_owner",
+    "upsert_owner",
+    "add_pet",
+    "add_consultation",
+    "add_owners_many",
+    "add_pets_many",
+    "add_consultations_many",
+    "update_owner",
+    "update_pet",
+    "delete_owner",
+    "delete_pet",
+    "delete_owners",
+    "delete_pets",
+)
+
+# Métodos que solo leen datos
+READ_METHODS = (
+    "get_owner_by_name",
+    "get_pet_by_name",
+    "get_consultations_by_pet_id",
+    "get_all_pets",
+    "get_pets_page",
+    "get_consultations_page",
+    "get_consultations_between",
+    "get_agenda",
+    "search_consultations",
+    "get_consultations_per_pet",
+    "get_consultations_per_month",
+    "get_species_summary",
+    "get_pets_per_owner",
+)
+
+# Métodos de mantenimiento. archive_consultations escribe, pero es un proceso
+# por lotes que abre sus propias transacciones, así que no pasa por el hilo
+# escritor de ConcurrentDatabase sino por la conexión de quien lo llama.
+MAINTENANCE_METHODS = (
+    "archive_consultations",
+    "backup",
+    "is_healthy",
+    "data_version",
+    "stats",
+)
+
+# Formato con el que se guardan las fechas de las consultas. Con ceros a la
+# izquierda y de mayor a menor unidad, el orden alfabético es el cronológico.
+DATE_FORMAT = "%Y-%m-%d %H:%M"
+
+# Otros formatos aceptados al normalizar fechas, además de ISO 8601
+_LEGACY_DATE_FORMATS = ("%Y-%m-%d %H:%M", "%d/%m/%Y %H:%M", "%d/%m/%Y", "%d-%m-%Y %H:%M", "%d-%m-%Y")
+
+
+def is_memory_database(db_name):
+    """
+    Indica si un nombre de base de datos corresponde a una base en memoria.
+    
+    Args:
+        db_name (str): Nombre de archivo, ":memory:" o URI "file:..."
+        
+    Returns:
+        bool: True si la base de datos no se guarda en disco
+    """
+    return db_name == ":memory:" or (db_name.startswith("file:") and "mode=memory" in db_name)
+
+
+def normalize_date(value):
+    """
+    Convierte una fecha al formato de almacenamiento DATE_FORMAT.
+    
+    Args:
+        value (str | datetime | date): Fecha en ISO 8601, en uno de los formatos
+            antiguos aceptados o como objeto; una fecha sin hora es medianoche
+            
+    Returns:
+        str: Fecha con el formato "YYYY-MM-DD HH:MM"
+        
+    Raises:
+        ValueError: Si la fecha no se puede interpretar
+    """
+    if isinstance(value, datetime):
+        return value.strftime(DATE_FORMAT)
+    if isinstance(value, date):
+        return f"{value.isoformat()} 00:00"
+    text = str(value).strip()
+    try:
+        return datetime.fromisoformat(text).strftime(DATE_FORMAT)
+    except ValueError:
+        pass
+    for fmt in _LEGACY_DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).strftime(DATE_FORMAT)
+        except ValueError:
+            continue
+    raise ValueError(f"Fecha inválida: {value}")
+
+
+def _read_only_uri(path):
+    """
+    Construye la URI para abrir un archivo existente en solo lectura.
+    
+    Args:
+        path (str): Ruta del archivo
+        
+    Returns:
+        str: URI "file:///...?mode=ro"
+    """
+    return f"{Path(path).resolve().as_uri()}?mode=ro"
+
+
+def _backup_to_file(source, target, pages_per_step, progress):
+    """
+    Copia una base de datos a un archivo con la API de backup de SQLite. Se
+    escribe primero en "<target>.tmp" y se renombra al terminar; si la copia
+    falla, el temporal se borra.
+    
+    Args:
+        source (sqlite3.Connection): Conexión de origen
+        target (str): Archivo de destino
+        pages_per_step (int): Páginas copiadas en cada paso
+        progress (callable): Función (status, remaining, total) llamada tras cada paso
+        
+    Raises:
+        sqlite3.Error: Si la copia falla
+    """
+    tmp_path = f"{target}.tmp"
+    try:
+        destination = sqlite3.connect(tmp_path)
+        try:
+            source.backup(destination, pages=pages_per_step, progress=progress)
+        finally:
+            destination.close()
+        os.replace(tmp_path, target)
+    except sqlite3.Error:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _normalize_date_sql(value):
+    """
+    Versión de normalize_date registrada como función SQL para las migraciones:
+    devuelve el valor sin cambios si no se puede interpretar.
+    
+    Args:
+        value (str): Fecha guardada
+        
+    Returns:
+        str: Fecha normalizada o el valor original
+    """
+    if value is None:
+        return None
+    try:
+        return normalize_date(value)
+    except ValueError:
+        logging.warning(f"Fecha de consulta no reconocida, se conserva: {value}")
+        return value
+
 
 class Database:
-    def __init__(self, db_name="clinica_veterinaria.db"):
+    def __init__(self, db_name="clinica_veterinaria.db", profile=None, slow_query_ms=DEFAULT_SLOW_QUERY_MS,
+                 row_mode="record", archive_name=None, read_only=False):
         """
         Inicializa la conexión a la base de datos.
+        La conexión se abre una sola vez y se reutiliza en todas las operaciones
+        hasta que se llama a close().
         
         Args:
             db_name (str): Nombre del archivo de base de datos SQLite
+            profile (str, optional): Nombre del perfil de PROFILES a aplicar. Si no se
+                indica, se lee de la variable de entorno CLINICA_DB_PROFILE o se usa "default".
+            slow_query_ms (float, optional): Umbral en milisegundos para registrar una
+                consulta como lenta junto con su plan de ejecución. None lo desactiva.
+            row_mode (str): "record" para devolver registros con nombre (rows.py), que
+                también admiten acceso por posición, o "tuple" para tuplas sin procesar
+            archive_name (str, optional): Archivo del archivo histórico; por defecto,
+                "<base>.archive.db" junto a la base de datos (sin archivo en memoria)
+            read_only (bool): Abre un archivo existente en solo lectura, sin crearlo
+                ni aplicar migraciones; el archivo histórico, si existe, también
+                se lee en solo lectura
+                
+        Raises:
+            ValueError: Si el perfil o el formato de fila no existen
+            FileNotFoundError: Si read_only es True y la base de datos no existe
         """
+        profile = profile or os.environ.get(PROFILE_ENV_VAR, "default")
+        if profile not in PROFILES:
+            raise ValueError(f"Perfil de base de datos desconocido: {profile}")
+        if row_mode not in ROW_MODES:
+            raise ValueError(f"Formato de fila desconocido: {row_mode}")
+        if archive_name is None and not is_memory_database(db_name):
+            archive_name = os.path.splitext(db_name)[0] + ARCHIVE_SUFFIX
+        if read_only:
+            if not os.path.isfile(db_name):
+                raise FileNotFoundError(f"No existe la base de datos: {db_name}")
+            db_name = _read_only_uri(db_name)
         self.db_name = db_name
+        self.profile = profile
+        self.row_mode = row_mode
+        self.read_only = read_only
+        self.archive_name = archive_name
+        # El archivo histórico solo se adjunta cuando el esquema principal existe:
+        # su trigger TEMP se define sobre main.pets
+        self._schema_ready = False
+        self.slow_query_ms = slow_query_ms
+        self.query_stats = QueryStats()
         self.conn = None
         self.cursor = None
-        self.initialize_database()
+        self._tx_depth = 0
+        if not read_only:
+            self.initialize_database()
+
+    @classmethod
+    def in_memory(cls, name=None, **options):
+        """
+        Crea una base de datos en memoria compartida (MEMORY_URI). Otras
+        instancias con el mismo nombre ven los mismos datos. La instancia
+        guarda una conexión aparte que mantiene viva la base en memoria, así
+        que close() no borra los datos y la siguiente operación los encuentra;
+        se pierden cuando se descarta la última instancia que la usa.
+        
+        Args:
+            name (str, optional): Nombre de la base en memoria; por defecto, uno único
+            **options: Argumentos adicionales para Database (profile, row_mode...)
+            
+        Returns:
+            Database: Base de datos en memoria ya inicializada
+        """
+        name = name or f"clinica-{uuid.uuid4().hex}"
+        db_name = MEMORY_URI.format(name=name)
+        holder = sqlite3.connect(db_name, uri=True, check_same_thread=False)
+        try:
+            db = cls(db_name, **options)
+        except Exception:
+            holder.close()
+            raise
+        db._memory_holder = holder
+        return db
+
+    def __enter__(self):
+        """
+        Permite usar la base de datos como gestor de contexto.
+        
+        Returns:
+            Database: La propia instancia con la conexión abierta
+        """
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        Cierra la conexión al salir del bloque with.
+        """
+        self.close()
+        return False
 
     def connect(self):
         """
         Establece la conexión con la base de datos SQLite.
-        Crea el archivo de base de datos si no existe.
+        Crea el archivo de base de datos si no existe. Si ya hay una conexión
+        abierta, la reutiliza en lugar de abrir una nueva.
+        
+        Returns:
+            sqlite3.Connection: Conexión activa
         """
+        if self.conn is not None:
+            return self.conn
         try:
-            self.conn = sqlite3.connect(self.db_name)
+            self.conn = self._open_connection()
             self.cursor = self.conn.cursor()
-            logging.info(f"Conectado a la base de datos: {self.db_name}")
+            logging.info(f"Conectado a la base de datos: {self.db_name} (perfil {self.profile})")
+            return self.conn
         except sqlite3.Error as e:
             logging.error(f"Error al conectar a la base de datos: {e}")
             raise
 
+    def _open_connection(self):
+        """
+        Abre una conexión nueva con el perfil configurado.
+        
+        Returns:
+            sqlite3.Connection: Conexión recién abierta
+        """
+        conn = sqlite3.connect(self.db_name, uri=self.db_name.startswith("file:"))
+        self._configure_connection(conn)
+        return conn
+
+    def _configure_connection(self, conn):
+        """
+        Prepara una conexión recién abierta: activa las claves foráneas (SQLite
+        las desactiva por defecto en cada conexión), aplica los PRAGMA del
+        perfil configurado y, con el esquema ya migrado, adjunta el archivo
+        histórico si existe.
+        
+        Args:
+            conn (sqlite3.Connection): Conexión a configurar
+        """
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.create_function("normalize_date", 1, _normalize_date_sql, deterministic=True)
+        for pragma, value in PROFILES[self.profile].items():
+            conn.execute(f"PRAGMA {pragma} = {value}")
+        if self._schema_ready:
+            self._ensure_archive(conn)
+
+    def _ensure_archive(self, conn=None):
+        """
+        Adjunta el archivo histórico, si existe, a una conexión que aún no lo
+        tiene. Se llama al abrir cada conexión, antes de cada transacción y antes
+        de borrar mascotas, de modo que una conexión abierta antes del primer
+        archivado también recibe el trigger que borra el historial de las
+        mascotas eliminadas. Dentro de una transacción no hace nada: ATTACH no
+        está permitido ahí.
+        
+        Args:
+            conn (sqlite3.Connection, optional): Conexión; por defecto, la actual
+        """
+        conn = conn or self.connect()
+        if self.archive_name is None or conn.in_transaction or not os.path.exists(self.archive_name):
+            return
+        self._attach_archive(conn)
+
+    def _attach_archive(self, conn=None):
+        """
+        Adjunta el archivo histórico a la conexión como "archive", creándolo si
+        no existe. En solo lectura se adjunta en solo lectura y nunca se crea.
+        
+        Args:
+            conn (sqlite3.Connection, optional): Conexión; por defecto, la actual
+            
+        Returns:
+            bool: True si el archivo histórico está adjunto, False si no hay archivo
+            
+        Raises:
+            RuntimeError: Si hay que adjuntarlo con una transacción abierta, donde
+                SQLite no permite ATTACH (el archivo se creó después de empezarla)
+        """
+        conn = conn or self.connect()
+        if any(row[1] == "archive" for row in conn.execute("PRAGMA database_list")):
+            return True
+        if self.archive_name is None or (self.read_only and not os.path.exists(self.archive_name)):
+            return False
+        if conn.in_transaction:
+            raise RuntimeError(
+                "El archivo histórico no se puede adjuntar dentro de una transacción: "
+                "use esta operación fuera de transaction() o antes de empezarla"
+            )
+        if self.read_only:
+            conn.execute("ATTACH DATABASE ? AS archive", (_read_only_uri(self.archive_name),))
+            return True
+        conn.execute("ATTACH DATABASE ? AS archive", (self.archive_name,))
+        for statement in _ARCHIVE_SCHEMA:
+            conn.execute(statement)
+        logging.info(f"Archivo histórico adjuntado: {self.archive_name}")
+        return True
+
     def close(self):
         """
         Cierra la conexión con la base de datos.
+        Una llamada posterior a cualquier operación vuelve a abrirla.
+        Antes de cerrar, vuelca en el log las estadísticas de consultas acumuladas.
         """
         if self.conn:
+            report = self.query_stats.report()
+            if report:
+                logging.info(f"Estadísticas de consultas:\n{report}")
             self.conn.close()
+            self.conn = None
+            self.cursor = None
             logging.info("Conexión a la base de datos cerrada")
 
-    def initialize_database(self):
+    def is_healthy(self):
         """
-        Inicializa la estructura de la base de datos.
-        Crea las tablas necesarias si no existen.
-        """
-        try:
-            self.connect()
-            
-            # Crear tabla de dueños
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS owners (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    phone TEXT NOT NULL,
-                    address TEXT NOT NULL
-                )
-            ''')
-
-            # Crear tabla de mascotas
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS pets (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    species TEXT NOT NULL,
-                    breed TEXT NOT NULL,
-                    age INTEGER NOT NULL,
-                    owner_id INTEGER NOT NULL,
-                    FOREIGN KEY (owner_id) REFERENCES owners (id)
-                )
-            ''')
-
-            # Crear tabla de consultas
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS consultations (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    date TEXT NOT NULL,
-                    reason TEXT NOT NULL,
-                    diagnosis TEXT NOT NULL,
-                    pet_id INTEGER NOT NULL,
-                    FOREIGN KEY (pet_id) REFERENCES pets (id)
-                )
-            ''')
+        Comprueba que la conexión está abierta y responde.
+        
+        Returns:
+            bool: True si la conexión puede ejecutar consultas
+        """
+        if self.conn is None:
+            return False
+        try:
+            self.conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error as e:
+            logging.warning(f"La conexión a la base de datos no responde: {e}")
+            return False
 
+    def ensure_healthy(self):
+        """
+        Reabre la conexión si está cerrada o ha dejado de responder.
+        
+        Returns:
+            sqlite3.Connection: Conexión activa
+        """
+        if not self.is_healthy():
+            if self.conn is not None:
+                try:
+                    self.conn.close()
+                except sqlite3.Error:
+                    pass
+                self.conn = None
+                self.cursor = None
+            logging.info("Reabriendo la conexión a la base de datos")
+        return self.connect()
+
+    def data_version(self):
+        """
+        Devuelve el sello de versión de los datos (PRAGMA data_version).
+        Cambia cada vez que otra conexión confirma cambios en la base de datos;
+        los cambios de esta misma conexión no lo modifican. Sirve para saber si
+        una copia en memoria de los datos se ha quedado desactualizada.
+        
+        Returns:
+            int: Versión de los datos vista por esta conexión
+        """
+        return self.connect().execute("PRAGMA data_version").fetchone()[0]
+
+    def backup(self, target, pages_per_step=DEFAULT_BACKUP_PAGES, progress=None, pause=0.0):
+        """
+        Copia la base de datos en caliente con la API de backup de SQLite.
+        La copia avanza por pasos de pages_per_step páginas; si otro terminal
+        escribe entre pasos, SQLite reinicia la copia para que sea coherente.
+        Cuando el destino es un archivo se escribe primero en "<target>.tmp" y
+        se renombra al terminar, así nunca queda una copia a medias. Si existe
+        el archivo histórico se copia también, después de la base principal,
+        como "<destino>.archive.db", que es el que Database adjunta al abrir la
+        copia. Una conexión de destino solo recibe la base principal.
+        
+        Args:
+            target (str | sqlite3.Connection): Archivo o conexión de destino
+            pages_per_step (int): Páginas copiadas en cada paso (-1 para todas de una vez)
+            progress (callable, optional): Función (status, remaining, total) llamada tras cada paso
+            pause (float): Segundos de espera entre pasos para repartir la carga de E/S
+            
+        Raises:
+            sqlite3.Error: Si la copia falla
+        """
+        def step(status, remaining, total):
+            if progress is not None:
+                progress(status, remaining, total)
+            if pause and remaining:
+                time.sleep(pause)
+
+        source = self.connect()
+        start = time.perf_counter()
+        try:
+            if isinstance(target, sqlite3.Connection):
+                source.backup(target, pages=pages_per_step, progress=step)
+            else:
+                _backup_to_file(source, target, pages_per_step, step)
+                # La base principal va antes: si se archivan consultas durante la
+                # copia pueden quedar en las dos copias, pero nunca en ninguna
+                if self.archive_name is not None and os.path.exists(self.archive_name):
+                    archive = sqlite3.connect(_read_only_uri(self.archive_name), uri=True)
+                    try:
+                        archive_target = os.path.splitext(target)[0] + ARCHIVE_SUFFIX
+                        _backup_to_file(archive, archive_target, pages_per_step, step)
+                    finally:
+                        archive.close()
+        except sqlite3.Error as e:
+            logging.error(f"Error al hacer la copia de seguridad: {e}")
+            raise
+        logging.info(f"Copia de seguridad completada en {time.perf_counter() - start:.2f} s: {target}")
+
+    def stats(self):
+        """
+        Devuelve las métricas acumuladas de cada sentencia ejecutada.
+        
+        Returns:
+            dict: Por cada sentencia SQL, llamadas, filas, latencia total, media,
+            máxima e histograma de latencias
+        """
+        return self.query_stats.snapshot()
+
+    def reset_stats(self):
+        """
+        Borra las métricas acumuladas de las sentencias.
+        """
+        self.query_stats.reset()
+
+    def _record(self, sql, params, start, rows):
+        """
+        Registra la ejecución de una sentencia y, si supera el umbral de
+        consulta lenta, la anota en el log junto con su plan de ejecución.
+        
+        Args:
+            sql (str): Sentencia SQL ejecutada
+            params (tuple): Parámetros con los que se ejecutó
+            start (float): Instante de inicio según time.perf_counter()
+            rows (int): Filas devueltas o modificadas
+        """
+        elapsed = time.perf_counter() - start
+        self.query_stats.record(sql, elapsed, rows)
+        if self.slow_query_ms is not None and elapsed * 1000 >= self.slow_query_ms:
+            if self.conn is None:
+                return
+            try:
+                plan = self.conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+                plan = "\n".join(f"  {row[3]}" for row in plan)
+            except sqlite3.Error as e:
+                plan = f"  (no disponible: {e})"
+            logging.warning(
+                f"Consulta lenta ({elapsed * 1000:.1f} ms, {rows} filas): {' '.join(sql.split())}\n{plan}"
+            )
+
+    def _execute(self, sql, params=()):
+        """
+        Ejecuta una sentencia sobre la conexión compartida y registra su latencia
+        y las filas modificadas.
+        
+        Args:
+            sql (str): Sentencia SQL
+            params (tuple): Parámetros de la sentencia
+            
+        Returns:
+            sqlite3.Cursor: Cursor con el resultado
+        """
+        start = time.perf_counter()
+        cursor = self.connect().execute(sql, params)
+        self._record(sql, params, start, max(cursor.rowcount, 0))
+        return cursor
+
+    def _executemany(self, sql, rows):
+        """
+        Ejecuta una sentencia una vez por fila con executemany y la registra
+        como una sola ejecución con el total de filas modificadas.
+        
+        Args:
+            sql (str): Sentencia SQL con parámetros posicionales
+            rows (list): Parámetros de cada ejecución
+            
+        Returns:
+            sqlite3.Cursor: Cursor con el resultado
+        """
+        start = time.perf_counter()
+        cursor = self.connect().executemany(sql, rows)
+        # La primera fila sirve de ejemplo para el plan si la sentencia es lenta
+        self._record(sql, rows[0] if rows else (), start, max(cursor.rowcount, 0))
+        return cursor
+
+    def _cursor(self, row_type=None, row_factory=None):
+        """
+        Crea un cursor que construye cada fila con el formato pedido.
+        
+        Args:
+            row_type (type, optional): Registro de rows.py para el modo "record"
+            row_factory (callable, optional): Función (cursor, row) que construye
+                cada fila; tiene prioridad sobre row_type y sobre el modo
+            
+        Returns:
+            sqlite3.Cursor: Cursor sin ejecutar
+        """
+        cursor = self.connect().cursor()
+        if row_factory is None and row_type is not None and self.row_mode == "record":
+            row_factory = record_factory(row_type)
+        if row_factory is not None:
+            cursor.row_factory = row_factory
+        return cursor
+
+    def _fetchone(self, sql, params=(), row_type=None):
+        """
+        Ejecuta una consulta y devuelve su primera fila, registrando su latencia.
+        
+        Args:
+            sql (str): Consulta SQL
+            params (tuple): Parámetros de la consulta
+            row_type (type, optional): Registro de rows.py para el modo "record"
+            
+        Returns:
+            tuple: Primera fila o None si no hay resultados
+        """
+        start = time.perf_counter()
+        row = self._cursor(row_type).execute(sql, params).fetchone()
+        self._record(sql, params, start, 0 if row is None else 1)
+        return row
+
+    def _fetchall(self, sql, params=(), row_type=None):
+        """
+        Ejecuta una consulta y devuelve todas sus filas, registrando su latencia.
+        
+        Args:
+            sql (str): Consulta SQL
+            params (tuple): Parámetros de la consulta
+            row_type (type, optional): Registro de rows.py para el modo "record"
+            
+        Returns:
+            list: Filas del resultado
+        """
+        start = time.perf_counter()
+        rows = self._cursor(row_type).execute(sql, params).fetchall()
+        self._record(sql, params, start, len(rows))
+        return rows
+
+    def _iter_query(self, sql, params=(), batch_size=DEFAULT_CHUNK_SIZE, row_type=None, row_factory=None):
+        """
+        Recorre el resultado de una consulta por lotes con fetchmany, sin
+        cargarlo entero en memoria.
+        
+        Args:
+            sql (str): Consulta SQL
+            params (tuple): Parámetros de la consulta
+            batch_size (int): Filas leídas en cada llamada a fetchmany
+            row_type (type, optional): Registro de rows.py para el modo "record"
+            row_factory (callable, optional): Función (cursor, row) que construye cada fila
+            
+        Yields:
+            tuple: Cada fila del resultado
+        """
+        # Solo se mide el tiempo dentro de SQLite, no el que tarda quien consume las filas
+        start = time.perf_counter()
+        cursor = self._cursor(row_type, row_factory).execute(sql, params)
+        elapsed = time.perf_counter() - start
+        total = 0
+        try:
+            while True:
+                start = time.perf_counter()
+                rows = cursor.fetchmany(batch_size)
+                elapsed += time.perf_counter() - start
+                if not rows:
+                    break
+                total += len(rows)
+                yield from rows
+        finally:
+            cursor.close()
+            self._record(sql, params, time.perf_counter() - elapsed, total)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Agrupa varias operaciones en una unidad de trabajo con un único commit.
+        
+        Las operaciones de Database ejecutadas dentro del bloque comparten la
+        transacción y no confirman por separado. Si el bloque termina sin errores
+        se hace commit; si lanza una excepción se deshace todo. Los bloques
+        anidados usan SAVEPOINT, así que un error en un bloque interno solo
+        deshace lo hecho en ese bloque si la excepción se captura fuera de él.
+        
+        Uso:
+            with db.transaction():
+                owner_id = db.add_owner(...)
+                db.add_pet(..., owner_id)
+        
+        Yields:
+            Database: La propia instancia
+        """
+        conn = self.connect()
+        if self._tx_depth == 0:
+            self._ensure_archive(conn)
+            # IMMEDIATE toma el bloqueo de escritura al empezar y evita que otro
+            # terminal escriba entre la primera lectura y la primera escritura
+            conn.execute("BEGIN IMMEDIATE")
+            self._tx_depth = 1
+            try:
+                yield self
+            except BaseException:
+                conn.rollback()
+                logging.warning("Transacción deshecha por un error")
+                raise
+            else:
+                conn.commit()
+            finally:
+                self._tx_depth = 0
+        else:
+            savepoint = f"sp_{self._tx_depth}"
+            conn.execute(f"SAVEPOINT {savepoint}")
+            self._tx_depth += 1
+            try:
+                yield self
+            except BaseException:
+                conn.execute(f"ROLLBACK TO {savepoint}")
+                conn.execute(f"RELEASE {savepoint}")
+                raise
+            else:
+                conn.execute(f"RELEASE {savepoint}")
+            finally:
+                self._tx_depth -= 1
+
+    def in_transaction(self):
+        """
+        Indica si hay una unidad de trabajo abierta con transaction().
+        
+        Returns:
+            bool: True si las operaciones no se confirman hasta cerrar el bloque
+        """
+        return self._tx_depth > 0
+
+    def _commit(self):
+        """
+        Confirma la operación actual, salvo dentro de transaction(), donde el
+        commit se hace una sola vez al cerrar el bloque.
+        """
+        if self._tx_depth == 0:
             self.conn.commit()
-            logging.info("Tablas de la base de datos inicializadas correctamente")
+
+    def _rollback(self):
+        """
+        Deshace la transacción pendiente tras un error para que la conexión
+        compartida quede limpia para la siguiente operación. Dentro de
+        transaction() no hace nada: el bloque decide al recibir la excepción.
+        """
+        if self._tx_depth == 0 and self.conn is not None and self.conn.in_transaction:
+            self.conn.rollback()
+
+    def initialize_database(self):
+        """
+        Inicializa la estructura de la base de datos.
+        Aplica las migraciones pendientes, de modo que una base de datos nueva se
+        crea con el esquema actual y una existente se actualiza en el sitio.
+        """
+        try:
+            version = self.migrate()
+            self._schema_ready = True
+            self._ensure_archive()
+            logging.info(f"Tablas de la base de datos inicializadas correctamente (versión {version})")
         except sqlite3.Error as e:
             logging.error(f"Error al inicializar la base de datos: {e}")
             raise
+
+    def migrate(self):
+        """
+        Aplica en orden las migraciones cuya versión supera PRAGMA user_version.
+        Cada migración se ejecuta en su propia transacción junto con el cambio de
+        versión, así que una migración fallida no deja el esquema a medias.
+        
+        Returns:
+            int: Versión del esquema tras aplicar las migraciones
+            
+        Raises:
+            sqlite3.DatabaseError: Si la base de datos tiene una versión más reciente
+        """
+        conn = self.connect()
+        # Las migraciones que reconstruyen tablas necesitan las claves foráneas
+        # desactivadas; solo se puede cambiar fuera de una transacción
+        conn.execute("PRAGMA foreign_keys = OFF")
+        try:
+            while True:
+                # BEGIN IMMEDIATE impide que dos terminales apliquen la misma migración
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    version = conn.execute("PRAGMA user_version").fetchone()[0]
+                    if version > SCHEMA_VERSION:
+                        raise sqlite3.DatabaseError(
+                            f"La versión del esquema ({version}) es más reciente que la soportada ({SCHEMA_VERSION})"
+                        )
+                    if version == SCHEMA_VERSION:
+                        conn.commit()
+                        return version
+                    for statement in MIGRATIONS[version]:
+                        conn.execute(statement)
+                    if (version + 1 >= FOREIGN_KEYS_CLEAN_VERSION
+                            and conn.execute("PRAGMA foreign_key_check").fetchone() is not None):
+                        raise sqlite3.IntegrityError(
+                            f"La migración a la versión {version + 1} deja claves foráneas rotas"
+                        )
+                    conn.execute(f"PRAGMA user_version = {version + 1}")
+                    conn.commit()
+                    logging.info(f"Base de datos migrada a la versión {version + 1}")
+                except sqlite3.Error:
+                    conn.rollback()
+                    raise
         finally:
-            self.close()
+            conn.execute("PRAGMA foreign_keys = ON")
 
     def add_owner(self, name, phone, address):
         """
@@ -136,20 +1260,49 @@ class Database:
             int: ID del dueño creado
         """
         try:
-            self.connect()
-            self.cursor.execute(
+            cursor = self._execute(
                 "INSERT INTO owners (name, phone, address) VALUES (?, ?, ?)",
                 (name, phone, address)
             )
-            self.conn.commit()
-            owner_id = self.cursor.lastrowid
+            self._commit()
+            owner_id = cursor.lastrowid
             logging.info(f"Nuevo dueño añadido: {name} con ID: {owner_id}")
             return owner_id
         except sqlite3.Error as e:
+            self._rollback()
             logging.error(f"Error al añadir dueño: {e}")
             raise
-        finally:
-            self.close()
+
+    def upsert_owner(self, name, phone, address):
+        """
+        Añade un dueño o, si ya existe uno con el mismo nombre y teléfono,
+        actualiza su dirección. Es una sola sentencia sobre el índice único
+        (name, phone), así que dos terminales no pueden crear el mismo dueño.
+        
+        Args:
+            name (str): Nombre del dueño
+            phone (str): Teléfono del dueño
+            address (str): Dirección del dueño
+            
+        Returns:
+            int: ID del dueño creado o existente
+        """
+        try:
+            owner_id = self._fetchone(
+                '''
+                INSERT INTO owners (name, phone, address) VALUES (?, ?, ?)
+                ON CONFLICT (name, phone) DO UPDATE SET address = excluded.address
+                RETURNING id
+                ''',
+                (name, phone, address)
+            )[0]
+            self._commit()
+            logging.info(f"Dueño registrado o actualizado: {name} con ID: {owner_id}")
+            return owner_id
+        except sqlite3.Error as e:
+            self._rollback()
+            logging.error(f"Error al registrar dueño: {e}")
+            raise
 
     def add_pet(self, name, species, breed, age, owner_id):
         """
@@ -166,49 +1319,163 @@ class Database:
             int: ID de la mascota creada
         """
         try:
-            self.connect()
-            self.cursor.execute(
+            cursor = self._execute(
                 "INSERT INTO pets (name, species, breed, age, owner_id) VALUES (?, ?, ?, ?, ?)",
                 (name, species, breed, age, owner_id)
             )
-            self.conn.commit()
-            pet_id = self.cursor.lastrowid
+            self._commit()
+            pet_id = cursor.lastrowid
             logging.info(f"Nueva mascota añadida: {name} con ID: {pet_id}")
             return pet_id
         except sqlite3.Error as e:
+            self._rollback()
             logging.error(f"Error al añadir mascota: {e}")
             raise
-        finally:
-            self.close()
 
     def add_consultation(self, date, reason, diagnosis, pet_id):
         """
         Añade una nueva consulta a la base de datos.
         
         Args:
-            date (str): Fecha y hora de la consulta
+            date (str | datetime): Fecha y hora de la consulta; se guarda con DATE_FORMAT
             reason (str): Motivo de la consulta
             diagnosis (str): Diagnóstico realizado
             pet_id (int): ID de la mascota
             
         Returns:
             int: ID de la consulta creada
+            
+        Raises:
+            ValueError: Si la fecha no se puede interpretar
         """
+        date = normalize_date(date)
         try:
-            self.connect()
-            self.cursor.execute(
+            cursor = self._execute(
                 "INSERT INTO consultations (date, reason, diagnosis, pet_id) VALUES (?, ?, ?, ?)",
                 (date, reason, diagnosis, pet_id)
             )
-            self.conn.commit()
-            consultation_id = self.cursor.lastrowid
+            self._commit()
+            consultation_id = cursor.lastrowid
             logging.info(f"Nueva consulta añadida para mascota ID: {pet_id}")
             return consultation_id
         except sqlite3.Error as e:
+            self._rollback()
             logging.error(f"Error al añadir consulta: {e}")
             raise
-        finally:
-            self.close()
+
+    def _insert_many(self, sql, rows, chunk_size):
+        """
+        Inserta filas por bloques con executemany dentro de una única transacción
+        (o dentro de la unidad de trabajo abierta con transaction()).
+        
+        Las tablas usan AUTOINCREMENT y la transacción mantiene el bloqueo de
+        escritura desde el primer INSERT hasta el commit, por lo que los IDs de
+        cada bloque son consecutivos y terminan en last_insert_rowid().
+        
+        Cualquier excepción deshace los bloques ya insertados, también las que no
+        vienen de SQLite (p. ej. un ValueError del generador de filas a mitad de
+        la carga), para no dejar filas sueltas en una transacción abierta.
+        
+        Args:
+            sql (str): Sentencia INSERT con parámetros posicionales
+            rows (iterable): Filas a insertar (puede ser un generador)
+            chunk_size (int): Número de filas por llamada a executemany
+            
+        Returns:
+            list: IDs generados, en el mismo orden que las filas
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size debe ser mayor que cero")
+        conn = self.connect()
+        rows = iter(rows)
+        ids = []
+        try:
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                self._executemany(sql, chunk)
+                last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                ids.extend(range(last_id - len(chunk) + 1, last_id + 1))
+        except Exception:
+            self._rollback()
+            raise
+        self._commit()
+        return ids
+
+    def add_owners_many(self, owners, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Añade varios dueños en una sola transacción.
+        
+        Args:
+            owners (iterable): Tuplas (name, phone, address)
+            chunk_size (int): Número de filas por llamada a executemany
+            
+        Returns:
+            list: IDs de los dueños creados, en el orden de entrada
+        """
+        try:
+            owner_ids = self._insert_many(
+                "INSERT INTO owners (name, phone, address) VALUES (?, ?, ?)",
+                owners, chunk_size
+            )
+            logging.info(f"Añadidos {len(owner_ids)} dueños en bloque")
+            return owner_ids
+        except sqlite3.Error as e:
+            self._rollback()
+            logging.error(f"Error al añadir dueños en bloque: {e}")
+            raise
+
+    def add_pets_many(self, pets, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Añade varias mascotas en una sola transacción.
+        
+        Args:
+            pets (iterable): Tuplas (name, species, breed, age, owner_id)
+            chunk_size (int): Número de filas por llamada a executemany
+            
+        Returns:
+            list: IDs de las mascotas creadas, en el orden de entrada
+        """
+        try:
+            pet_ids = self._insert_many(
+                "INSERT INTO pets (name, species, breed, age, owner_id) VALUES (?, ?, ?, ?, ?)",
+                pets, chunk_size
+            )
+            logging.info(f"Añadidas {len(pet_ids)} mascotas en bloque")
+            return pet_ids
+        except sqlite3.Error as e:
+            self._rollback()
+            logging.error(f"Error al añadir mascotas en bloque: {e}")
+            raise
+
+    def add_consultations_many(self, consultations, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Añade varias consultas en una sola transacción.
+        
+        Args:
+            consultations (iterable): Tuplas (date, reason, diagnosis, pet_id)
+            chunk_size (int): Número de filas por llamada a executemany
+            
+        Returns:
+            list: IDs de las consultas creadas, en el orden de entrada
+            
+        Raises:
+            ValueError: Si alguna fecha no se puede interpretar (no se guarda ninguna)
+        """
+        try:
+            consultation_ids = self._insert_many(
+                "INSERT INTO consultations (date, reason, diagnosis, pet_id) VALUES (?, ?, ?, ?)",
+                ((normalize_date(when), reason, diagnosis, pet_id)
+                 for when, reason, diagnosis, pet_id in consultations),
+                chunk_size
+            )
+            logging.info(f"Añadidas {len(consultation_ids)} consultas en bloque")
+            return consultation_ids
+        except (sqlite3.Error, ValueError) as e:
+            self._rollback()
+            logging.error(f"Error al añadir consultas en bloque: {e}")
+            raise
 
     def get_owner_by_name(self, name):
         """
@@ -218,18 +1485,14 @@ class Database:
             name (str): Nombre del dueño
             
         Returns:
-            tuple: Datos del dueño o None si no se encuentra
+            OwnerRow: Datos del dueño o None si no se encuentra
         """
         try:
-            self.connect()
-            self.cursor.execute("SELECT * FROM owners WHERE name = ?", (name,))
-            owner = self.cursor.fetchone()
+            owner = self._fetchone("SELECT * FROM owners WHERE name = ?", (name,), OwnerRow)
             return owner
         except sqlite3.Error as e:
             logging.error(f"Error al obtener dueño: {e}")
             raise
-        finally:
-            self.close()
 
     def get_pet_by_name(self, name):
         """
@@ -239,61 +1502,384 @@ class Database:
             name (str): Nombre de la mascota
             
         Returns:
-            tuple: Datos de la mascota o None si no se encuentra
+            PetRow: Datos de la mascota o None si no se encuentra
         """
         try:
-            self.connect()
-            self.cursor.execute("SELECT * FROM pets WHERE name = ?", (name,))
-            pet = self.cursor.fetchone()
+            pet = self._fetchone("SELECT * FROM pets WHERE name = ?", (name,), PetRow)
             return pet
         except sqlite3.Error as e:
             logging.error(f"Error al obtener mascota: {e}")
             raise
-        finally:
-            self.close()
 
-    def get_consultations_by_pet_id(self, pet_id):
+    def get_consultations_by_pet_id(self, pet_id, include_archive=False):
         """
         Obtiene todas las consultas de una mascota específica.
         
         Args:
             pet_id (int): ID de la mascota
+            include_archive (bool): Incluir también las consultas archivadas
             
         Returns:
-            list: Lista de consultas de la mascota
+            list: ConsultationRow de la mascota ordenadas por fecha
         """
         try:
-            self.connect()
-            self.cursor.execute("SELECT * FROM consultations WHERE pet_id = ?", (pet_id,))
-            consultations = self.cursor.fetchall()
+            if include_archive and self.archive_name is not None and os.path.exists(self.archive_name):
+                self._attach_archive()
+                return self._fetchall('''
+                    SELECT * FROM archived_consultations WHERE pet_id = ?
+                    UNION ALL
+                    SELECT * FROM consultations WHERE pet_id = ?
+                    ORDER BY date, id
+                ''', (pet_id, pet_id), ConsultationRow)
+            consultations = self._fetchall(
+                "SELECT * FROM consultations WHERE pet_id = ? ORDER BY date, id", (pet_id,), ConsultationRow
+            )
             return consultations
         except sqlite3.Error as e:
             logging.error(f"Error al obtener consultas: {e}")
             raise
-        finally:
-            self.close()
+
+    def iter_owners_with_pets(self, batch_size=DEFAULT_CHUNK_SIZE, row_factory=None):
+        """
+        Recorre todos los dueños con sus mascotas en una sola consulta,
+        ordenados por ID de dueño y de mascota. Los dueños sin mascotas
+        aparecen una vez con los campos de mascota a None.
+        
+        Args:
+            batch_size (int): Filas leídas en cada llamada a fetchmany
+            row_factory (callable, optional): Función (cursor, row) para construir
+                directamente los objetos de cada fila en lugar de OwnerWithPetRow
+            
+        Yields:
+            OwnerWithPetRow: (owner_id, owner_name, phone, address, pet_id, pet_name, species, breed, age)
+        """
+        try:
+            yield from self._iter_query('''
+                SELECT o.id, o.name, o.phone, o.address, p.id, p.name, p.species, p.breed, p.age
+                FROM owners o
+                LEFT JOIN pets p ON p.owner_id = o.id
+                ORDER BY o.id, p.id
+            ''', batch_size=batch_size, row_type=OwnerWithPetRow, row_factory=row_factory)
+        except sqlite3.Error as e:
+            logging.error(f"Error al recorrer dueños y mascotas: {e}")
+            raise
+
+    def iter_all_consultations(self, batch_size=DEFAULT_CHUNK_SIZE, row_factory=None):
+        """
+        Recorre todas las consultas en una sola consulta, agrupadas por
+        mascota y en orden de inserción dentro de cada una.
+        
+        Args:
+            batch_size (int): Filas leídas en cada llamada a fetchmany
+            row_factory (callable, optional): Función (cursor, row) para construir
+                directamente los objetos de cada fila (p. ej. Consultation) en
+                lugar de ConsultationRow
+            
+        Yields:
+            ConsultationRow: (id, date, reason, diagnosis, pet_id)
+        """
+        try:
+            yield from self._iter_query('''
+                SELECT id, date, reason, diagnosis, pet_id
+                FROM consultations
+                ORDER BY pet_id, id
+            ''', batch_size=batch_size, row_type=ConsultationRow, row_factory=row_factory)
+        except sqlite3.Error as e:
+            logging.error(f"Error al recorrer consultas: {e}")
+            raise
+
+    def get_pets_page(self, after_id=0, limit=DEFAULT_PAGE_SIZE, species=None, owner_id=None):
+        """
+        Obtiene una página de mascotas con la información de sus dueños.
+        Usa paginación por clave (id > after_id), así que cada página cuesta lo
+        mismo sin importar cuántas se hayan leído antes.
+        
+        Args:
+            after_id (int): ID de la última mascota de la página anterior (0 para la primera)
+            limit (int): Número máximo de mascotas de la página
+            species (str, optional): Filtrar por especie
+            owner_id (int, optional): Filtrar por dueño
+            
+        Returns:
+            list: PetWithOwnerRow con ID mayor que after_id, ordenadas por ID, con el
+            mismo formato de fila que get_all_pets
+        """
+        conditions = ["p.id > ?"]
+        params = [after_id]
+        if species is not None:
+            conditions.append("p.species = ?")
+            params.append(species)
+        if owner_id is not None:
+            conditions.append("p.owner_id = ?")
+            params.append(owner_id)
+        params.append(limit)
+        try:
+            return self._fetchall(f'''
+                SELECT p.*, o.name as owner_name, o.phone, o.address 
+                FROM pets p 
+                JOIN owners o ON p.owner_id = o.id
+                WHERE {" AND ".join(conditions)}
+                ORDER BY p.id
+                LIMIT ?
+            ''', params, PetWithOwnerRow)
+        except sqlite3.Error as e:
+            logging.error(f"Error al obtener página de mascotas: {e}")
+            raise
+
+    def iter_pets(self, batch_size=DEFAULT_PAGE_SIZE, species=None, owner_id=None):
+        """
+        Recorre las mascotas con la información de sus dueños página a página.
+        Entre páginas no queda ningún cursor abierto.
+        
+        Args:
+            batch_size (int): Mascotas leídas por página
+            species (str, optional): Filtrar por especie
+            owner_id (int, optional): Filtrar por dueño
+            
+        Yields:
+            tuple: Cada mascota con el formato de fila de get_all_pets
+        """
+        after_id = 0
+        while True:
+            page = self.get_pets_page(after_id, batch_size, species=species, owner_id=owner_id)
+            yield from page
+            if len(page) < batch_size:
+                break
+            after_id = page[-1][0]
+
+    def get_consultations_page(self, after_id=0, limit=DEFAULT_PAGE_SIZE, pet_id=None):
+        """
+        Obtiene una página de consultas usando paginación por clave.
+        
+        Args:
+            after_id (int): ID de la última consulta de la página anterior (0 para la primera)
+            limit (int): Número máximo de consultas de la página
+            pet_id (int, optional): Filtrar por mascota
+            
+        Returns:
+            list: ConsultationRow con ID mayor que after_id, ordenadas por ID
+        """
+        conditions = ["id > ?"]
+        params = [after_id]
+        if pet_id is not None:
+            conditions.append("pet_id = ?")
+            params.append(pet_id)
+        params.append(limit)
+        try:
+            return self._fetchall(f'''
+                SELECT * FROM consultations
+                WHERE {" AND ".join(conditions)}
+                ORDER BY id
+                LIMIT ?
+            ''', params, ConsultationRow)
+        except sqlite3.Error as e:
+            logging.error(f"Error al obtener página de consultas: {e}")
+            raise
+
+    def iter_consultations(self, batch_size=DEFAULT_PAGE_SIZE, pet_id=None):
+        """
+        Recorre las consultas página a página.
+        
+        Args:
+            batch_size (int): Consultas leídas por página
+            pet_id (int, optional): Filtrar por mascota
+            
+        Yields:
+            tuple: Cada consulta
+        """
+        after_id = 0
+        while True:
+            page = self.get_consultations_page(after_id, batch_size, pet_id=pet_id)
+            yield from page
+            if len(page) < batch_size:
+                break
+            after_id = page[-1][0]
+
+    def get_consultations_between(self, start, end):
+        """
+        Obtiene las consultas con fecha en el intervalo [start, end).
+        Recorre solo ese tramo del índice sobre date.
+        
+        Args:
+            start (str | datetime | date): Inicio del intervalo, incluido
+            end (str | datetime | date): Fin del intervalo, excluido
+            
+        Returns:
+            list: ConsultationRow ordenadas por fecha
+            
+        Raises:
+            ValueError: Si alguno de los límites no es una fecha válida
+        """
+        try:
+            return self._fetchall('''
+                SELECT * FROM consultations
+                WHERE date >= ? AND date < ?
+                ORDER BY date, id
+            ''', (normalize_date(start), normalize_date(end)), ConsultationRow)
+        except sqlite3.Error as e:
+            logging.error(f"Error al obtener consultas por fechas: {e}")
+            raise
+
+    def get_agenda(self, day=None):
+        """
+        Obtiene la agenda de un día: sus consultas con la mascota y el dueño.
+        
+        Args:
+            day (str | date, optional): Día a consultar; por defecto, hoy
+            
+        Returns:
+            list: AgendaRow (id, date, reason, diagnosis, pet_id, pet_name,
+            owner_name, phone) ordenadas por hora
+            
+        Raises:
+            ValueError: Si el día no es una fecha válida
+        """
+        if day is None:
+            day = date.today()
+        elif not isinstance(day, date):
+            day = datetime.strptime(normalize_date(day), DATE_FORMAT).date()
+        elif isinstance(day, datetime):
+            day = day.date()
+        try:
+            return self._fetchall('''
+                SELECT c.id, c.date, c.reason, c.diagnosis, c.pet_id, p.name, o.name, o.phone
+                FROM consultations c
+                JOIN pets p ON p.id = c.pet_id
+                JOIN owners o ON o.id = p.owner_id
+                WHERE c.date >= ? AND c.date < ?
+                ORDER BY c.date, c.id
+            ''', (normalize_date(day), normalize_date(day + timedelta(days=1))), AgendaRow)
+        except sqlite3.Error as e:
+            logging.error(f"Error al obtener la agenda: {e}")
+            raise
+
+    def search_consultations(self, query, limit=20, raw=False):
+        """
+        Busca consultas por texto en el motivo y el diagnóstico usando el índice
+        de texto completo, ordenadas por relevancia (bm25).
+        
+        Args:
+            query (str): Texto a buscar. Por defecto cada palabra se busca tal cual
+                y deben aparecer todas (no distingue mayúsculas ni tildes).
+            limit (int): Número máximo de resultados
+            raw (bool): Si es True, query se pasa sin modificar como expresión
+                de búsqueda FTS5 (OR, NOT, prefijos con *, frases...)
+            
+        Returns:
+            list: ConsultationMatchRow (id, date, reason, diagnosis, pet_id, pet_name), de más
+            a menos relevante
+        """
+        if not raw:
+            # Entrecomillar cada palabra evita que signos como - o : se
+            # interpreten como operadores de la sintaxis FTS5
+            query = " ".join('"' + word.replace('"', '""') + '"' for word in query.split())
+        if not query:
+            return []
+        try:
+            return self._fetchall('''
+                SELECT c.id, c.date, c.reason, c.diagnosis, c.pet_id, p.name
+                FROM consultations_fts f
+                JOIN consultations c ON c.id = f.rowid
+                JOIN pets p ON p.id = c.pet_id
+                WHERE consultations_fts MATCH ?
+                ORDER BY f.rank
+                LIMIT ?
+            ''', (query, limit), ConsultationMatchRow)
+        except sqlite3.Error as e:
+            logging.error(f"Error al buscar consultas por texto: {e}")
+            raise
 
     def get_all_pets(self):
         """
         Obtiene todas las mascotas con la información de sus dueños.
+        Carga el resultado completo en memoria; para listados grandes es
+        preferible iter_pets o get_pets_page.
         
         Returns:
-            list: Lista de mascotas con información de dueños
+            list: PetWithOwnerRow con la información de sus dueños
         """
         try:
-            self.connect()
-            self.cursor.execute('''
+            pets = self._fetchall('''
                 SELECT p.*, o.name as owner_name, o.phone, o.address 
                 FROM pets p 
                 JOIN owners o ON p.owner_id = o.id
-            ''')
-            pets = self.cursor.fetchall()
+            ''', row_type=PetWithOwnerRow)
             return pets
         except sqlite3.Error as e:
             logging.error(f"Error al obtener todas las mascotas: {e}")
             raise
-        finally:
-            self.close()
+
+    def get_consultations_per_pet(self, limit=None):
+        """
+        Informe de consultas por mascota, de la más atendida a la menos.
+        Lee pet_summary, así que no recorre el historial de consultas.
+        
+        Args:
+            limit (int, optional): Número máximo de mascotas a devolver
+            
+        Returns:
+            list: PetConsultationsRow (pet_id, pet_name, consultations)
+        """
+        try:
+            return self._fetchall('''
+                SELECT p.id, p.name, s.consultations
+                FROM pet_summary s
+                JOIN pets p ON p.id = s.pet_id
+                ORDER BY s.consultations DESC, p.id
+                LIMIT ?
+            ''', (-1 if limit is None else limit,), PetConsultationsRow)
+        except sqlite3.Error as e:
+            logging.error(f"Error al obtener consultas por mascota: {e}")
+            raise
+
+    def get_consultations_per_month(self):
+        """
+        Informe de consultas por mes.
+        
+        Returns:
+            list: MonthConsultationsRow (month, consultations) ordenadas por mes
+        """
+        try:
+            return self._fetchall(
+                "SELECT month, consultations FROM month_summary ORDER BY month", row_type=MonthConsultationsRow
+            )
+        except sqlite3.Error as e:
+            logging.error(f"Error al obtener consultas por mes: {e}")
+            raise
+
+    def get_species_summary(self):
+        """
+        Informe de mascotas y consultas por especie.
+        
+        Returns:
+            list: SpeciesSummaryRow (species, pets, consultations) ordenadas por especie
+        """
+        try:
+            return self._fetchall(
+                "SELECT species, pets, consultations FROM species_summary ORDER BY species",
+                row_type=SpeciesSummaryRow
+            )
+        except sqlite3.Error as e:
+            logging.error(f"Error al obtener el resumen por especie: {e}")
+            raise
+
+    def get_pets_per_owner(self):
+        """
+        Informe de mascotas por dueño. Los dueños sin mascotas aparecen con 0.
+        
+        Returns:
+            list: OwnerPetsRow (owner_id, owner_name, pets) ordenadas por ID de dueño
+        """
+        try:
+            return self._fetchall('''
+                SELECT o.id, o.name, COALESCE(s.pets, 0)
+                FROM owners o
+                LEFT JOIN owner_summary s ON s.owner_id = o.id
+                ORDER BY o.id
+            ''', row_type=OwnerPetsRow)
+        except sqlite3.Error as e:
+            logging.error(f"Error al obtener mascotas por dueño: {e}")
+            raise
 
     def update_owner(self, owner_id, name, phone, address):
         """
@@ -306,18 +1892,16 @@ class Database:
             address (str): Nueva dirección
         """
         try:
-            self.connect()
-            self.cursor.execute(
+            self._execute(
                 "UPDATE owners SET name = ?, phone = ?, address = ? WHERE id = ?",
                 (name, phone, address, owner_id)
             )
-            self.conn.commit()
+            self._commit()
             logging.info(f"Dueño actualizado con ID: {owner_id}")
         except sqlite3.Error as e:
+            self._rollback()
             logging.error(f"Error al actualizar dueño: {e}")
             raise
-        finally:
-            self.close()
 
     def update_pet(self, pet_id, name, species, breed, age, owner_id):
         """
@@ -332,57 +1916,172 @@ class Database:
             owner_id (int): Nuevo ID del dueño
         """
         try:
-            self.connect()
-            self.cursor.execute(
+            self._execute(
                 "UPDATE pets SET name = ?, species = ?, breed = ?, age = ?, owner_id = ? WHERE id = ?",
                 (name, species, breed, age, owner_id, pet_id)
             )
-            self.conn.commit()
+            self._commit()
             logging.info(f"Mascota actualizada con ID: {pet_id}")
         except sqlite3.Error as e:
+            self._rollback()
             logging.error(f"Error al actualizar mascota: {e}")
             raise
-        finally:
-            self.close()
 
     def delete_owner(self, owner_id):
         """
-        Elimina un dueño y sus mascotas asociadas.
+        Elimina un dueño con sus mascotas y las consultas de estas
+        (ON DELETE CASCADE).
         
         Args:
             owner_id (int): ID del dueño a eliminar
         """
         try:
-            self.connect()
-            # Primero eliminar mascotas asociadas
-            self.cursor.execute("DELETE FROM pets WHERE owner_id = ?", (owner_id,))
-            # Luego eliminar el dueño
-            self.cursor.execute("DELETE FROM owners WHERE id = ?", (owner_id,))
-            self.conn.commit()
+            self._ensure_archive()
+            self._execute("DELETE FROM owners WHERE id = ?", (owner_id,))
+            self._commit()
             logging.info(f"Dueño eliminado con ID: {owner_id}")
         except sqlite3.Error as e:
+            self._rollback()
             logging.error(f"Error al eliminar dueño: {e}")
             raise
-        finally:
-            self.close()
 
     def delete_pet(self, pet_id):
         """
-        Elimina una mascota y sus consultas asociadas.
+        Elimina una mascota y sus consultas asociadas (ON DELETE CASCADE).
         
         Args:
             pet_id (int): ID de la mascota a eliminar
         """
         try:
-            self.connect()
-            # Primero eliminar consultas asociadas
-            self.cursor.execute("DELETE FROM consultations WHERE pet_id = ?", (pet_id,))
-            # Luego eliminar la mascota
-            self.cursor.execute("DELETE FROM pets WHERE id = ?", (pet_id,))
-            self.conn.commit()
+            self._ensure_archive()
+            self._execute("DELETE FROM pets WHERE id = ?", (pet_id,))
+            self._commit()
             logging.info(f"Mascota eliminada con ID: {pet_id}")
         except sqlite3.Error as e:
+            self._rollback()
             logging.error(f"Error al eliminar mascota: {e}")
             raise
-        finally:
-            self.close() 
\ No newline at end of file
+
+    def delete_owners(self, owner_ids):
+        """
+        Elimina varios dueños, con sus mascotas y consultas, en una sola sentencia.
+        Los IDs se pasan como un único parámetro JSON, así que no hay límite de
+        variables por sentencia.
+        
+        Args:
+            owner_ids (iterable): IDs de los dueños a eliminar
+            
+        Returns:
+            int: Número de dueños eliminados
+        """
+        try:
+            self._ensure_archive()
+            cursor = self._execute(
+                "DELETE FROM owners WHERE id IN (SELECT value FROM json_each(?))",
+                (json.dumps(list(owner_ids)),)
+            )
+            self._commit()
+            logging.info(f"Eliminados {cursor.rowcount} dueños en bloque")
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            self._rollback()
+            logging.error(f"Error al eliminar dueños en bloque: {e}")
+            raise
+
+    def delete_pets(self, pet_ids):
+        """
+        Elimina varias mascotas, con sus consultas, en una sola sentencia.
+        
+        Args:
+            pet_ids (iterable): IDs de las mascotas a eliminar
+            
+        Returns:
+            int: Número de mascotas eliminadas
+        """
+        try:
+            self._ensure_archive()
+            cursor = self._execute(
+                "DELETE FROM pets WHERE id IN (SELECT value FROM json_each(?))",
+                (json.dumps(list(pet_ids)),)
+            )
+            self._commit()
+            logging.info(f"Eliminadas {cursor.rowcount} mascotas en bloque")
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            self._rollback()
+            logging.error(f"Error al eliminar mascotas en bloque: {e}")
+            raise
+
+    def archive_consultations(self, before, batch_size=DEFAULT_CHUNK_SIZE):
+        """
+        Mueve al archivo histórico las consultas anteriores a una fecha.
+        Se mueven por lotes, cada uno en su propia transacción, para no
+        bloquear a los demás terminales durante todo el proceso. Los informes
+        de resumen siguen contando las consultas archivadas; la búsqueda de
+        texto completo solo cubre las consultas que quedan en la base principal.
+        
+        Args:
+            before (str | datetime | date): Fecha de corte; se archivan las anteriores
+            batch_size (int): Consultas movidas por transacción
+            
+        Returns:
+            int: Número de consultas archivadas
+            
+        Raises:
+            ValueError: Si la fecha no es válida o la base de datos no tiene archivo histórico
+        """
+        cutoff = normalize_date(before)
+        if batch_size < 1:
+            raise ValueError("batch_size debe ser mayor que cero")
+        if not self._attach_archive():
+            raise ValueError("La base de datos no tiene archivo histórico")
+        moved = 0
+        try:
+            while True:
+                with self.transaction():
+                    rows = self._fetchall(
+                        "SELECT id, date, pet_id FROM consultations WHERE date < ? ORDER BY date, id LIMIT ?",
+                        (cutoff, batch_size)
+                    )
+                    if rows:
+                        ids = (json.dumps([row[0] for row in rows]),)
+                        self._execute('''
+                            INSERT INTO archived_consultations (id, date, reason, diagnosis, pet_id)
+                            SELECT id, date, reason, diagnosis, pet_id FROM consultations
+                            WHERE id IN (SELECT value FROM json_each(?))
+                        ''', ids)
+                        self._execute("DELETE FROM consultations WHERE id IN (SELECT value FROM json_each(?))", ids)
+                        self._restore_summaries(rows)
+                moved += len(rows)
+                if len(rows) < batch_size:
+                    break
+            logging.info(f"Archivadas {moved} consultas anteriores a {cutoff}")
+            return moved
+        except sqlite3.Error as e:
+            logging.error(f"Error al archivar consultas: {e}")
+            raise
+
+    def _restore_summaries(self, rows):
+        """
+        Vuelve a sumar en los resúmenes las consultas recién archivadas, que los
+        triggers de borrado de consultations acaban de descontar.
+        
+        Args:
+            rows (list): Filas (id, date, pet_id) de las consultas archivadas
+        """
+        per_pet = Counter(row[2] for row in rows)
+        per_month = Counter(row[1][:7] for row in rows)
+        self._executemany(
+            "UPDATE pet_summary SET consultations = consultations + ? WHERE pet_id = ?",
+            [(count, pet_id) for pet_id, count in per_pet.items()]
+        )
+        self._executemany(
+            "UPDATE species_summary SET consultations = consultations + ? "
+            "WHERE species = (SELECT species FROM pets WHERE id = ?)",
+            [(count, pet_id) for pet_id, count in per_pet.items()]
+        )
+        self._executemany(
+            "INSERT INTO month_summary (month, consultations) VALUES (?, ?) "
+            "ON CONFLICT (month) DO UPDATE SET consultations = consultations + excluded.consultations",
+            list(per_month.items())
+        ) 
\ No newline at end of file
@@ -0,0 +1,116 @@
+"""
+Módulo de Datos de Ejemplo para la Clínica Veterinaria
+
+Este módulo genera datos realistas en volumen para pruebas, bancos de pruebas
+y demostraciones. Los datos se insertan con las altas masivas de Database
+(executemany en una sola transacción), por lo que miles de filas se cargan en
+milisegundos, sobre todo en una base de datos en memoria:
+
+    db = Database.in_memory()
+    seeded = seed_clinic(db, owners=1000, pets_per_owner=2, consultations_per_pet=5)
+
+Los datos son deterministas para una misma semilla: nombres de dueños y
+mascotas únicos formados solo por letras y espacios, especies y razas
+variadas y consultas repartidas a lo largo de un año.
+"""
+
+import random
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+# IDs de las filas creadas por seed_clinic, en orden de inserción
+SeedResult = namedtuple("SeedResult", "owner_ids pet_ids consultation_ids")
+
+FIRST_NAMES = ("Ana", "Luis", "Marta", "Pedro", "Lucia", "Carlos", "Elena", "Jorge", "Sara", "Pablo")
+LAST_NAMES = ("Garcia", "Lopez", "Martin", "Sanchez", "Perez", "Gomez", "Ruiz", "Diaz", "Moreno", "Alonso")
+PET_NAMES = ("Rex", "Misu", "Toby", "Luna", "Coco", "Nala", "Simba", "Kira", "Bruno", "Lola")
+BREEDS = {
+    "Perro": ("Beagle", "Labrador", "Mestizo", "Caniche"),
+    "Gato": ("Persa", "Siames", "Comun Europeo"),
+    "Conejo": ("Belier", "Enano"),
+}
+VISITS = (
+    ("Vacuna anual", "Sano"),
+    ("Chequeo general", "Sano"),
+    ("Picor de oidos", "Otitis externa"),
+    ("Cojera", "Esguince leve"),
+    ("Vomitos", "Gastritis"),
+    ("Caida de pelo", "Dermatitis"),
+)
+
+# Primer día de las consultas generadas
+START_DATE = datetime(2025, 1, 1, 9, 0)
+
+
+def unique_name(base, index, width=3):
+    """
+    Genera un nombre único formado solo por letras: el índice se escribe en
+    base 26 con letras mayúsculas (0 -> "AAA", 1 -> "AAB"...).
+
+    Args:
+        base (str): Parte legible del nombre
+        index (int): Número que hace único el nombre
+        width (int): Número mínimo de letras del sufijo
+
+    Returns:
+        str: Nombre con el sufijo alfabético
+    """
+    letters = []
+    while index or len(letters) < width:
+        index, remainder = divmod(index, 26)
+        letters.append(chr(ord("A") + remainder))
+    return f"{base} {''.join(reversed(letters))}"
+
+
+def seed_clinic(db, owners=100, pets_per_owner=2, consultations_per_pet=3, seed=0,
+                chunk_size=None):
+    """
+    Inserta dueños, mascotas y consultas de ejemplo.
+
+    Args:
+        db (Database): Base de datos de destino
+        owners (int): Número de dueños
+        pets_per_owner (int): Mascotas por dueño
+        consultations_per_pet (int): Consultas por mascota
+        seed (int): Semilla del generador aleatorio
+        chunk_size (int, optional): Filas por executemany; por defecto, el de Database
+
+    Returns:
+        SeedResult: IDs de los dueños, mascotas y consultas creados
+    """
+    rng = random.Random(seed)
+    options = {} if chunk_size is None else {"chunk_size": chunk_size}
+    species = list(BREEDS)
+
+    def owner_rows():
+        for i in range(owners):
+            yield (
+                unique_name(f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", i),
+                f"6{rng.randrange(10 ** 8):08d}",
+                f"Calle {rng.choice(LAST_NAMES)} {rng.randrange(1, 200)}",
+            )
+
+    owner_ids = db.add_owners_many(owner_rows(), **options)
+
+    def pet_rows():
+        for i in range(owners * pets_per_owner):
+            kind = rng.choice(species)
+            yield (
+                unique_name(rng.choice(PET_NAMES), i),
+                kind,
+                rng.choice(BREEDS[kind]),
+                rng.randrange(0, 16),
+                owner_ids[i // pets_per_owner],
+            )
+
+    pet_ids = db.add_pets_many(pet_rows(), **options)
+
+    def consultation_rows():
+        for pet_id in pet_ids:
+            for _ in range(consultations_per_pet):
+                reason, diagnosis = rng.choice(VISITS)
+                when = START_DATE + timedelta(days=rng.randrange(365), minutes=15 * rng.randrange(40))
+                yield (when, reason, diagnosis, pet_id)
+
+    consultation_ids = db.add_consultations_many(consultation_rows(), **options)
+    return SeedResult(owner_ids, pet_ids, consultation_ids)
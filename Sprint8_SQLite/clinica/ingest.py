@@ -0,0 +1,193 @@
+"""
+Módulo de Carga por Lotes para la Clínica Veterinaria
+
+Este módulo carga mascotas o consultas desde un archivo CSV o JSONL sin pasar
+por el menú interactivo:
+
+    result = ingest_file(clinic, "mascotas.csv", "pets")
+    print(f"{result.accepted} filas a {result.rows_per_second:.0f} filas/s")
+
+Funcionamiento:
+- El archivo se lee como un flujo, fila a fila, sin cargarlo entero en memoria
+- Las filas se agrupan en lotes: primero se valida todo el lote y después las
+  filas válidas se guardan en una sola transacción (un commit por lote)
+- Cada fila se guarda en su propio SAVEPOINT, así que un error de la base de
+  datos solo rechaza esa fila
+- Las filas rechazadas se escriben en un archivo JSONL con su número de línea
+  y el motivo del rechazo
+
+Columnas de cada tipo de registro:
+- pets: name, species, breed, age, owner_name, phone, address (phone y address
+  solo son obligatorios si el dueño no está registrado)
+- consultations: date, reason, diagnosis, pet_name
+"""
+
+import csv
+import json
+import logging
+import os
+import sqlite3
+import time
+from collections import namedtuple
+from itertools import islice
+
+# Resultado de una carga: filas aceptadas y rechazadas, duración y ritmo
+IngestResult = namedtuple("IngestResult", "accepted rejected seconds rows_per_second rejected_path")
+
+# Columnas obligatorias y opcionales de cada tipo de registro
+REQUIRED_FIELDS = {
+    "pets": ("name", "species", "breed", "age", "owner_name"),
+    "consultations": ("date", "reason", "diagnosis", "pet_name"),
+}
+OPTIONAL_FIELDS = {
+    "pets": ("phone", "address"),
+    "consultations": (),
+}
+
+# Filas validadas y guardadas en cada transacción por defecto
+DEFAULT_BATCH_SIZE = 500
+
+
+def iter_records(path):
+    """
+    Recorre los registros de un archivo CSV (con cabecera) o JSONL.
+    Las líneas JSON mal formadas se devuelven como texto para que la
+    validación las rechace sin detener la carga.
+
+    Args:
+        path (str): Archivo .csv, .jsonl o .ndjson
+
+    Yields:
+        tuple: (número de línea, registro como dict o texto de la línea)
+
+    Raises:
+        ValueError: Si la extensión del archivo no es compatible
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+    elif extension in (".jsonl", ".ndjson"):
+        with open(path, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_number, json.loads(line)
+                except json.JSONDecodeError:
+                    yield line_number, line.rstrip("\n")
+    else:
+        raise ValueError(f"Formato de archivo no compatible: {path} (use .csv o .jsonl)")
+
+
+def validate_record(clinic, kind, record):
+    """
+    Comprueba un registro y devuelve los argumentos con los que se guardará.
+
+    Args:
+        clinic (Clinic): Clínica de destino
+        kind (str): Tipo de registro ("pets" o "consultations")
+        record (dict | str): Registro leído del archivo
+
+    Returns:
+        dict: Argumentos para Clinic.add_pet o Clinic.add_consultation
+
+    Raises:
+        ValueError: Si el registro no es válido
+        Clinic.PetNotFoundError: Si la consulta es de una mascota no registrada
+    """
+    if not isinstance(record, dict):
+        raise ValueError("La línea no es un objeto JSON válido")
+    missing = [field for field in REQUIRED_FIELDS[kind] if record.get(field) in (None, "")]
+    if missing:
+        raise ValueError(f"Faltan campos obligatorios: {', '.join(missing)}")
+    values = {field: record[field] for field in REQUIRED_FIELDS[kind]}
+    for field in OPTIONAL_FIELDS[kind]:
+        values[field] = record.get(field) or None
+    if kind == "pets":
+        values["age"] = clinic.validate_pet(
+            values["name"], values["species"], values["breed"], values["age"], values["owner_name"]
+        )
+    else:
+        clinic.validate_consultation(values["date"], values["reason"], values["diagnosis"], values["pet_name"])
+    return values
+
+
+def ingest_file(clinic, path, kind, batch_size=DEFAULT_BATCH_SIZE, rejected_path=None):
+    """
+    Carga mascotas o consultas desde un archivo CSV o JSONL por lotes.
+
+    Args:
+        clinic (Clinic): Clínica de destino
+        path (str): Archivo a cargar
+        kind (str): Tipo de registro ("pets" o "consultations")
+        batch_size (int): Filas validadas y confirmadas en cada transacción
+        rejected_path (str, optional): Archivo JSONL de filas rechazadas;
+            por defecto, "<path>.rejected.jsonl"
+
+    Returns:
+        IngestResult: Resumen de la carga; rejected_path es None si no se rechazó ninguna fila
+
+    Raises:
+        ValueError: Si el tipo de registro o el formato del archivo no son válidos
+    """
+    if kind not in REQUIRED_FIELDS:
+        raise ValueError(f"Tipo de registro desconocido: {kind} (use pets o consultations)")
+    if rejected_path is None:
+        rejected_path = f"{path}.rejected.jsonl"
+    save = clinic.add_pet if kind == "pets" else clinic.add_consultation
+    # Los datos en memoria deben estar al día antes de validar contra ellos
+    clinic.refresh()
+
+    accepted = rejected = 0
+    rejected_file = None
+    start = time.perf_counter()
+
+    def reject(line_number, record, error):
+        nonlocal rejected, rejected_file
+        if rejected_file is None:
+            rejected_file = open(rejected_path, "w", encoding="utf-8")
+        entry = {"line": line_number, "error": str(error).strip(), "record": record}
+        rejected_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        rejected += 1
+
+    try:
+        records = iter_records(path)
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                break
+
+            valid = []
+            for line_number, record in batch:
+                try:
+                    valid.append((line_number, record, validate_record(clinic, kind, record)))
+                except (ValueError, clinic.PetNotFoundError) as e:
+                    reject(line_number, record, e)
+
+            try:
+                with clinic.db.transaction():
+                    for line_number, record, values in valid:
+                        try:
+                            with clinic.db.transaction():
+                                save(**values)
+                            accepted += 1
+                        except (ValueError, sqlite3.Error) as e:
+                            reject(line_number, record, e)
+            except Exception:
+                # El lote se ha deshecho: la memoria puede contener filas que ya no existen
+                clinic.refresh(force=True)
+                raise
+    finally:
+        if rejected_file is not None:
+            rejected_file.close()
+
+    seconds = time.perf_counter() - start
+    rows_per_second = (accepted + rejected) / seconds if seconds > 0 else 0.0
+    logging.info(
+        f"Carga de {kind} desde {path}: {accepted} filas aceptadas y {rejected} rechazadas "
+        f"en {seconds:.2f} s ({rows_per_second:.0f} filas/s)"
+    )
+    return IngestResult(accepted, rejected, seconds, rows_per_second, rejected_path if rejected else None)
@@ -9,21 +9,133 @@ realizar las siguientes operaciones:
 2. Listar mascotas
 3. Añadir consulta
 4. Buscar consultas
-5. Salir del sistema
+5. Buscar en el historial clínico (texto en motivo o diagnóstico)
+6. Ver la agenda de un día
+7. Salir del sistema
 
 El programa mantiene un registro de todas las operaciones en el archivo de log
 'veterinary_clinic.log'.
+
+Subcomandos de línea de órdenes:
+    python main.py backup DESTINO [--db ARCHIVO] [--pages N] [--pause S]
+        Copia de seguridad en caliente de la base de datos, por pasos
+    python main.py ingest ARCHIVO --kind {pets,consultations} [--db ARCHIVO]
+                   [--batch-size N] [--rejected ARCHIVO]
+        Carga por lotes de mascotas o consultas desde un CSV o JSONL
+    python main.py list [--db ARCHIVO] [--format {text,table,csv,jsonl}]
+        Escribe todas las mascotas en la salida estándar, sin pausas
 """
 
+import argparse
 import logging
 from clinic import Clinic
+from database import DEFAULT_BACKUP_PAGES, Database
+from ingest import DEFAULT_BATCH_SIZE, REQUIRED_FIELDS, ingest_file
+from render import FORMATS
+
+
+def parse_args(argv=None):
+    """
+    Interpreta los argumentos de línea de órdenes.
+    
+    Args:
+        argv (list, optional): Argumentos a interpretar; por defecto, los del programa
+        
+    Returns:
+        argparse.Namespace: Argumentos interpretados; command es None para el menú
+    """
+    parser = argparse.ArgumentParser(description="Sistema de Gestión de Clínica Veterinaria")
+    subparsers = parser.add_subparsers(dest="command")
 
+    backup = subparsers.add_parser("backup", help="Copia de seguridad en caliente de la base de datos")
+    backup.add_argument("target", help="Archivo de destino de la copia")
+    backup.add_argument("--db", default="clinica_veterinaria.db", help="Base de datos de origen")
+    backup.add_argument("--pages", type=int, default=DEFAULT_BACKUP_PAGES, help="Páginas copiadas por paso")
+    backup.add_argument("--pause", type=float, default=0.0, help="Segundos de espera entre pasos")
 
-def main():
+    ingest = subparsers.add_parser("ingest", help="Carga por lotes desde un archivo CSV o JSONL")
+    ingest.add_argument("source", help="Archivo .csv o .jsonl a cargar")
+    ingest.add_argument("--kind", required=True, choices=sorted(REQUIRED_FIELDS), help="Tipo de registro")
+    ingest.add_argument("--db", default="clinica_veterinaria.db", help="Base de datos de destino")
+    ingest.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Filas por transacción")
+    ingest.add_argument("--rejected", help="Archivo de filas rechazadas (por defecto, <ARCHIVO>.rejected.jsonl)")
+
+    listing = subparsers.add_parser("list", help="Lista todas las mascotas en la salida estándar")
+    listing.add_argument("--db", default="clinica_veterinaria.db", help="Base de datos de origen")
+    listing.add_argument("--format", default="table", choices=FORMATS, help="Formato de salida")
+    return parser.parse_args(argv)
+
+
+def run_backup(args):
+    """
+    Ejecuta el subcomando backup mostrando el progreso de la copia.
+    El origen se abre en solo lectura: no se crea ni se migra.
+    
+    Args:
+        args (argparse.Namespace): Argumentos del subcomando
+        
+    Raises:
+        SystemExit: Si la base de datos de origen no existe
+    """
+    def progress(status, remaining, total):
+        print(f"\rCopiadas {total - remaining}/{total} páginas", end="", flush=True)
+
+    try:
+        db = Database(args.db, read_only=True)
+    except FileNotFoundError as e:
+        raise SystemExit(str(e))
+    with db:
+        db.backup(args.target, pages_per_step=args.pages, progress=progress, pause=args.pause)
+    print(f"\nCopia de seguridad guardada en {args.target}")
+
+
+def run_ingest(args):
+    """
+    Ejecuta el subcomando ingest y muestra el resumen de la carga.
+    
+    Args:
+        args (argparse.Namespace): Argumentos del subcomando
+        
+    Returns:
+        IngestResult: Resumen de la carga
+    """
+    clinic = Clinic(Database(args.db))
+    try:
+        result = ingest_file(clinic, args.source, args.kind, batch_size=args.batch_size, rejected_path=args.rejected)
+    finally:
+        clinic.close()
+    print(
+        f"Cargadas {result.accepted} filas, rechazadas {result.rejected} "
+        f"en {result.seconds:.2f} s ({result.rows_per_second:.0f} filas/s)"
+    )
+    if result.rejected_path is not None:
+        print(f"Filas rechazadas guardadas en {result.rejected_path}")
+    return result
+
+
+def main(argv=None):
     """
     Función principal que ejecuta el programa.
-    Inicializa el sistema y muestra el menú interactivo.
+    Sin subcomando, inicializa el sistema y muestra el menú interactivo.
+    
+    Args:
+        argv (list, optional): Argumentos de línea de órdenes
     """
+    args = parse_args(argv)
+    if args.command == "backup":
+        run_backup(args)
+        return
+    if args.command == "ingest":
+        run_ingest(args)
+        return
+    if args.command == "list":
+        clinic = Clinic(Database(args.db))
+        try:
+            clinic.list_pets(page_size=None, output_format=args.format)
+        finally:
+            clinic.close()
+        return
+
     clinic = Clinic()
     while True:
         print("\n=== Sistema de Gestión de Clínica Veterinaria ===")
@@ -31,9 +143,11 @@ def main():
         print("2. Listar Mascotas")
         print("3. Añadir Consulta")
         print("4. Buscar Consultas")
-        print("5. Salir")
+        print("5. Buscar en Historial Clínico")
+        print("6. Agenda del Día")
+        print("7. Salir")
         
-        choice = input("\nSeleccione una opción (1-5): ")
+        choice = input("\nSeleccione una opción (1-7): ")
         
         if choice == "1":
             clinic.add_pet()
@@ -44,7 +158,12 @@ def main():
         elif choice == "4":
             clinic.search_consultation()
         elif choice == "5":
+            clinic.search_clinical_history()
+        elif choice == "6":
+            clinic.show_agenda()
+        elif choice == "7":
             print("¡Gracias por usar el Sistema de Gestión de Clínica Veterinaria!")
+            clinic.close()
             break
         else:
             print("Opción inválida. Por favor, intente de nuevo.")
@@ -11,6 +11,7 @@ en el sistema de la clínica veterinaria. Cada dueño tiene la siguiente informa
 
 La clase proporciona métodos para:
 - Inicializar un nuevo dueño
+- Construir un dueño a partir de una fila de la base de datos
 - Obtener una representación en cadena del dueño
 """
 
@@ -29,6 +30,21 @@ class Owner:
         self.phone = phone
         self.address = address
 
+    @classmethod
+    def from_row(cls, row):
+        """
+        Construye un dueño a partir de una fila de la tabla owners.
+        
+        Args:
+            row (tuple): Fila (id, name, phone, address), p. ej. un OwnerRow
+            
+        Returns:
+            Owner: Dueño con su ID asignado
+        """
+        owner = cls(row[1], row[2], row[3])
+        owner.id = row[0]
+        return owner
+
     def __str__(self):
         """
         Retorna una representación en cadena del dueño.
@@ -13,6 +13,7 @@ de la clínica veterinaria. Cada mascota tiene la siguiente información:
 
 La clase proporciona métodos para:
 - Inicializar una nueva mascota
+- Construir una mascota a partir de una fila de la base de datos
 - Obtener una representación en cadena de la mascota
 """
 
@@ -38,6 +39,24 @@ class Pet:
         self.age = age
         self.owner = owner
 
+    @classmethod
+    def from_row(cls, row, owner, start=0):
+        """
+        Construye una mascota a partir de una fila de la tabla pets.
+        
+        Args:
+            row (tuple): Fila (id, name, species, breed, age, ...), p. ej. un PetRow
+            owner (Owner): Dueño de la mascota ya cargado
+            start (int): Posición de la columna id en la fila, para filas que
+                empiezan con otras columnas (p. ej. OwnerWithPetRow)
+            
+        Returns:
+            Pet: Mascota con su ID asignado
+        """
+        pet = cls(row[start + 1], row[start + 2], row[start + 3], row[start + 4], owner)
+        pet.id = row[start]
+        return pet
+
     def __str__(self):
         """
         Retorna una representación en cadena de la mascota.
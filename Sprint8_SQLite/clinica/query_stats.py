@@ -0,0 +1,124 @@
+"""
+Módulo de Estadísticas de Consultas para la Clínica Veterinaria
+
+Este módulo implementa la clase QueryStats, que acumula métricas de las
+sentencias SQL ejecutadas por la base de datos. Por cada sentencia registra:
+
+- Llamadas: Número de veces que se ha ejecutado
+- Filas: Total de filas devueltas o modificadas
+- Tiempo: Latencia total y máxima en milisegundos
+- Histograma: Número de ejecuciones por rango de latencia
+
+Las sentencias se agrupan por su texto SQL normalizado (espacios colapsados),
+de modo que cada método de Database aparece como una entrada propia.
+"""
+
+import threading
+
+# Límites superiores (en milisegundos) de los rangos del histograma de latencia
+LATENCY_BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, float("inf"))
+
+
+class QueryStats:
+    def __init__(self):
+        """
+        Inicializa el registro de estadísticas vacío.
+        """
+        self._lock = threading.Lock()
+        self._statements = {}
+        self._keys = {}
+
+    def _key(self, sql):
+        """
+        Normaliza el texto de una sentencia para usarlo como clave.
+        La normalización se cachea porque el mismo texto se repite en cada llamada.
+
+        Args:
+            sql (str): Sentencia SQL tal como se ejecutó
+
+        Returns:
+            str: Sentencia con los espacios colapsados
+        """
+        key = self._keys.get(sql)
+        if key is None:
+            key = self._keys[sql] = " ".join(sql.split())
+        return key
+
+    def record(self, sql, elapsed, rows):
+        """
+        Registra una ejecución de una sentencia.
+
+        Args:
+            sql (str): Sentencia SQL ejecutada
+            elapsed (float): Duración en segundos
+            rows (int): Filas devueltas o modificadas
+        """
+        elapsed_ms = elapsed * 1000
+        key = self._key(sql)
+        with self._lock:
+            entry = self._statements.get(key)
+            if entry is None:
+                entry = self._statements[key] = {
+                    "calls": 0,
+                    "rows": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "histogram": [0] * len(LATENCY_BUCKETS_MS),
+                }
+            entry["calls"] += 1
+            entry["rows"] += rows
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            for i, limit in enumerate(LATENCY_BUCKETS_MS):
+                if elapsed_ms <= limit:
+                    entry["histogram"][i] += 1
+                    break
+
+    def snapshot(self):
+        """
+        Devuelve una copia de las estadísticas acumuladas.
+
+        Returns:
+            dict: Por cada sentencia, un diccionario con calls, rows, total_ms,
+            avg_ms, max_ms e histogram (rango "<= N ms" -> ejecuciones)
+        """
+        with self._lock:
+            result = {}
+            for key, entry in self._statements.items():
+                result[key] = {
+                    "calls": entry["calls"],
+                    "rows": entry["rows"],
+                    "total_ms": entry["total_ms"],
+                    "avg_ms": entry["total_ms"] / entry["calls"],
+                    "max_ms": entry["max_ms"],
+                    "histogram": {
+                        f"<= {limit:g} ms": count
+                        for limit, count in zip(LATENCY_BUCKETS_MS, entry["histogram"])
+                        if count
+                    },
+                }
+            return result
+
+    def reset(self):
+        """
+        Borra todas las estadísticas acumuladas.
+        """
+        with self._lock:
+            self._statements.clear()
+
+    def report(self):
+        """
+        Genera un resumen legible ordenado por tiempo total, de mayor a menor.
+
+        Returns:
+            str: Una línea por sentencia con llamadas, filas y latencias
+        """
+        lines = []
+        stats = sorted(self.snapshot().items(), key=lambda item: item[1]["total_ms"], reverse=True)
+        for sql, entry in stats:
+            lines.append(
+                f"{entry['calls']:>8} llamadas {entry['rows']:>10} filas "
+                f"{entry['total_ms']:>10.1f} ms total {entry['avg_ms']:>8.3f} ms media "
+                f"{entry['max_ms']:>8.1f} ms máx | {sql}"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,206 @@
+"""
+Módulo de Presentación de Listados para la Clínica Veterinaria
+
+Este módulo implementa la clase Renderer, que escribe listados de filas en la
+consola, en una tubería o en un archivo. En lugar de un print por campo, las
+filas se formatean por lotes y cada lote se envía con una única escritura, así
+que listar cien mil filas cuesta unas pocas llamadas al sistema.
+
+Formatos disponibles:
+- text: una línea "Campo: valor" por columna y un separador entre filas (menú)
+- table: tabla con cabecera y columnas alineadas
+- csv: cabecera y una línea por fila
+- jsonl: un objeto JSON por línea
+
+Uso:
+    renderer = Renderer(PET_COLUMNS, "csv", stream=sys.stdout)
+    renderer.write(pets)                                  # todo, por lotes
+    renderer.page(lambda offset, limit: ..., page_size=20)  # paginado interactivo
+"""
+
+import csv
+import io
+import json
+import sys
+from collections import namedtuple
+from itertools import islice
+
+# Columna de un listado: nombre (csv/jsonl), etiqueta (text/table) y función que
+# obtiene el valor a partir de la fila
+Column = namedtuple("Column", "name label value")
+
+FORMATS = ("text", "table", "csv", "jsonl")
+
+# Filas formateadas en cada escritura por defecto
+DEFAULT_BATCH_SIZE = 500
+
+SEPARATOR = "-" * 50
+
+
+class Renderer:
+    def __init__(self, columns, output_format="text", stream=None, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Inicializa el presentador de un listado.
+
+        Args:
+            columns (tuple): Columnas (Column) del listado
+            output_format (str): Formato de salida: "text", "table", "csv" o "jsonl"
+            stream (file, optional): Destino de la salida; por defecto, sys.stdout
+            batch_size (int): Filas formateadas en cada escritura
+
+        Raises:
+            ValueError: Si el formato no es válido
+        """
+        if output_format not in FORMATS:
+            raise ValueError(f"Formato de salida desconocido: {output_format} (use {', '.join(FORMATS)})")
+        self.columns = columns
+        self.output_format = output_format
+        self.stream = stream if stream is not None else sys.stdout
+        self.batch_size = batch_size
+        self.rows_written = 0
+        self._csv_header_written = False
+
+    def _values(self, row):
+        """
+        Obtiene los valores de las columnas de una fila.
+
+        Args:
+            row (object): Fila del listado
+
+        Returns:
+            list: Valor de cada columna
+        """
+        return [column.value(row) for column in self.columns]
+
+    def _format_text(self, rows):
+        """
+        Formatea un lote como bloques "Campo: valor" separados por una línea.
+
+        Args:
+            rows (list): Filas del lote
+
+        Returns:
+            str: Texto del lote
+        """
+        labels = [column.label for column in self.columns]
+        parts = []
+        for row in rows:
+            for label, value in zip(labels, self._values(row)):
+                parts.append(f"{label}: {value}\n")
+            parts.append(SEPARATOR + "\n")
+        return "".join(parts)
+
+    def _format_table(self, rows, widths):
+        """
+        Formatea un lote como filas de tabla con las columnas alineadas.
+
+        Args:
+            rows (list): Filas del lote
+            widths (list): Ancho de cada columna
+
+        Returns:
+            str: Texto del lote
+        """
+        return "".join(
+            " | ".join(str(value).ljust(width) for value, width in zip(self._values(row), widths)).rstrip() + "\n"
+            for row in rows
+        )
+
+    def _format_csv(self, rows):
+        """
+        Formatea un lote como líneas CSV; la cabecera se escribe una sola vez.
+
+        Args:
+            rows (list): Filas del lote
+
+        Returns:
+            str: Texto del lote
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        if not self._csv_header_written:
+            writer.writerow(column.name for column in self.columns)
+            self._csv_header_written = True
+        writer.writerows(self._values(row) for row in rows)
+        return buffer.getvalue()
+
+    def _format_jsonl(self, rows):
+        """
+        Formatea un lote como un objeto JSON por línea.
+
+        Args:
+            rows (list): Filas del lote
+
+        Returns:
+            str: Texto del lote
+        """
+        names = [column.name for column in self.columns]
+        return "".join(
+            json.dumps(dict(zip(names, self._values(row))), ensure_ascii=False, default=str) + "\n"
+            for row in rows
+        )
+
+    def write(self, rows):
+        """
+        Escribe las filas por lotes, con una sola escritura por lote.
+        En formato table la cabecera y los anchos se calculan con el primer lote.
+
+        Args:
+            rows (iterable): Filas a escribir; se consumen a medida que se escriben
+
+        Returns:
+            int: Número de filas escritas
+        """
+        rows = iter(rows)
+        widths = None
+        written = 0
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                break
+            if self.output_format == "text":
+                text = self._format_text(batch)
+            elif self.output_format == "csv":
+                text = self._format_csv(batch)
+            elif self.output_format == "jsonl":
+                text = self._format_jsonl(batch)
+            else:
+                if widths is None:
+                    widths = [len(column.label) for column in self.columns]
+                    for row in batch:
+                        widths = [max(width, len(str(value))) for width, value in zip(widths, self._values(row))]
+                    header = " | ".join(column.label.ljust(width) for column, width in zip(self.columns, widths))
+                    text = header.rstrip() + "\n" + "-+-".join("-" * width for width in widths) + "\n"
+                    text += self._format_table(batch, widths)
+                else:
+                    text = self._format_table(batch, widths)
+            self.stream.write(text)
+            written += len(batch)
+        self.stream.flush()
+        self.rows_written += written
+        return written
+
+    def page(self, fetch, page_size=20, prompt="Pulse Enter para ver más o 'q' para salir: "):
+        """
+        Muestra un listado página a página. Cada página se pide a fetch justo
+        antes de mostrarla, así que solo se leen las filas que llegan a verse.
+
+        Args:
+            fetch (callable): Función (offset, limit) que devuelve hasta limit filas desde offset
+            page_size (int): Filas por página
+            prompt (str): Pregunta mostrada entre páginas
+
+        Returns:
+            int: Número de filas mostradas
+        """
+        shown = 0
+        while True:
+            # Pedir una fila de más para saber si queda otra página
+            rows = fetch(shown, page_size + 1)
+            has_more = len(rows) > page_size
+            shown += self.write(rows[:page_size])
+            if not has_more:
+                break
+            if input(prompt).strip().lower() == "q":
+                break
+        return shown
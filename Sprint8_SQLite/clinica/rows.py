@@ -0,0 +1,76 @@
+"""
+Módulo de Filas Tipadas para la Clínica Veterinaria
+
+Este módulo define los registros ligeros que devuelve la base de datos en lugar de
+tuplas posicionales. Son namedtuple, así que:
+
+- Se accede a cada columna por nombre (pet.owner_name en lugar de pet[6])
+- Siguen siendo tuplas: el acceso por posición y el desempaquetado funcionan igual
+- No tienen __dict__ (__slots__ vacío), así que ocupan lo mismo que una tupla
+
+Registros disponibles:
+- OwnerRow: Fila de la tabla owners
+- PetRow: Fila de la tabla pets
+- ConsultationRow: Fila de la tabla consultations
+- PetWithOwnerRow: Mascota con los datos de su dueño (listados de mascotas)
+- OwnerWithPetRow: Dueño con una de sus mascotas (carga inicial de la clínica)
+- ConsultationMatchRow: Consulta encontrada por texto, con el nombre de la mascota
+- AgendaRow: Consulta de la agenda, con la mascota y el contacto del dueño
+- PetConsultationsRow, MonthConsultationsRow, SpeciesSummaryRow, OwnerPetsRow:
+  Filas de los informes de resumen
+- BranchRow: Fila de una consulta federada, con la sucursal de la que procede
+"""
+
+from collections import namedtuple
+
+OwnerRow = namedtuple("OwnerRow", "id name phone address")
+
+PetRow = namedtuple("PetRow", "id name species breed age owner_id")
+
+ConsultationRow = namedtuple("ConsultationRow", "id date reason diagnosis pet_id")
+
+PetWithOwnerRow = namedtuple(
+    "PetWithOwnerRow", "id name species breed age owner_id owner_name phone address"
+)
+
+OwnerWithPetRow = namedtuple(
+    "OwnerWithPetRow", "owner_id owner_name phone address pet_id pet_name species breed age"
+)
+
+ConsultationMatchRow = namedtuple("ConsultationMatchRow", "id date reason diagnosis pet_id pet_name")
+
+AgendaRow = namedtuple("AgendaRow", "id date reason diagnosis pet_id pet_name owner_name phone")
+
+PetConsultationsRow = namedtuple("PetConsultationsRow", "pet_id pet_name consultations")
+
+MonthConsultationsRow = namedtuple("MonthConsultationsRow", "month consultations")
+
+SpeciesSummaryRow = namedtuple("SpeciesSummaryRow", "species pets consultations")
+
+OwnerPetsRow = namedtuple("OwnerPetsRow", "owner_id owner_name pets")
+
+BranchRow = namedtuple("BranchRow", "branch_id row")
+
+_factories = {}
+
+
+def record_factory(row_type):
+    """
+    Devuelve un row_factory de sqlite3 que construye directamente el registro
+    indicado a partir de la tupla de la fila.
+
+    Args:
+        row_type (type): Clase namedtuple del registro
+
+    Returns:
+        function: Función (cursor, row) -> registro
+    """
+    factory = _factories.get(row_type)
+    if factory is None:
+        new = tuple.__new__
+
+        def factory(_cursor, row):
+            return new(row_type, row)
+
+        _factories[row_type] = factory
+    return factory
@@ -0,0 +1,325 @@
+"""
+Módulo de Base de Datos por Sucursales para la Clínica Veterinaria "Amigos Peludos"
+
+Este módulo implementa la clase ShardedDatabase, que reparte los datos de la
+clínica entre varios archivos SQLite, uno por sucursal. Así la carga de escritura
+de una sucursal nunca compite por el bloqueo de otra y cada archivo se mantiene
+pequeño.
+
+Funcionamiento:
+- Cada sucursal tiene su propia Database, abierta en un hilo dedicado que es el
+  dueño de su conexión (SQLite no permite usar una conexión desde varios hilos)
+- Enrutado: branch(branch_id) devuelve una vista de la sucursal con los mismos
+  métodos que Database; cada llamada se ejecuta en el hilo de esa sucursal
+- Consultas federadas: get_pet_by_name, get_owner_by_name, get_agenda... se
+  lanzan a la vez en todas las sucursales y se combinan sus resultados
+- Los IDs son propios de cada sucursal: la clave global es (branch_id, id)
+- Cada sucursal archiva su historial en su propio archivo ("<base>.archive.db")
+
+Uso:
+    with ShardedDatabase({"centro": "centro.db", "norte": "norte.db"}) as db:
+        owner_id = db.branch("centro").add_owner("Ana", "600", "Calle Sol")
+        matches = db.get_pet_by_name("Rex")   # [BranchRow("centro", PetRow(...)), ...]
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from database import MAINTENANCE_METHODS, READ_METHODS, WRITE_METHODS, Database
+from rows import BranchRow
+
+# Métodos de Database disponibles en la vista de cada sucursal
+_ROUTED_METHODS = WRITE_METHODS + READ_METHODS + MAINTENANCE_METHODS
+
+
+class ShardedDatabase:
+    def __init__(self, shards, **options):
+        """
+        Abre la base de datos de cada sucursal en su propio hilo.
+
+        Args:
+            shards (dict): Archivo de base de datos de cada sucursal (branch_id -> db_name)
+            **options: Argumentos adicionales para cada Database (profile, slow_query_ms...)
+
+        Raises:
+            ValueError: Si no se indica ninguna sucursal
+            sqlite3.Error: Si alguna sucursal no se puede abrir; las que sí se
+                abrieron se cierran antes de propagar el error
+        """
+        if not shards:
+            raise ValueError("ShardedDatabase necesita al menos una sucursal")
+        self._executors = {}
+        self._databases = {}
+        try:
+            for branch_id in shards:
+                self._executors[branch_id] = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix=f"clinica-db-{branch_id}"
+                )
+            # Cada sucursal usa el archivo histórico propio de su base de datos, así los IDs no se mezclan
+            futures = {
+                branch_id: self._executors[branch_id].submit(Database, db_name, **options)
+                for branch_id, db_name in shards.items()
+            }
+            # Esperar a todas antes de decidir: las que se abran después de un
+            # fallo también hay que cerrarlas
+            error = None
+            for branch_id, future in futures.items():
+                try:
+                    self._databases[branch_id] = future.result()
+                except Exception as e:
+                    error = error or e
+            if error is not None:
+                raise error
+        except Exception:
+            self.close()
+            raise
+        logging.info(f"Base de datos por sucursales abierta: {', '.join(map(str, shards))}")
+
+    def __enter__(self):
+        """
+        Permite usar la base de datos como gestor de contexto.
+
+        Returns:
+            ShardedDatabase: La propia instancia
+        """
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        Cierra las bases de datos de todas las sucursales al salir del bloque with.
+        """
+        self.close()
+        return False
+
+    @property
+    def branches(self):
+        """
+        Returns:
+            list: IDs de las sucursales, en el orden en que se configuraron
+        """
+        return list(self._executors)
+
+    def _submit(self, branch_id, func, *args, **kwargs):
+        """
+        Encola una función en el hilo de una sucursal.
+
+        Args:
+            branch_id: ID de la sucursal
+            func (callable): Función que recibe la Database de la sucursal
+            *args: Argumentos posicionales adicionales
+            **kwargs: Argumentos con nombre adicionales
+
+        Returns:
+            concurrent.futures.Future: Resultado pendiente
+
+        Raises:
+            ValueError: Si la sucursal no existe
+        """
+        executor = self._executors.get(branch_id)
+        if executor is None:
+            raise ValueError(f"Sucursal desconocida: {branch_id}")
+        return executor.submit(lambda: func(self._databases[branch_id], *args, **kwargs))
+
+    def call(self, branch_id, name, *args, **kwargs):
+        """
+        Ejecuta un método de Database en la sucursal indicada.
+
+        Args:
+            branch_id: ID de la sucursal
+            name (str): Nombre del método de Database
+            *args: Argumentos posicionales
+            **kwargs: Argumentos con nombre
+
+        Returns:
+            object: Resultado del método
+        """
+        return self._submit(branch_id, lambda db: getattr(db, name)(*args, **kwargs)).result()
+
+    def branch(self, branch_id):
+        """
+        Devuelve la vista de una sucursal, con los mismos métodos que Database.
+
+        Args:
+            branch_id: ID de la sucursal
+
+        Returns:
+            BranchDatabase: Vista enrutada a la sucursal
+
+        Raises:
+            ValueError: Si la sucursal no existe
+        """
+        if branch_id not in self._executors:
+            raise ValueError(f"Sucursal desconocida: {branch_id}")
+        return BranchDatabase(self, branch_id)
+
+    def run_transaction(self, branch_id, func, *args, **kwargs):
+        """
+        Ejecuta varias operaciones de una sucursal como una unidad de trabajo.
+        La función recibe la Database de la sucursal y se ejecuta completa en
+        su hilo dentro de db.transaction().
+
+        Args:
+            branch_id: ID de la sucursal
+            func (callable): Función que recibe la Database como primer argumento
+            *args: Argumentos posicionales adicionales
+            **kwargs: Argumentos con nombre adicionales
+
+        Returns:
+            object: Resultado de la función
+        """
+        def run(db):
+            with db.transaction():
+                return func(db, *args, **kwargs)
+
+        return self._submit(branch_id, run).result()
+
+    def fan_out(self, name, *args, **kwargs):
+        """
+        Ejecuta un método de Database en todas las sucursales a la vez.
+
+        Args:
+            name (str): Nombre del método de Database
+            *args: Argumentos posicionales
+            **kwargs: Argumentos con nombre
+
+        Returns:
+            dict: Resultado de cada sucursal (branch_id -> resultado)
+        """
+        futures = {
+            branch_id: self._submit(branch_id, lambda db: getattr(db, name)(*args, **kwargs))
+            for branch_id in self._executors
+        }
+        return {branch_id: future.result() for branch_id, future in futures.items()}
+
+    def get_pet_by_name(self, name):
+        """
+        Busca una mascota por nombre en todas las sucursales.
+
+        Args:
+            name (str): Nombre de la mascota
+
+        Returns:
+            list: BranchRow (branch_id, PetRow) de cada sucursal donde existe
+        """
+        return [
+            BranchRow(branch_id, pet)
+            for branch_id, pet in self.fan_out("get_pet_by_name", name).items()
+            if pet is not None
+        ]
+
+    def get_owner_by_name(self, name):
+        """
+        Busca un dueño por nombre en todas las sucursales.
+
+        Args:
+            name (str): Nombre del dueño
+
+        Returns:
+            list: BranchRow (branch_id, OwnerRow) de cada sucursal donde existe
+        """
+        return [
+            BranchRow(branch_id, owner)
+            for branch_id, owner in self.fan_out("get_owner_by_name", name).items()
+            if owner is not None
+        ]
+
+    def get_consultations_between(self, start, end):
+        """
+        Obtiene las consultas de todas las sucursales en el intervalo [start, end).
+
+        Args:
+            start (str | datetime | date): Inicio del intervalo, incluido
+            end (str | datetime | date): Fin del intervalo, excluido
+
+        Returns:
+            list: BranchRow (branch_id, ConsultationRow) ordenadas por fecha
+        """
+        return self._merge_by_date(self.fan_out("get_consultations_between", start, end))
+
+    def get_agenda(self, day=None):
+        """
+        Obtiene la agenda de un día de todas las sucursales.
+
+        Args:
+            day (str | date, optional): Día a consultar; por defecto, hoy
+
+        Returns:
+            list: BranchRow (branch_id, AgendaRow) ordenadas por hora
+        """
+        return self._merge_by_date(self.fan_out("get_agenda", day))
+
+    def _merge_by_date(self, results):
+        """
+        Combina las filas de cada sucursal ordenándolas por fecha.
+
+        Args:
+            results (dict): Filas de cada sucursal, ya ordenadas por fecha
+
+        Returns:
+            list: BranchRow ordenadas por fecha
+        """
+        rows = [BranchRow(branch_id, row) for branch_id, branch_rows in results.items() for row in branch_rows]
+        rows.sort(key=lambda item: item.row.date)
+        return rows
+
+    def close(self):
+        """
+        Cierra la base de datos de cada sucursal en su hilo y libera los hilos.
+        """
+        for branch_id, executor in self._executors.items():
+            db = self._databases.pop(branch_id, None)
+            if db is not None:
+                executor.submit(db.close).result()
+            executor.shutdown(wait=True)
+        self._executors = {}
+        logging.info("Base de datos por sucursales cerrada")
+
+
+class BranchDatabase:
+    def __init__(self, sharded, branch_id):
+        """
+        Vista de una sucursal: cada método se ejecuta en el hilo de su base de datos.
+
+        Args:
+            sharded (ShardedDatabase): Base de datos por sucursales
+            branch_id: ID de la sucursal
+        """
+        self.sharded = sharded
+        self.branch_id = branch_id
+
+    def run_transaction(self, func, *args, **kwargs):
+        """
+        Ejecuta varias operaciones de la sucursal como una unidad de trabajo.
+
+        Args:
+            func (callable): Función que recibe la Database como primer argumento
+            *args: Argumentos posicionales adicionales
+            **kwargs: Argumentos con nombre adicionales
+
+        Returns:
+            object: Resultado de la función
+        """
+        return self.sharded.run_transaction(self.branch_id, func, *args, **kwargs)
+
+
+def _routed(name):
+    """
+    Crea el método de BranchDatabase que ejecuta Database.<name> en la sucursal.
+
+    Args:
+        name (str): Nombre del método de Database
+
+    Returns:
+        function: Método con el mismo nombre y argumentos
+    """
+    def method(self, *args, **kwargs):
+        return self.sharded.call(self.branch_id, name, *args, **kwargs)
+
+    method.__name__ = name
+    method.__qualname__ = f"BranchDatabase.{name}"
+    method.__doc__ = getattr(Database, name).__doc__
+    return method
+
+
+for _name in _ROUTED_METHODS:
+    setattr(BranchDatabase, _name, _routed(_name))
@@ -1,13 +1,43 @@
+import asyncio
 import csv
+import io
 import json
 import os
+import shutil
+import sqlite3
+import tempfile
+import threading
 import unittest
 from datetime import datetime
+from unittest import mock
 
+from async_database import AsyncDatabase
+from concurrent_database import ConcurrentDatabase
 from clinic import Clinic
 from consultation import Consultation
+import database
+from database import Database
+from fixtures import seed_clinic
+from ingest import ingest_file
+from render import Column, Renderer
 from owner import Owner
 from pet import Pet
+from sharded_database import ShardedDatabase
+
+
+class TempDirTestCase(unittest.TestCase):
+    """
+    Base de las pruebas que necesitan archivos reales (bases creadas con
+    sqlite3 antes de migrar, copias de seguridad, archivo histórico, varias
+    bases a la vez...): cada prueba tiene su propia carpeta temporal, que se
+    borra después de tearDown, y self.db_path apunta a "clinica.db" en ella.
+    Las demás usan Database.in_memory().
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.db_path = os.path.join(self.tmpdir.name, "clinica.db")
 
 
 class TestOwnerPetConsultation(unittest.TestCase):
@@ -63,11 +93,11 @@ class TestValidationExceptions(unittest.TestCase):
     """
 
     def test_validar_ascii_letras_correcto(self):
-        clinic = Clinic()
+        clinic = Clinic(Database.in_memory())
         clinic.validar_ascii_letras(nombre="Maria", especie="Gato")
 
     def test_validar_ascii_letras_incorrecto(self):
-        clinic = Clinic()
+        clinic = Clinic(Database.in_memory())
         with self.assertRaises(ValueError):
             # “M4ria” contiene un dígito → debe fallar
             clinic.validar_ascii_letras(nombre="M4ria", especie="Gato")
@@ -100,7 +130,7 @@ class TestSerialization(unittest.TestCase):
                 pass
 
     def test_save_and_load_pets_and_owners(self):
-        clinic = Clinic()
+        clinic = Clinic(Database.in_memory())
         # Crear dueño y mascota manualmente (sin usar input)
         owner = clinic.add_owner("Luis", "555222333", "Calle Real 456")
         pet = Pet("Rex", "Perro", "Beagle", 3, owner)
@@ -126,7 +156,7 @@ class TestSerialization(unittest.TestCase):
         self.assertEqual(fila["dirección_dueño"], "Calle Real 456")
 
         # Ahora instanciar una nueva Clinic y cargar desde CSV
-        clinic2 = Clinic()
+        clinic2 = Clinic(Database(clinic.db.db_name))
         clinic2.load_pets_and_owners()
         # Debe tener exactamente 1 mascota cargada
         self.assertEqual(len(clinic2.pets), 1)
@@ -135,7 +165,7 @@ class TestSerialization(unittest.TestCase):
         self.assertEqual(pet2.owner.name, "Luis")
 
     def test_save_and_load_consultations(self):
-        clinic = Clinic()
+        clinic = Clinic(Database.in_memory())
         # Crear consulta manualmente (sin usar input)
         consultation = Consultation("2025-06-02 09:00", "Chequeo", "Bien", "Rex")
         clinic.consultations.append(consultation)
@@ -156,7 +186,7 @@ class TestSerialization(unittest.TestCase):
         self.assertEqual(entry["pet_name"], "Rex")
 
         # Cargar en nueva instancia y validar
-        clinic2 = Clinic()
+        clinic2 = Clinic(Database(clinic.db.db_name))
         clinic2.load_consultations()
         self.assertEqual(len(clinic2.consultations), 1)
         c2 = clinic2.consultations[0]
@@ -174,7 +204,7 @@ class TestLogging(unittest.TestCase):
     def test_logging_on_owner_creation(self):
         # Capturamos logs de nivel INFO para la creación de Owner
         with self.assertLogs(level="INFO") as cm:
-            clinic = Clinic()
+            clinic = Clinic(Database.in_memory())
             clinic.add_owner("Pedro", "111222333", "Calle 1")
         logs = "\n".join(cm.output)
         self.assertIn("New owner registered: Pedro", logs)
@@ -182,7 +212,7 @@ class TestLogging(unittest.TestCase):
     def test_logging_on_invalid_validation(self):
         # Capturamos logs de nivel ERROR al invocar validar_ascii_letras con valor inválido
         with self.assertLogs(level="ERROR") as cm:
-            clinic = Clinic()
+            clinic = Clinic(Database.in_memory())
             try:
                 clinic.validar_ascii_letras(nombre="Inv4lido")
             except ValueError:
@@ -191,6 +221,1556 @@ class TestLogging(unittest.TestCase):
         self.assertIn("Invalid characters in field 'nombre'", logs)
 
 
+class TestDatabaseConnection(TempDirTestCase):
+    """
+    Pruebas del ciclo de vida de la conexión de Database:
+     - La conexión se abre una vez y se reutiliza entre operaciones
+     - close() la libera y la siguiente operación la reabre
+     - Uso como gestor de contexto y comprobación de salud
+     - Clinic puede compartir una conexión ya abierta
+    """
+
+    def test_connection_is_reused(self):
+        db = Database(self.db_path)
+        conn = db.conn
+        owner_id = db.add_owner("Luis", "555222333", "Calle Real 456")
+        db.add_pet("Rex", "Perro", "Beagle", 3, owner_id)
+        self.assertIsNotNone(db.get_pet_by_name("Rex"))
+        self.assertIs(db.conn, conn)
+        db.close()
+
+    def test_close_and_reopen(self):
+        db = Database(self.db_path)
+        db.add_owner("Ana", "987654321", "Calle 654")
+        db.close()
+        self.assertIsNone(db.conn)
+        self.assertFalse(db.is_healthy())
+        self.assertEqual(db.get_owner_by_name("Ana")[1], "Ana")
+        self.assertTrue(db.is_healthy())
+        db.close()
+
+    def test_context_manager_closes_connection(self):
+        with Database(self.db_path) as db:
+            self.assertTrue(db.is_healthy())
+        self.assertIsNone(db.conn)
+
+    def test_ensure_healthy_reopens_broken_connection(self):
+        db = Database(self.db_path)
+        db.conn.close()
+        self.assertFalse(db.is_healthy())
+        db.ensure_healthy()
+        self.assertTrue(db.is_healthy())
+        db.close()
+
+    def test_clinic_shares_database(self):
+        db = Database(self.db_path)
+        clinic = Clinic(db=db)
+        self.assertIs(clinic.db, db)
+        clinic.add_owner("Pedro", "111222333", "Calle 1")
+        self.assertIsNotNone(db.get_owner_by_name("Pedro"))
+        clinic.close()
+
+
+class TestBulkInsert(unittest.TestCase):
+    """
+    Pruebas de las inserciones masivas de Database:
+     - Los IDs devueltos corresponden a las filas insertadas y en orden
+     - Se aceptan generadores y se respeta el tamaño de bloque
+     - Un error en cualquier bloque deshace toda la inserción
+    """
+
+    def setUp(self):
+        self.db = Database.in_memory()
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_bulk_insert_returns_ids_in_order(self):
+        owner_ids = self.db.add_owners_many(
+            ((f"Dueno {i}", str(i), "Calle") for i in range(25)), chunk_size=10
+        )
+        self.assertEqual(len(owner_ids), 25)
+        pet_ids = self.db.add_pets_many(
+            (f"Mascota {i}", "Perro", "Beagle", i, owner_id)
+            for i, owner_id in enumerate(owner_ids)
+        )
+        consultation_ids = self.db.add_consultations_many(
+            [("2025-06-01 10:00", "Vacuna", "Sano", pet_id) for pet_id in pet_ids]
+        )
+        self.assertEqual(len(consultation_ids), 25)
+
+        rows = self.db.conn.execute("SELECT id, name FROM pets ORDER BY id").fetchall()
+        self.assertEqual([row[0] for row in rows], pet_ids)
+        self.assertEqual(rows[7][1], "Mascota 7")
+        pet = self.db.get_pet_by_name("Mascota 24")
+        self.assertEqual(pet[5], owner_ids[24])
+
+    def test_bulk_insert_is_atomic(self):
+        rows = [("Ana", "1", "Calle")] * 5 + [("Roto", None, "Calle")]
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.db.add_owners_many(rows, chunk_size=2)
+        count = self.db.conn.execute("SELECT COUNT(*) FROM owners").fetchone()[0]
+        self.assertEqual(count, 0)
+
+    def test_bad_date_in_later_chunk_stores_nothing(self):
+        owner_id = self.db.add_owner("Ana", "1", "Calle")
+        pet_id = self.db.add_pet("Rex", "Perro", "Beagle", 3, owner_id)
+        rows = [("2025-06-01 10:00", "Chequeo", "Sano", pet_id)] * 3 + [("mañana", "Vacuna", "Sano", pet_id)]
+        with self.assertRaises(ValueError):
+            self.db.add_consultations_many(rows, chunk_size=2)
+        self.assertFalse(self.db.conn.in_transaction)
+        self.db.add_owner("Luis", "2", "Avenida")
+        with self.db.transaction():
+            self.db.add_owner("Eva", "3", "Plaza")
+        self.assertEqual(self.db.get_consultations_by_pet_id(pet_id), [])
+
+
+class TestMigrations(TempDirTestCase):
+    """
+    Pruebas de las migraciones del esquema:
+     - Una base de datos antigua (sin versión) se actualiza sin perder datos
+     - Las búsquedas por nombre y clave foránea usan índices
+     - Abrir de nuevo una base de datos actualizada no repite migraciones
+    """
+
+    def setUp(self):
+        super().setUp()
+        # Base de datos creada con el esquema original, sin índices ni versión
+        conn = sqlite3.connect(self.db_path)
+        for statement in database.MIGRATIONS[0]:
+            conn.execute(statement)
+        conn.execute("INSERT INTO owners (name, phone, address) VALUES ('Ana', '1', 'Calle')")
+        conn.commit()
+        conn.close()
+
+    def query_plan(self, db, sql):
+        rows = db.conn.execute(f"EXPLAIN QUERY PLAN {sql}", (1,)).fetchall()
+        return " ".join(row[3] for row in rows)
+
+    def test_existing_database_is_upgraded_in_place(self):
+        with Database(self.db_path) as db:
+            version = db.conn.execute("PRAGMA user_version").fetchone()[0]
+            self.assertEqual(version, database.SCHEMA_VERSION)
+            self.assertEqual(db.get_owner_by_name("Ana")[1], "Ana")
+            self.assertIn("USING INDEX", self.query_plan(db, "SELECT * FROM owners WHERE name = ?"))
+            self.assertIn("USING INDEX", self.query_plan(db, "SELECT * FROM pets WHERE name = ?"))
+            self.assertIn("USING INDEX", self.query_plan(db, "SELECT * FROM pets WHERE owner_id = ?"))
+            self.assertIn(
+                "USING INDEX",
+                self.query_plan(db, "SELECT * FROM consultations WHERE pet_id = ? ORDER BY date, id"),
+            )
+
+    def test_migrations_are_applied_once(self):
+        Database(self.db_path).close()
+        with self.assertLogs(level="INFO") as cm:
+            db = Database(self.db_path)
+        db.close()
+        self.assertNotIn("migrada", "\n".join(cm.output))
+
+    def test_newer_schema_is_rejected(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(f"PRAGMA user_version = {database.SCHEMA_VERSION + 1}")
+        conn.close()
+        with self.assertRaises(sqlite3.DatabaseError):
+            Database(self.db_path)
+
+
+class TestPerformanceProfile(TempDirTestCase):
+    """
+    Pruebas de los perfiles de rendimiento de SQLite:
+     - El perfil "performance" activa WAL y synchronous=NORMAL en cada conexión
+     - El perfil se puede elegir con la variable de entorno
+     - Un perfil desconocido se rechaza
+    """
+
+    def tearDown(self):
+        os.environ.pop(database.PROFILE_ENV_VAR, None)
+
+    def pragma(self, db, name):
+        return db.conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+    def test_performance_profile_is_applied_on_every_connection(self):
+        db = Database(self.db_path, profile="performance")
+        db.close()
+        db.connect()
+        self.assertEqual(self.pragma(db, "journal_mode"), "wal")
+        self.assertEqual(self.pragma(db, "synchronous"), 1)  # NORMAL
+        self.assertEqual(self.pragma(db, "temp_store"), 2)  # MEMORY
+        db.close()
+
+    def test_profile_from_environment(self):
+        os.environ[database.PROFILE_ENV_VAR] = "performance"
+        with Database(self.db_path) as db:
+            self.assertEqual(db.profile, "performance")
+            self.assertEqual(self.pragma(db, "journal_mode"), "wal")
+
+    def test_unknown_profile_is_rejected(self):
+        with self.assertRaises(ValueError):
+            Database(self.db_path, profile="turbo")
+
+
+class TestClinicBootstrap(unittest.TestCase):
+    """
+    Pruebas de la carga inicial de Clinic:
+     - Dueños, mascotas y consultas se cargan sin una consulta por mascota
+     - Las mascotas de un mismo dueño comparten el objeto Owner
+     - Los dueños sin mascotas también se cargan
+    """
+
+    def setUp(self):
+        self.db = Database.in_memory()
+        owner_ids = self.db.add_owners_many((f"Dueno {i}", str(i), "Calle") for i in range(10))
+        pet_ids = self.db.add_pets_many(
+            (f"Mascota {i}", "Gato", "Persa", 2, owner_ids[i // 2]) for i in range(16)
+        )
+        self.db.add_consultations_many(
+            ("2025-06-01 10:00", "Chequeo", "Sano", pet_id) for pet_id in pet_ids for _ in range(3)
+        )
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_bootstrap_builds_graph_in_one_pass(self):
+        with mock.patch.object(
+            self.db, "get_consultations_by_pet_id", side_effect=AssertionError("consulta N+1")
+        ):
+            clinic = Clinic(db=self.db)
+        self.assertEqual(len(clinic.owners), 10)
+        self.assertEqual(len(clinic.pets), 16)
+        self.assertEqual(clinic.consultations, [])
+        self.assertIs(clinic.pets[0].owner, clinic.pets[1].owner)
+        self.assertEqual(clinic.pets[15].owner.name, "Dueno 7")
+        clinic.load_consultations()
+        self.assertEqual(len(clinic.consultations), 48)
+        self.assertEqual({c.pet_name for c in clinic.consultations}, {p.name for p in clinic.pets})
+
+
+class TestPagination(unittest.TestCase):
+    """
+    Pruebas de los listados paginados por clave:
+     - iter_pets recorre todas las mascotas en orden y respeta los filtros
+     - Las consultas se pueden paginar por mascota
+     - list_pets muestra solo la primera página sin leer la base de datos
+     - search_consultation muestra el historial página a página
+    """
+
+    def setUp(self):
+        self.db = Database.in_memory()
+        owner_ids = self.db.add_owners_many([("Ana", "1", "Calle"), ("Luis", "2", "Avenida")])
+        self.pet_ids = self.db.add_pets_many(
+            (f"Mascota {i}", "Perro" if i % 2 else "Gato", "Mestizo", 1, owner_ids[i % 2])
+            for i in range(25)
+        )
+        self.db.add_consultations_many(
+            ("2025-06-01 10:00", "Chequeo", "Sano", self.pet_ids[i % 3]) for i in range(12)
+        )
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_iter_pets_walks_every_page(self):
+        pets = list(self.db.iter_pets(batch_size=4))
+        self.assertEqual([pet[0] for pet in pets], self.pet_ids)
+        self.assertEqual(pets[3][6], "Luis")
+
+    def test_iter_pets_with_filters(self):
+        cats = list(self.db.iter_pets(batch_size=5, species="Gato"))
+        self.assertEqual(len(cats), 13)
+        self.assertTrue(all(pet[2] == "Gato" for pet in cats))
+        self.assertEqual(cats, list(self.db.iter_pets(species="Gato", owner_id=1)))
+
+    def test_iter_consultations_by_pet(self):
+        consultations = list(self.db.iter_consultations(batch_size=2, pet_id=self.pet_ids[0]))
+        self.assertEqual(len(consultations), 4)
+        self.assertEqual(len(list(self.db.iter_consultations(batch_size=5))), 12)
+
+    def test_list_pets_shows_one_page_from_memory(self):
+        clinic = Clinic(db=self.db)
+        output = io.StringIO()
+        with mock.patch("builtins.input", return_value="q"), \
+                mock.patch.object(self.db, "get_pets_page", wraps=self.db.get_pets_page) as page:
+            self.assertEqual(clinic.list_pets(page_size=10, stream=output), 10)
+        self.assertEqual(page.call_count, 0)
+        lines = output.getvalue().splitlines()
+        self.assertEqual(sum(1 for line in lines if line.startswith("ID: ")), 10)
+
+    def test_search_consultation_is_paged(self):
+        clinic = Clinic(db=self.db)
+        output = io.StringIO()
+        with mock.patch("builtins.input", side_effect=["Mascota 0", "q"]) as prompt:
+            clinic.search_consultation(page_size=3, stream=output)
+        self.assertEqual(prompt.call_count, 2)
+        lines = output.getvalue().splitlines()
+        self.assertEqual(sum(1 for line in lines if line.startswith("Fecha: ")), 3)
+
+
+class TestQueryStats(unittest.TestCase):
+    """
+    Pruebas de la instrumentación de consultas:
+     - Cada sentencia acumula llamadas, filas e histograma de latencias
+     - Las consultas lentas se registran con su plan de ejecución
+     - Las estadísticas se vuelcan al log al cerrar la conexión
+    """
+
+    def test_stats_per_statement(self):
+        with Database.in_memory(slow_query_ms=None) as db:
+            owner_id = db.add_owner("Ana", "1", "Calle")
+            db.add_pets_many([("Rex", "Perro", "Beagle", 3, owner_id)] * 3)
+            for _ in range(4):
+                db.get_owner_by_name("Ana")
+            db.get_owner_by_name("Nadie")
+            list(db.iter_owners_with_pets())
+            stats = db.stats()
+
+        lookup = stats["SELECT * FROM owners WHERE name = ?"]
+        self.assertEqual(lookup["calls"], 5)
+        self.assertEqual(lookup["rows"], 4)
+        self.assertEqual(sum(lookup["histogram"].values()), 5)
+        bulk = stats["INSERT INTO pets (name, species, breed, age, owner_id) VALUES (?, ?, ?, ?, ?)"]
+        self.assertEqual(bulk["rows"], 3)
+        join = [entry for sql, entry in stats.items() if "LEFT JOIN pets" in sql][0]
+        self.assertEqual(join["rows"], 3)
+
+    def test_slow_query_logs_plan(self):
+        with Database.in_memory(slow_query_ms=0) as db:
+            with self.assertLogs(level="WARNING") as cm:
+                db.get_pet_by_name("Rex")
+        logs = "\n".join(cm.output)
+        self.assertIn("Consulta lenta", logs)
+        self.assertIn("idx_pets_name", logs)
+
+    def test_stats_dumped_on_close(self):
+        db = Database.in_memory(slow_query_ms=None)
+        db.get_pet_by_name("Rex")
+        with self.assertLogs(level="INFO") as cm:
+            db.close()
+        self.assertIn("SELECT * FROM pets WHERE name = ?", "\n".join(cm.output))
+
+
+class TestTransactions(unittest.TestCase):
+    """
+    Pruebas de las unidades de trabajo de Database:
+     - Las operaciones dentro de transaction() se confirman con un único commit
+     - Un error deshace todas las operaciones del bloque
+     - Los bloques anidados usan savepoints independientes
+     - Clinic.add_pet guarda dueño y mascota de forma atómica
+    """
+
+    def setUp(self):
+        self.db = Database.in_memory()
+
+    def tearDown(self):
+        self.db.close()
+
+    def count(self, table):
+        return self.db.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def test_operations_share_one_commit(self):
+        with mock.patch.object(self.db, "conn", wraps=self.db.conn) as conn:
+            with self.db.transaction():
+                owner_id = self.db.add_owner("Ana", "1", "Calle")
+                self.db.add_pet("Rex", "Perro", "Beagle", 3, owner_id)
+                self.assertTrue(self.db.in_transaction())
+            self.assertEqual(conn.commit.call_count, 1)
+        self.assertFalse(self.db.in_transaction())
+        self.assertEqual(self.count("pets"), 1)
+
+    def test_error_rolls_back_whole_block(self):
+        with self.assertRaises(sqlite3.IntegrityError):
+            with self.db.transaction():
+                self.db.add_owner("Ana", "1", "Calle")
+                self.db.add_pet("Rex", "Perro", "Beagle", None, 1)
+        self.assertEqual(self.count("owners"), 0)
+
+    def test_nested_block_rolls_back_to_savepoint(self):
+        with self.db.transaction():
+            self.db.add_owner("Ana", "1", "Calle")
+            try:
+                with self.db.transaction():
+                    self.db.add_owner("Luis", "2", "Calle")
+                    raise ValueError("fallo interno")
+            except ValueError:
+                pass
+            self.db.add_owner("Eva", "3", "Calle")
+        names = [row[0] for row in self.db.conn.execute("SELECT name FROM owners ORDER BY id")]
+        self.assertEqual(names, ["Ana", "Eva"])
+
+    def test_clinic_add_pet_is_atomic(self):
+        clinic = Clinic(db=self.db)
+        answers = iter(["Rex", "Perro", "Beagle", "Ana", "3", "600111222", "Calle"])
+        with mock.patch("builtins.input", lambda _: next(answers)), \
+                mock.patch.object(self.db, "add_pet", side_effect=sqlite3.OperationalError("disco lleno")):
+            with self.assertRaises(sqlite3.OperationalError):
+                clinic.add_pet()
+        self.assertEqual(self.count("owners"), 0)
+        self.assertEqual(clinic.owners, [])
+
+
+class TestAsyncDatabase(TempDirTestCase):
+    """
+    Pruebas de la fachada asíncrona:
+     - Las operaciones se ejecutan fuera del hilo del bucle de eventos
+     - Se pueden lanzar muchas peticiones a la vez
+     - Los listados se recorren con async for
+     - run_transaction agrupa operaciones en una unidad de trabajo
+    """
+
+    def test_operations_run_off_the_event_loop(self):
+        async def scenario():
+            async with await AsyncDatabase.open(self.db_path, max_concurrency=4) as db:
+                loop_thread = threading.get_ident()
+                with mock.patch.object(db._db, "get_pet_by_name",
+                                       side_effect=lambda name: threading.get_ident()):
+                    worker_thread = await db.get_pet_by_name("Rex")
+                self.assertNotEqual(worker_thread, loop_thread)
+
+                owner_id = await db.add_owner("Ana", "1", "Calle")
+                await asyncio.gather(*(
+                    db.add_pet(f"Mascota {i}", "Gato", "Persa", 1, owner_id) for i in range(20)
+                ))
+                names = [row[1] async for row in db.iter_pets(batch_size=6)]
+                self.assertEqual(len(names), 20)
+                self.assertEqual((await db.get_pet_by_name("Mascota 7"))[1], "Mascota 7")
+
+        asyncio.run(scenario())
+
+    def test_run_transaction(self):
+        def intake(db, owner_name, pet_name):
+            owner_id = db.add_owner(owner_name, "1", "Calle")
+            return db.add_pet(pet_name, "Perro", "Beagle", 2, owner_id)
+
+        async def scenario():
+            async with await AsyncDatabase.open(self.db_path) as db:
+                pet_id = await db.run_transaction(intake, "Luis", "Toby")
+                self.assertEqual((await db.get_pet_by_name("Toby"))[0], pet_id)
+
+        asyncio.run(scenario())
+
+
+class TestConcurrentDatabase(TempDirTestCase):
+    """
+    Pruebas del modo multihilo:
+     - Varios hilos pueden escribir a la vez sin pisarse
+     - Las escrituras se agrupan en commits compartidos
+     - Un error en una escritura no afecta al resto de su lote
+     - Las lecturas comparten un grupo acotado de conexiones
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.db = ConcurrentDatabase(self.db_path, slow_query_ms=None)
+
+    def tearDown(self):
+        self.db.close()
+
+    def run_threads(self, target, count):
+        threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_concurrent_writes(self):
+        owner_id = self.db.add_owner("Ana", "1", "Calle")
+
+        def writer(n):
+            for i in range(25):
+                self.db.add_pet(f"Mascota {n}-{i}", "Gato", "Persa", 1, owner_id)
+
+        self.run_threads(writer, 8)
+        with self.db.connection() as conn:
+            count = conn.execute("SELECT COUNT(*) FROM pets").fetchone()[0]
+        self.assertEqual(count, 200)
+        self.assertEqual(self.db.writes_committed, 201)
+        self.assertLessEqual(self.db.batches_committed, self.db.writes_committed)
+
+    def test_failed_write_does_not_affect_batch(self):
+        owner_id = self.db.add_owner("Ana", "1", "Calle")
+        errors = []
+
+        def writer(n):
+            try:
+                self.db.add_pet(f"Mascota {n}", "Gato", "Persa", None if n == 3 else 1, owner_id)
+            except sqlite3.IntegrityError as e:
+                errors.append(e)
+
+        self.run_threads(writer, 6)
+        self.assertEqual(len(errors), 1)
+        self.assertIsNone(self.db.get_pet_by_name("Mascota 3"))
+        self.assertIsNotNone(self.db.get_pet_by_name("Mascota 5"))
+
+    def test_reader_connections_are_bounded(self):
+        db = ConcurrentDatabase(os.path.join(self.tmpdir.name, "lectores.db"), slow_query_ms=None, max_readers=4)
+        try:
+            db.add_owner("Ana", "1", "Calle")
+            names = []
+
+            def reader(n):
+                names.append(db.get_owner_by_name("Ana")[1])
+                names.extend(pet.name for pet in db.iter_pets())
+
+            self.run_threads(reader, 300)
+            self.assertEqual(names, ["Ana"] * 300)
+            # Como mucho max_readers conexiones de lectura más la del escritor y
+            # la fija de data_version
+            self.assertLessEqual(len(db._connections), 6)
+            self.assertIsNone(db.conn)
+        finally:
+            db.close()
+
+    def test_connection_outside_lease_raises(self):
+        with self.assertRaises(RuntimeError):
+            self.db.connect()
+        with self.db.connection() as conn:
+            self.assertIs(self.db.connect(), conn)
+
+    def test_transaction_writes_directly(self):
+        with self.db.transaction():
+            owner_id = self.db.add_owner("Luis", "2", "Calle")
+            self.db.add_pet("Toby", "Perro", "Beagle", 2, owner_id)
+        self.assertEqual(self.db.writes_committed, 0)
+        self.assertIsNotNone(self.db.get_pet_by_name("Toby"))
+
+
+class TestFullTextSearch(TempDirTestCase):
+    """
+    Pruebas de la búsqueda de texto completo en consultas:
+     - Encuentra palabras en motivo y diagnóstico sin distinguir tildes
+     - El índice se mantiene al modificar y borrar consultas
+     - Las consultas previas a la migración quedan indexadas
+    """
+
+    def seed(self, db):
+        owner_id = db.add_owner("Ana", "1", "Calle")
+        pet_id = db.add_pet("Rex", "Perro", "Beagle", 3, owner_id)
+        db.add_consultations_many([
+            ("2025-06-01 10:00", "Picor de oídos", "Otitis externa", pet_id),
+            ("2025-06-02 10:00", "Vacuna anual", "Sano", pet_id),
+            ("2025-06-03 10:00", "Otitis recurrente", "Otitis media", pet_id),
+        ])
+        return pet_id
+
+    def test_search_ranks_matches(self):
+        with Database(self.db_path) as db:
+            self.seed(db)
+            results = db.search_consultations("otitis")
+            self.assertEqual(len(results), 2)
+            self.assertEqual(results[0][2], "Otitis recurrente")
+            self.assertEqual(results[0][5], "Rex")
+            self.assertEqual(len(db.search_consultations("OIDOS")), 1)
+            self.assertEqual(db.search_consultations("otitis vacuna"), [])
+            self.assertEqual(len(db.search_consultations("otitis OR vacuna", raw=True)), 3)
+            # Los signos de la sintaxis FTS5 no provocan errores: se buscan como frase
+            self.assertEqual(db.search_consultations("otitis-media:")[0][3], "Otitis media")
+
+    def test_index_follows_updates_and_deletes(self):
+        with Database(self.db_path) as db:
+            pet_id = self.seed(db)
+            db.conn.execute("UPDATE consultations SET diagnosis = 'Dermatitis' WHERE reason = 'Vacuna anual'")
+            db.conn.execute("DELETE FROM consultations WHERE reason = 'Otitis recurrente'")
+            db.conn.commit()
+            self.assertEqual(len(db.search_consultations("dermatitis")), 1)
+            self.assertEqual(len(db.search_consultations("otitis")), 1)
+            db.delete_pet(pet_id)
+            self.assertEqual(db.search_consultations("otitis"), [])
+
+    def test_existing_consultations_are_indexed_by_migration(self):
+        conn = sqlite3.connect(self.db_path)
+        for statement in database.MIGRATIONS[0]:
+            conn.execute(statement)
+        conn.execute("INSERT INTO owners VALUES (1, 'Ana', '1', 'Calle')")
+        conn.execute("INSERT INTO pets VALUES (1, 'Rex', 'Perro', 'Beagle', 3, 1)")
+        conn.execute("INSERT INTO consultations VALUES (1, '2025-06-01 10:00', 'Cojera', 'Esguince', 1)")
+        conn.commit()
+        conn.close()
+        with Database(self.db_path) as db:
+            self.assertEqual(db.search_consultations("esguince")[0][0], 1)
+
+
+class TestCascadeDeletes(TempDirTestCase):
+    """
+    Pruebas del borrado en cascada:
+     - Borrar un dueño elimina sus mascotas y las consultas de estas
+     - Los borrados masivos eliminan subárboles completos
+     - Las claves foráneas se comprueban al insertar
+     - La migración limpia huérfanos y conserva IDs y contadores
+    """
+
+    def count(self, db, table):
+        return db.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def seed(self, db):
+        owner_ids = db.add_owners_many((f"Dueno {i}", str(i), "Calle") for i in range(4))
+        pet_ids = db.add_pets_many((f"Mascota {i}", "Gato", "Persa", 1, owner_ids[i // 2]) for i in range(8))
+        db.add_consultations_many(("2025-06-01 10:00", "Chequeo", "Sano", pet_id) for pet_id in pet_ids)
+        return owner_ids, pet_ids
+
+    def test_delete_owner_removes_whole_subtree(self):
+        with Database(self.db_path) as db:
+            owner_ids, _ = self.seed(db)
+            db.delete_owner(owner_ids[0])
+            self.assertEqual(self.count(db, "pets"), 6)
+            self.assertEqual(self.count(db, "consultations"), 6)
+
+    def test_bulk_deletes(self):
+        with Database(self.db_path) as db:
+            owner_ids, pet_ids = self.seed(db)
+            self.assertEqual(db.delete_owners(owner_ids[:3]), 3)
+            self.assertEqual(self.count(db, "pets"), 2)
+            self.assertEqual(db.delete_pets([pet_ids[6], 999]), 1)
+            self.assertEqual(self.count(db, "consultations"), 1)
+
+    def test_foreign_keys_are_enforced(self):
+        with Database(self.db_path) as db:
+            with self.assertRaises(sqlite3.IntegrityError):
+                db.add_pet("Rex", "Perro", "Beagle", 3, 42)
+
+    def test_migration_cleans_orphans_and_keeps_ids(self):
+        conn = sqlite3.connect(self.db_path)
+        for statement in database.MIGRATIONS[0]:
+            conn.execute(statement)
+        conn.execute("INSERT INTO owners VALUES (1, 'Ana', '1', 'Calle')")
+        conn.execute("INSERT INTO pets VALUES (5, 'Rex', 'Perro', 'Beagle', 3, 1)")
+        conn.execute("INSERT INTO pets VALUES (9, 'Huerfano', 'Gato', 'Persa', 1, 7)")
+        conn.execute("INSERT INTO consultations VALUES (3, '2025-06-01 10:00', 'Chequeo', 'Sano', 5)")
+        conn.execute("INSERT INTO consultations VALUES (4, '2025-06-01 10:00', 'Chequeo', 'Sano', 9)")
+        conn.execute("INSERT INTO consultations VALUES (8, '2025-06-01 10:00', 'Chequeo', 'Sano', 2)")
+        conn.commit()
+        conn.close()
+        with Database(self.db_path) as db:
+            self.assertEqual(db.get_pet_by_name("Rex")[0], 5)
+            self.assertIsNone(db.get_pet_by_name("Huerfano"))
+            self.assertEqual(self.count(db, "consultations"), 1)
+            # El contador AUTOINCREMENT no retrocede aunque se borraran filas
+            self.assertEqual(db.add_pet("Toby", "Perro", "Beagle", 2, 1), 10)
+            self.assertEqual(db.add_consultation("2025-06-02 10:00", "Vacuna", "Sano", 5), 9)
+            self.assertEqual(len(db.search_consultations("vacuna")), 1)
+            db.delete_owner(1)
+            self.assertEqual(self.count(db, "consultations"), 0)
+
+
+class TestRowRecords(unittest.TestCase):
+    """
+    Pruebas de las filas tipadas:
+     - Los registros admiten acceso por nombre y por posición
+     - row_mode="tuple" devuelve tuplas sin procesar
+     - Los modelos se construyen directamente desde las filas
+    """
+
+    def seed(self, db):
+        owner_id = db.add_owner("Ana", "600", "Calle Sol")
+        pet_id = db.add_pet("Rex", "Perro", "Beagle", 3, owner_id)
+        db.add_consultation("2025-06-01 10:00", "Chequeo", "Sano", pet_id)
+        return owner_id, pet_id
+
+    def test_records_by_name_and_position(self):
+        with Database.in_memory() as db:
+            owner_id, pet_id = self.seed(db)
+            pet = db.get_pet_by_name("Rex")
+            self.assertEqual(pet.owner_id, owner_id)
+            self.assertEqual(pet[0], pet_id)
+            self.assertEqual(pet, (pet_id, "Rex", "Perro", "Beagle", 3, owner_id))
+            listed = db.get_all_pets()[0]
+            self.assertEqual((listed.owner_name, listed.phone), ("Ana", "600"))
+            consultation = db.get_consultations_by_pet_id(pet_id)[0]
+            self.assertEqual(consultation.reason, "Chequeo")
+
+    def test_tuple_mode(self):
+        with Database.in_memory(row_mode="tuple") as db:
+            self.seed(db)
+            self.assertIs(type(db.get_owner_by_name("Ana")), tuple)
+            self.assertIs(type(next(db.iter_owners_with_pets())), tuple)
+            with self.assertRaises(ValueError):
+                Clinic(db)
+        with self.assertRaises(ValueError):
+            Database.in_memory(row_mode="dict")
+
+    def test_models_from_rows(self):
+        with Database.in_memory() as db:
+            owner_id, pet_id = self.seed(db)
+            owner = Owner.from_row(db.get_owner_by_name("Ana"))
+            pet = Pet.from_row(db.get_pet_by_name("Rex"), owner)
+            consultation = Consultation.from_row(db.get_consultations_by_pet_id(pet_id)[0], pet.name)
+        self.assertEqual((owner.id, owner.address), (owner_id, "Calle Sol"))
+        self.assertEqual((pet.id, pet.owner), (pet_id, owner))
+        self.assertEqual(consultation.date, datetime(2025, 6, 1, 10, 0))
+        self.assertEqual(consultation.pet_name, "Rex")
+
+    def test_clinic_loads_models_through_row_factory(self):
+        with Database.in_memory() as db:
+            owner_id, pet_id = self.seed(db)
+            clinic = Clinic(db)
+            clinic.load_consultations()
+        owner, = clinic.owners
+        pet, = clinic.pets
+        self.assertEqual((owner.id, owner.name, owner.address), (owner_id, "Ana", "Calle Sol"))
+        self.assertEqual((pet.id, pet.name, pet.age), (pet_id, "Rex", 3))
+        self.assertIs(pet.owner, owner)
+        self.assertEqual([(c.pet_id, c.pet_name) for c in clinic.consultations], [(pet_id, "Rex")])
+
+
+class TestOwnerUpsert(TempDirTestCase):
+    """
+    Pruebas de la clave natural de los dueños:
+     - upsert_owner reutiliza el dueño con el mismo nombre y teléfono
+     - La migración fusiona los duplicados existentes
+     - Varios hilos no pueden crear el mismo dueño dos veces
+    """
+
+    def test_upsert_reuses_owner_and_updates_address(self):
+        with Database(self.db_path) as db:
+            owner_id = db.upsert_owner("Ana", "600", "Calle Sol")
+            self.assertEqual(db.upsert_owner("Ana", "600", "Calle Luna"), owner_id)
+            self.assertEqual(db.get_owner_by_name("Ana").address, "Calle Luna")
+            self.assertNotEqual(db.upsert_owner("Ana", "700", "Calle Mar"), owner_id)
+            with self.assertRaises(sqlite3.IntegrityError):
+                db.add_owner("Ana", "600", "Calle Sol")
+
+    def test_clinic_add_owner_reuses_existing(self):
+        with Database(self.db_path) as db:
+            clinic = Clinic(db)
+            first = clinic.add_owner("Ana", "600", "Calle Sol")
+            second = clinic.add_owner("Ana", "600", "Calle Luna")
+            self.assertIs(first, second)
+            self.assertEqual(len(clinic.owners), 1)
+            self.assertEqual(first.address, "Calle Luna")
+
+    def test_migration_merges_duplicates(self):
+        conn = sqlite3.connect(self.db_path)
+        for statement in database.MIGRATIONS[0]:
+            conn.execute(statement)
+        conn.execute("INSERT INTO owners VALUES (1, 'Ana', '600', 'Calle Sol')")
+        conn.execute("INSERT INTO owners VALUES (2, 'Ana', '600', 'Calle Luna')")
+        conn.execute("INSERT INTO owners VALUES (3, 'Ana', '700', 'Calle Mar')")
+        conn.execute("INSERT INTO pets VALUES (1, 'Rex', 'Perro', 'Beagle', 3, 2)")
+        conn.execute("INSERT INTO pets VALUES (2, 'Misu', 'Gato', 'Persa', 1, 3)")
+        conn.commit()
+        conn.close()
+        with Database(self.db_path) as db:
+            owners = db.conn.execute("SELECT id, address FROM owners ORDER BY id").fetchall()
+            self.assertEqual(owners, [(1, "Calle Sol"), (3, "Calle Mar")])
+            self.assertEqual(db.get_pet_by_name("Rex").owner_id, 1)
+            self.assertEqual(db.get_pet_by_name("Misu").owner_id, 3)
+
+    def test_concurrent_upserts_create_one_owner(self):
+        db = ConcurrentDatabase(self.db_path)
+        try:
+            ids = []
+            threads = [
+                threading.Thread(target=lambda: ids.append(db.upsert_owner("Ana", "600", "Calle Sol")))
+                for _ in range(8)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(len(set(ids)), 1)
+            with db.connection() as conn:
+                self.assertEqual(conn.execute("SELECT COUNT(*) FROM owners").fetchone()[0], 1)
+        finally:
+            db.close()
+
+
+class TestDateRanges(TempDirTestCase):
+    """
+    Pruebas de las consultas por fecha:
+     - Las fechas se guardan normalizadas
+     - get_consultations_between usa un intervalo semiabierto sobre el índice
+     - get_agenda devuelve las consultas del día con mascota y dueño
+     - La migración normaliza las fechas existentes
+    """
+
+    def seed(self, db):
+        owner_id = db.add_owner("Ana", "600", "Calle Sol")
+        pet_id = db.add_pet("Rex", "Perro", "Beagle", 3, owner_id)
+        db.add_consultations_many([
+            ("2025-06-01T18:30", "Vacuna", "Sano", pet_id),
+            ("01/06/2025 09:15", "Chequeo", "Sano", pet_id),
+            ("2025-06-02 00:00", "Control", "Sano", pet_id),
+        ])
+        return pet_id
+
+    def test_dates_are_normalized(self):
+        self.assertEqual(database.normalize_date(datetime(2025, 6, 1, 9, 5)), "2025-06-01 09:05")
+        self.assertEqual(database.normalize_date("2025-06-01"), "2025-06-01 00:00")
+        with self.assertRaises(ValueError):
+            database.normalize_date("mañana")
+        with Database(self.db_path) as db:
+            pet_id = self.seed(db)
+            dates = [row.date for row in db.get_consultations_by_pet_id(pet_id)]
+        self.assertEqual(dates, ["2025-06-01 09:15", "2025-06-01 18:30", "2025-06-02 00:00"])
+
+    def test_between_is_half_open_and_uses_index(self):
+        with Database(self.db_path) as db:
+            self.seed(db)
+            rows = db.get_consultations_between("2025-06-01 09:15", "2025-06-02")
+            self.assertEqual([row.reason for row in rows], ["Chequeo", "Vacuna"])
+            plan = db.conn.execute(
+                "EXPLAIN QUERY PLAN SELECT * FROM consultations WHERE date >= ? AND date < ?", ("a", "b")
+            ).fetchall()
+            self.assertIn("idx_consultations_date", plan[0][3])
+
+    def test_agenda(self):
+        with Database(self.db_path) as db:
+            self.seed(db)
+            agenda = db.get_agenda(datetime(2025, 6, 1).date())
+            self.assertEqual([row.reason for row in agenda], ["Chequeo", "Vacuna"])
+            self.assertEqual((agenda[0].pet_name, agenda[0].owner_name, agenda[0].phone), ("Rex", "Ana", "600"))
+            self.assertEqual(len(db.get_agenda("2025-06-02")), 1)
+            self.assertEqual(db.get_agenda(), [])
+
+    def test_migration_normalizes_and_quarantines_existing_dates(self):
+        conn = sqlite3.connect(self.db_path)
+        for statement in database.MIGRATIONS[0]:
+            conn.execute(statement)
+        conn.execute("INSERT INTO owners VALUES (1, 'Ana', '600', 'Calle Sol')")
+        conn.execute("INSERT INTO pets VALUES (1, 'Rex', 'Perro', 'Beagle', 3, 1)")
+        conn.execute("INSERT INTO consultations VALUES (1, '2025-06-01 9:05', 'Chequeo', 'Sano', 1)")
+        conn.execute("INSERT INTO consultations VALUES (2, 'sin fecha', 'Vacuna', 'Sano', 1)")
+        conn.commit()
+        conn.close()
+        with Database(self.db_path) as db:
+            dates = db.conn.execute("SELECT date FROM consultations ORDER BY id").fetchall()
+            quarantined = db.conn.execute("SELECT id, date FROM quarantined_consultations").fetchall()
+            self.assertEqual(db.get_consultations_per_pet()[0].consultations, 1)
+            clinic = Clinic(db)
+            history = clinic.get_pet_consultations(1)
+        self.assertEqual(dates, [("2025-06-01 09:05",)])
+        self.assertEqual(quarantined, [(2, "sin fecha")])
+        self.assertEqual([c.date for c in history], [datetime(2025, 6, 1, 9, 5)])
+
+
+class TestSummaryReports(TempDirTestCase):
+    """
+    Pruebas de los informes de resumen:
+     - Los triggers mantienen los contadores al insertar, modificar y borrar
+     - Los borrados en cascada descuentan mascotas y consultas
+     - La migración rellena los resúmenes a partir de los datos existentes
+    """
+
+    def assertSummariesMatch(self, db):
+        # Los informes deben coincidir con agregar las tablas completas
+        conn = db.conn
+        self.assertEqual(
+            sorted(db.get_consultations_per_pet()),
+            sorted(conn.execute(
+                "SELECT p.id, p.name, COUNT(c.id) FROM pets p LEFT JOIN consultations c ON c.pet_id = p.id GROUP BY p.id"
+            ).fetchall()),
+        )
+        self.assertEqual(db.get_consultations_per_month(), conn.execute(
+            "SELECT substr(date, 1, 7), COUNT(*) FROM consultations GROUP BY 1 ORDER BY 1"
+        ).fetchall())
+        self.assertEqual(db.get_species_summary(), conn.execute(
+            "SELECT p.species, COUNT(DISTINCT p.id), COUNT(c.id) FROM pets p "
+            "LEFT JOIN consultations c ON c.pet_id = p.id GROUP BY p.species ORDER BY p.species"
+        ).fetchall())
+        self.assertEqual(db.get_pets_per_owner(), conn.execute(
+            "SELECT o.id, o.name, COUNT(p.id) FROM owners o LEFT JOIN pets p ON p.owner_id = o.id GROUP BY o.id ORDER BY o.id"
+        ).fetchall())
+
+    def seed(self, db):
+        owner_ids = db.add_owners_many((f"Dueno {i}", str(i), "Calle") for i in range(4))
+        pet_ids = db.add_pets_many(
+            (f"Mascota {i}", "Perro" if i % 3 else "Gato", "Mestizo", 1, owner_ids[i % 4]) for i in range(12)
+        )
+        db.add_consultations_many(
+            (f"2025-0{1 + i % 3}-1{i % 10} 10:00", "Chequeo", "Sano", pet_ids[i % 12]) for i in range(40)
+        )
+        return owner_ids, pet_ids
+
+    def test_reports_follow_writes(self):
+        with Database(self.db_path) as db:
+            owner_ids, pet_ids = self.seed(db)
+            self.assertSummariesMatch(db)
+            self.assertEqual(db.get_consultations_per_pet(limit=1)[0].consultations, 4)
+            self.assertEqual(
+                db.get_species_summary(),
+                [("Gato", 4, 14), ("Perro", 8, 26)],
+            )
+
+            db.update_pet(pet_ids[0], "Mascota 0", "Conejo", "Belier", 2, owner_ids[1])
+            db.conn.execute("UPDATE consultations SET date = '2025-09-01 10:00' WHERE id = 1")
+            self.assertSummariesMatch(db)
+
+            db.delete_pet(pet_ids[1])
+            db.delete_owner(owner_ids[2])
+            db.delete_pets(pet_ids[6:9])
+            self.assertSummariesMatch(db)
+            self.assertEqual(db.get_pets_per_owner()[-1].pets, 2)
+
+    def test_migration_backfills_summaries(self):
+        conn = sqlite3.connect(self.db_path)
+        for statement in database.MIGRATIONS[0]:
+            conn.execute(statement)
+        conn.execute("INSERT INTO owners VALUES (1, 'Ana', '600', 'Calle Sol')")
+        conn.execute("INSERT INTO owners VALUES (2, 'Luis', '700', 'Calle Mar')")
+        conn.execute("INSERT INTO pets VALUES (1, 'Rex', 'Perro', 'Beagle', 3, 1)")
+        conn.execute("INSERT INTO pets VALUES (2, 'Misu', 'Gato', 'Persa', 1, 1)")
+        conn.execute("INSERT INTO consultations VALUES (1, '2025-06-01 10:00', 'Chequeo', 'Sano', 1)")
+        conn.execute("INSERT INTO consultations VALUES (2, '2025-07-01 10:00', 'Vacuna', 'Sano', 1)")
+        conn.commit()
+        conn.close()
+        with Database(self.db_path) as db:
+            self.assertSummariesMatch(db)
+            self.assertEqual(db.get_consultations_per_month(), [("2025-06", 1), ("2025-07", 1)])
+            self.assertEqual(db.get_pets_per_owner(), [(1, "Ana", 2), (2, "Luis", 0)])
+
+
+class TestBackup(TempDirTestCase):
+    """
+    Pruebas de la copia de seguridad en caliente:
+     - La copia por pasos informa del progreso y reproduce los datos
+     - Los escritores pueden escribir entre pasos sin bloquearse
+     - El subcomando backup de main.py genera la copia
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.backup_path = os.path.join(self.tmpdir.name, "copia.db")
+        self.db = Database(self.db_path)
+        owner_ids = self.db.add_owners_many((f"Dueno {i}", str(i), "Calle " * 50) for i in range(300))
+        self.db.add_pets_many((f"Mascota {i}", "Perro", "Mestizo", 1, owner_id) for i, owner_id in enumerate(owner_ids))
+
+    def tearDown(self):
+        self.db.close()
+
+    def count_owners(self, path):
+        conn = sqlite3.connect(path)
+        try:
+            return conn.execute("SELECT COUNT(*) FROM owners").fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_stepped_backup_with_progress(self):
+        steps = []
+        self.db.backup(self.backup_path, pages_per_step=4, progress=lambda *args: steps.append(args))
+        self.assertGreater(len(steps), 1)
+        self.assertEqual(steps[-1][1], 0)
+        self.assertEqual(self.count_owners(self.backup_path), 300)
+        self.assertFalse(os.path.exists(self.backup_path + ".tmp"))
+
+        target = sqlite3.connect(":memory:")
+        self.db.backup(target)
+        self.assertEqual(target.execute("SELECT COUNT(*) FROM pets").fetchone()[0], 300)
+        target.close()
+
+    def test_writers_are_not_blocked_between_steps(self):
+        writer = Database(self.db_path)
+        written = []
+
+        def progress(status, remaining, total):
+            if not written:
+                written.append(writer.add_owner("Nueva", "999", "Calle"))
+
+        try:
+            self.db.backup(self.backup_path, pages_per_step=4, progress=progress)
+        finally:
+            writer.close()
+        self.assertEqual(len(written), 1)
+        self.assertEqual(self.count_owners(self.backup_path), 301)
+
+    def test_backup_command(self):
+        import main
+        with mock.patch("builtins.print"):
+            main.main(["backup", self.backup_path, "--db", self.db_path, "--pages", "8"])
+        self.assertEqual(self.count_owners(self.backup_path), 300)
+
+    def test_backup_command_missing_source(self):
+        import main
+        missing = os.path.join(self.tmpdir.name, "no_existe.db")
+        with mock.patch("builtins.print"), self.assertRaises(SystemExit):
+            main.main(["backup", self.backup_path, "--db", missing])
+        self.assertFalse(os.path.exists(missing))
+        self.assertFalse(os.path.exists(self.backup_path))
+
+    def test_read_only_source_is_not_migrated(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA user_version = 3")
+        conn.commit()
+        conn.close()
+        with Database(self.db_path, read_only=True) as db:
+            db.backup(self.backup_path)
+            with self.assertRaises(sqlite3.OperationalError):
+                db.conn.execute("DELETE FROM owners")
+        conn = sqlite3.connect(self.db_path)
+        self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], 3)
+        conn.close()
+        self.assertEqual(self.count_owners(self.backup_path), 300)
+
+
+class TestArchive(TempDirTestCase):
+    """
+    Pruebas del archivo histórico:
+     - Las consultas antiguas se mueven a "<base>.archive.db" por lotes
+     - El historial de una mascota puede incluir las archivadas
+     - Los informes siguen contando el historial archivado
+     - Borrar una mascota borra también su historial archivado
+     - Las copias de seguridad incluyen el archivo histórico
+     - Adjuntarlo dentro de una transacción da un error claro
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.db = Database(self.db_path)
+        owner_id = self.db.add_owner("Ana", "600", "Calle Sol")
+        self.pet_ids = self.db.add_pets_many([
+            ("Rex", "Perro", "Beagle", 3, owner_id),
+            ("Misu", "Gato", "Persa", 1, owner_id),
+        ])
+        self.db.add_consultations_many(
+            (f"2024-{1 + i % 12:02d}-01 10:00", "Chequeo", "Sano", self.pet_ids[i % 2]) for i in range(24)
+        )
+        self.db.add_consultations_many([
+            ("2025-06-01 10:00", "Vacuna", "Sano", self.pet_ids[0]),
+            ("2025-06-02 10:00", "Otitis", "Leve", self.pet_ids[1]),
+        ])
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_archive_moves_old_consultations(self):
+        self.assertFalse(os.path.exists(os.path.join(self.tmpdir.name, "clinica.archive.db")))
+        reports = (self.db.get_consultations_per_pet(), self.db.get_consultations_per_month(),
+                   self.db.get_species_summary())
+
+        self.assertEqual(self.db.archive_consultations("2025-01-01", batch_size=5), 24)
+        self.assertTrue(os.path.exists(os.path.join(self.tmpdir.name, "clinica.archive.db")))
+        self.assertEqual(self.db.conn.execute("SELECT COUNT(*) FROM main.consultations").fetchone()[0], 2)
+        self.assertEqual(len(self.db.get_consultations_by_pet_id(self.pet_ids[0])), 1)
+        history = self.db.get_consultations_by_pet_id(self.pet_ids[0], include_archive=True)
+        self.assertEqual(len(history), 13)
+        self.assertEqual(history[-1].reason, "Vacuna")
+        self.assertEqual((self.db.get_consultations_per_pet(), self.db.get_consultations_per_month(),
+                          self.db.get_species_summary()), reports)
+        self.assertEqual(self.db.archive_consultations("2025-01-01"), 0)
+
+    def test_summary_restore_is_instrumented(self):
+        self.db.archive_consultations("2025-01-01", batch_size=5)
+        stats = self.db.stats()
+        for table in ("pet_summary", "species_summary", "month_summary"):
+            calls = [entry["calls"] for sql, entry in stats.items() if table in sql and "consultations +" in sql]
+            self.assertEqual(calls, [5], table)
+
+    def test_archive_is_attached_on_reopen_and_follows_deletes(self):
+        self.db.archive_consultations("2025-01-01")
+        self.db.close()
+        with Database(self.db_path) as db:
+            self.assertEqual(len(db.get_consultations_by_pet_id(self.pet_ids[1], include_archive=True)), 13)
+            db.delete_owner(1)
+            self.assertEqual(db.conn.execute("SELECT COUNT(*) FROM archived_consultations").fetchone()[0], 0)
+            self.assertEqual(db.get_consultations_per_month(), [])
+
+    def test_archive_is_per_database(self):
+        self.db.archive_consultations("2025-01-01")
+        other_path = os.path.join(self.tmpdir.name, "otra.db")
+        with Database(other_path) as other:
+            owner_id = other.add_owner("Luis", "700", "Avenida")
+            pet_id = other.add_pet("Toby", "Perro", "Mestizo", 2, owner_id)
+            self.assertEqual(pet_id, self.pet_ids[0])
+            self.assertEqual(other.get_consultations_by_pet_id(pet_id, include_archive=True), [])
+            self.assertEqual(other.archive_name, os.path.join(self.tmpdir.name, "otra.archive.db"))
+
+    def test_new_database_next_to_existing_archive(self):
+        self.db.archive_consultations("2025-01-01")
+        shutil.copy(self.db.archive_name, os.path.join(self.tmpdir.name, "nueva.archive.db"))
+        with Database(os.path.join(self.tmpdir.name, "nueva.db")) as db:
+            self.assertEqual(db.get_consultations_per_month(), [])
+
+    def test_connection_opened_before_first_archive_gets_trigger(self):
+        early = Database(self.db_path)
+        try:
+            early.get_all_pets()
+            self.db.archive_consultations("2025-01-01")
+            early.delete_pet(self.pet_ids[1])
+        finally:
+            early.close()
+        self.assertEqual(
+            self.db.conn.execute("SELECT COUNT(*) FROM archived_consultations WHERE pet_id = ?",
+                                 (self.pet_ids[1],)).fetchone()[0], 0
+        )
+        self.assertEqual(sum(row.consultations for row in self.db.get_consultations_per_month()), 13)
+
+    def test_backup_includes_archive(self):
+        import main
+        self.db.archive_consultations("2025-01-01")
+        self.db.backup(os.path.join(self.tmpdir.name, "copia.db"))
+        with mock.patch("builtins.print"):
+            main.main(["backup", os.path.join(self.tmpdir.name, "copia2.db"), "--db", self.db_path])
+        for name in ("copia", "copia2"):
+            self.assertTrue(os.path.exists(os.path.join(self.tmpdir.name, f"{name}.archive.db")))
+            with Database(os.path.join(self.tmpdir.name, f"{name}.db")) as copy:
+                history = copy.get_consultations_by_pet_id(self.pet_ids[0], include_archive=True)
+                self.assertEqual(len(history), 13)
+                self.assertEqual(len(copy.get_consultations_by_pet_id(self.pet_ids[0])), 1)
+
+    def test_attach_inside_transaction(self):
+        with self.assertRaisesRegex(RuntimeError, "dentro de una transacción"):
+            with self.db.transaction():
+                self.db.archive_consultations("2025-01-01")
+        self.assertFalse(os.path.exists(self.db.archive_name))
+        self.assertEqual(self.db.archive_consultations("2025-01-01"), 24)
+        # Un archivo que ya existe al empezar la transacción se adjunta antes del BEGIN
+        with Database(self.db_path) as other, other.transaction():
+            history = other.get_consultations_by_pet_id(self.pet_ids[0], include_archive=True)
+        self.assertEqual(len(history), 13)
+
+
+class TestShardedDatabase(TempDirTestCase):
+    """
+    Pruebas de la base de datos por sucursales:
+     - Cada sucursal escribe en su propio archivo con sus propios IDs
+     - Las consultas federadas se lanzan en paralelo y combinan los resultados
+     - Una sucursal desconocida se rechaza
+     - Las fachadas exponen todos los métodos de las listas de database.py
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.shards = {
+            "centro": os.path.join(self.tmpdir.name, "centro.db"),
+            "norte": os.path.join(self.tmpdir.name, "norte.db"),
+        }
+
+    def test_failed_shard_closes_the_others(self):
+        shards = {"roto": os.path.join(self.tmpdir.name, "no_existe", "roto.db"), **self.shards}
+        with mock.patch.object(Database, "close", autospec=True, side_effect=Database.close) as close:
+            with self.assertRaises(sqlite3.OperationalError):
+                ShardedDatabase(shards, slow_query_ms=None)
+        self.assertEqual(close.call_count, 2)
+        self.assertFalse([t for t in threading.enumerate() if t.name.startswith("clinica-db-")])
+
+    def test_facades_share_method_lists(self):
+        from sharded_database import BranchDatabase
+        names = database.WRITE_METHODS + database.READ_METHODS + database.MAINTENANCE_METHODS
+        self.assertEqual(len(names), len(set(names)))
+        for name in names:
+            self.assertTrue(callable(getattr(Database, name)), name)
+            self.assertTrue(hasattr(BranchDatabase, name), name)
+            self.assertTrue(hasattr(AsyncDatabase, name), name)
+        for name in database.WRITE_METHODS:
+            self.assertIsNot(getattr(ConcurrentDatabase, name), getattr(Database, name), name)
+
+    def seed(self, db, branch_id, pet_name, date):
+        branch = db.branch(branch_id)
+        owner_id = branch.add_owner("Ana", "600", "Calle Sol")
+        pet_id = branch.add_pet(pet_name, "Perro", "Beagle", 3, owner_id)
+        branch.add_consultation(date, "Chequeo", "Sano", pet_id)
+        return owner_id, pet_id
+
+    def test_writes_are_routed_to_their_branch(self):
+        with ShardedDatabase(self.shards) as db:
+            self.assertEqual(db.branches, ["centro", "norte"])
+            self.assertEqual(self.seed(db, "centro", "Rex", "2025-06-01 10:00"), (1, 1))
+            self.assertEqual(self.seed(db, "norte", "Misu", "2025-06-01 09:00"), (1, 1))
+            self.assertIsNone(db.branch("norte").get_pet_by_name("Rex"))
+            with self.assertRaises(ValueError):
+                db.branch("sur")
+        for db_name in self.shards.values():
+            with Database(db_name) as shard:
+                self.assertEqual(len(shard.get_all_pets()), 1)
+
+    def test_federated_reads(self):
+        with ShardedDatabase(self.shards) as db:
+            self.seed(db, "centro", "Rex", "2025-06-01 10:00")
+            self.seed(db, "norte", "Rex", "2025-06-01 09:00")
+            matches = db.get_pet_by_name("Rex")
+            self.assertEqual([match.branch_id for match in matches], ["centro", "norte"])
+            self.assertEqual(matches[1].row.name, "Rex")
+            agenda = db.get_agenda("2025-06-01")
+            self.assertEqual([item.branch_id for item in agenda], ["norte", "centro"])
+            self.assertEqual(len(db.get_owner_by_name("Ana")), 2)
+
+            with mock.patch.object(Database, "get_pet_by_name", lambda self, name: threading.get_ident()):
+                threads = db.fan_out("get_pet_by_name", "Rex")
+            self.assertEqual(len(set(threads.values())), 2)
+            self.assertNotIn(threading.get_ident(), threads.values())
+
+    def test_run_transaction_in_branch(self):
+        def intake(db):
+            owner_id = db.add_owner("Luis", "700", "Calle Mar")
+            return db.add_pet("Toby", "Perro", "Mestizo", 2, owner_id)
+
+        with ShardedDatabase(self.shards) as db:
+            self.assertEqual(db.branch("norte").run_transaction(intake), 1)
+            self.assertEqual([match.branch_id for match in db.get_pet_by_name("Toby")], ["norte"])
+
+
+class TestInMemoryFixtures(unittest.TestCase):
+    """
+    Pruebas del modo en memoria y de los datos de ejemplo:
+     - Las bases en memoria con el mismo nombre comparten los datos
+     - Sin nombre, cada base en memoria es independiente y no crea archivos
+     - Los datos en memoria siguen ahí al reabrir la conexión tras close()
+     - seed_clinic carga miles de filas coherentes
+    """
+
+    def test_shared_memory_database(self):
+        first = Database.in_memory("compartida")
+        second = Database.in_memory("compartida")
+        try:
+            first.add_owner("Ana", "600", "Calle Sol")
+            self.assertEqual(second.get_owner_by_name("Ana").phone, "600")
+            self.assertIsNone(Database.in_memory().get_owner_by_name("Ana"))
+            self.assertIsNone(first.archive_name)
+            with self.assertRaises(ValueError):
+                ConcurrentDatabase(first.db_name)
+        finally:
+            first.close()
+            second.close()
+
+    def test_memory_database_survives_close(self):
+        db = Database.in_memory()
+        try:
+            db.add_owner("Ana", "600", "Calle Sol")
+            db.close()
+            self.assertEqual(db.get_owner_by_name("Ana").phone, "600")
+        finally:
+            db.close()
+
+    def test_seed_clinic_volume(self):
+        db = Database.in_memory()
+        try:
+            seeded = seed_clinic(db, owners=500, pets_per_owner=2, consultations_per_pet=5)
+            self.assertEqual(len(seeded.pet_ids), 1000)
+            self.assertEqual(len(seeded.consultation_ids), 5000)
+            clinic = Clinic(db)
+            self.assertEqual((len(clinic.owners), len(clinic.pets)), (500, 1000))
+            self.assertEqual(len(clinic.get_pet_consultations(clinic.pets[-1].id)), 5)
+            clinic.validar_ascii_letras(owner=clinic.owners[0].name, pet=clinic.pets[0].name)
+            self.assertEqual(sum(row.consultations for row in db.get_consultations_per_month()), 5000)
+        finally:
+            db.close()
+
+    def test_seed_is_deterministic(self):
+        first, second = Database.in_memory(), Database.in_memory()
+        try:
+            seed_clinic(first, owners=20, seed=7)
+            seed_clinic(second, owners=20, seed=7)
+            self.assertEqual(first.get_all_pets(), second.get_all_pets())
+        finally:
+            first.close()
+            second.close()
+
+
+class TestClinicIndexes(unittest.TestCase):
+    """
+    Pruebas de los índices en memoria de Clinic:
+     - Las búsquedas por ID y por nombre usan los índices tras la carga
+     - Las consultas quedan agrupadas por mascota
+     - Las bajas mantienen los índices coherentes con las listas
+    """
+
+    def setUp(self):
+        self.db = Database.in_memory()
+        self.seeded = seed_clinic(self.db, owners=50, pets_per_owner=2, consultations_per_pet=3)
+        self.clinic = Clinic(self.db)
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_lookups_after_load(self):
+        pet = self.clinic.pets[10]
+        self.assertIs(self.clinic.find_pet(pet.name), pet)
+        self.assertIs(self.clinic.find_owner(pet.owner.name), pet.owner)
+        self.assertIsNone(self.clinic.find_pet("Nadie"))
+        self.assertEqual(len(self.clinic.get_pet_consultations(pet.id)), 3)
+        self.assertTrue(all(c.pet_name == pet.name for c in self.clinic.get_pet_consultations(pet.id)))
+
+    def test_add_owner_reuses_indexed_owner(self):
+        owner = self.clinic.owners[0]
+        same = self.clinic.add_owner(owner.name, owner.phone, "Calle Nueva 1")
+        self.assertIs(same, owner)
+        self.assertEqual(owner.address, "Calle Nueva 1")
+        self.assertEqual(len(self.clinic.owners), 50)
+
+    def test_delete_keeps_indexes_consistent(self):
+        pet = self.clinic.pets[0]
+        self.clinic.delete_pet(pet.id)
+        self.assertIsNone(self.clinic.find_pet(pet.name))
+        with self.assertRaises(Clinic.PetNotFoundError):
+            self.clinic.get_pet_consultations(pet.id)
+        self.assertEqual(len(self.clinic.pets), 99)
+
+        owner = self.clinic.owners[1]
+        self.clinic.delete_owner(owner.id)
+        self.assertIsNone(self.clinic.find_owner(owner.name))
+        self.assertFalse(any(p.owner is owner for p in self.clinic.pets))
+        self.assertEqual((len(self.clinic.owners), len(self.clinic.pets)), (49, 97))
+        self.assertIsNone(self.db.get_owner_by_name(owner.name))
+        with self.assertRaises(Clinic.OwnerNotFoundError):
+            self.clinic.delete_owner(owner.id)
+
+
+class TestConsultationCache(unittest.TestCase):
+    """
+    Pruebas de la caché LRU de historiales de Clinic:
+     - El arranque no lee consultas y cada historial se lee una sola vez
+     - La caché respeta su tamaño máximo descartando la mascota menos usada
+     - Las consultas nuevas aparecen en el historial ya cacheado
+    """
+
+    def setUp(self):
+        self.db = Database.in_memory()
+        seed_clinic(self.db, owners=5, pets_per_owner=2, consultations_per_pet=4)
+        self.clinic = Clinic(self.db, consultation_cache_size=3)
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_history_loaded_once(self):
+        pet = self.clinic.pets[0]
+        with mock.patch.object(self.db, "get_consultations_by_pet_id", wraps=self.db.get_consultations_by_pet_id) as fetch:
+            first = self.clinic.get_pet_consultations(pet.id)
+            second = self.clinic.get_pet_consultations(pet.id)
+        self.assertEqual(fetch.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertEqual(len(first), 4)
+        self.assertEqual([c.date for c in first], sorted(c.date for c in first))
+        self.assertEqual((self.clinic.cache_hits, self.clinic.cache_misses), (1, 1))
+
+    def test_least_recently_used_is_evicted(self):
+        a, b, c, d = (pet.id for pet in self.clinic.pets[:4])
+        for pet_id in (a, b, c, a, d):
+            self.clinic.get_pet_consultations(pet_id)
+        self.assertEqual(list(self.clinic._consultation_cache), [c, a, d])
+        self.clinic.get_pet_consultations(b)
+        self.assertEqual(self.clinic.cache_misses, 5)
+        self.clinic.clear_consultation_cache()
+        self.assertEqual(len(self.clinic._consultation_cache), 0)
+
+    def test_new_consultation_updates_cached_history(self):
+        pet = self.clinic.pets[0]
+        self.clinic.get_pet_consultations(pet.id)
+        with mock.patch("builtins.input", side_effect=["2024-12-31 08:00", pet.name, "Chequeo", "Sano"]):
+            created = self.clinic.add_consultation()
+        history = self.clinic.get_pet_consultations(pet.id)
+        self.assertEqual(len(history), 5)
+        self.assertIs(history[0], created)
+
+
+class TestClinicCoherence(TempDirTestCase):
+    """
+    Pruebas de la coherencia entre la memoria de Clinic y la base de datos:
+     - Las escrituras propias se reflejan en memoria sin recargar
+     - Los cambios de otra conexión se detectan con data_version y provocan una recarga
+     - Con ConcurrentDatabase las escrituras propias tampoco provocan recargas
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.db = Database(self.db_path)
+        seed_clinic(self.db, owners=3, pets_per_owner=1, consultations_per_pet=1)
+        self.clinic = Clinic(self.db)
+
+    def tearDown(self):
+        self.db.close()
+
+    def listed_names(self):
+        output = io.StringIO()
+        with mock.patch("builtins.input", return_value=""):
+            self.clinic.list_pets(stream=output)
+        return [line[8:] for line in output.getvalue().splitlines() if line.startswith("Nombre: ")]
+
+    def test_own_writes_do_not_reload(self):
+        with mock.patch("builtins.input", side_effect=["Rex", "Perro", "Beagle", "Ana", "3", "600", "Calle Sol"]):
+            self.clinic.add_pet()
+        with mock.patch.object(self.clinic, "load_pets_and_owners") as reload:
+            names = self.listed_names()
+        reload.assert_not_called()
+        self.assertEqual(names[-1], "Rex")
+        self.assertEqual(len(names), 4)
+
+    def test_external_change_triggers_refresh(self):
+        self.assertFalse(self.clinic.refresh())
+        other = Database(self.db_path)
+        try:
+            owner_id = other.add_owner("Luis", "700", "Avenida")
+            other.add_pet("Misu", "Gato", "Persa", 2, owner_id)
+        finally:
+            other.close()
+        self.assertIn("Misu", self.listed_names())
+        self.assertIs(self.clinic.find_pet("Misu").owner, self.clinic.find_owner("Luis"))
+        self.assertFalse(self.clinic.refresh())
+
+    def test_concurrent_backend_own_writes_do_not_reload(self):
+        db = ConcurrentDatabase(self.db_path, slow_query_ms=None)
+        try:
+            clinic = Clinic(db)
+            pet_name = clinic.pets[0].name
+            with mock.patch.object(clinic, "load_pets_and_owners") as reload:
+                for day in range(1, 4):
+                    clinic.add_consultation(f"2025-06-0{day} 10:00", "Chequeo", "Sano", pet_name)
+                clinic.add_pet("Toby", "Perro", "Beagle", 2, "Luis", "700", "Avenida")
+                self.assertFalse(clinic.refresh())
+            reload.assert_not_called()
+            self.db.add_owner("Eva", "800", "Plaza")
+            self.assertTrue(clinic.refresh())
+            self.assertIsNotNone(clinic.find_owner("Eva"))
+        finally:
+            db.close()
+
+
+class TestIngest(TempDirTestCase):
+    """
+    Pruebas de la carga por lotes:
+     - add_pet y add_consultation admiten argumentos y lanzan ValueError si no son válidos
+     - Un CSV de mascotas se carga por lotes y las filas inválidas van al archivo de rechazos
+     - Un JSONL de consultas se carga con un commit por lote
+     - El subcomando ingest de main.py informa del ritmo de carga
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.clinic = Clinic(Database(self.db_path))
+
+    def tearDown(self):
+        self.clinic.close()
+
+    def write_pets_csv(self, rows):
+        path = os.path.join(self.tmpdir.name, "mascotas.csv")
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["name", "species", "breed", "age", "owner_name", "phone", "address"])
+            writer.writerows(rows)
+        return path
+
+    def test_programmatic_add(self):
+        pet = self.clinic.add_pet("Rex", "Perro", "Beagle", "3", "Ana", "600", "Calle Sol")
+        self.assertEqual((pet.age, pet.owner.name), (3, "Ana"))
+        consultation = self.clinic.add_consultation("2025-06-01 10:00", "Chequeo", "Sano", "Rex")
+        self.assertEqual(self.clinic.get_pet_consultations(pet.id)[0].id, consultation.id)
+        with self.assertRaises(ValueError):
+            self.clinic.add_pet("Toby", "Perro", "Beagle", "-1", "Ana")
+        with self.assertRaises(ValueError):
+            self.clinic.add_pet("Toby", "Perro", "Beagle", "2", "Luis")
+        with self.assertRaises(ValueError):
+            self.clinic.add_consultation("01/06/2025", "Chequeo", "Sano", "Rex")
+        with self.assertRaises(Clinic.PetNotFoundError):
+            self.clinic.add_consultation("2025-06-01 10:00", "Chequeo", "Sano", "Nadie")
+
+    def test_ingest_pets_csv_with_rejects(self):
+        rows = [(f"Mascota {chr(65 + i % 26)}{chr(65 + i // 26)}", "Gato", "Persa", i % 10, "Ana", "600", "Calle Sol")
+                for i in range(120)]
+        rows[5] = ("Rex 5", "Gato", "Persa", 2, "Ana", "600", "Calle Sol")
+        rows[50] = ("Misu", "Gato", "Persa", "viejo", "Ana", "", "")
+        rows[70] = ("Coco", "Gato", "Persa", 2, "Luis", "", "")
+        path = self.write_pets_csv(rows)
+        result = ingest_file(self.clinic, path, "pets", batch_size=50)
+        self.assertEqual((result.accepted, result.rejected), (117, 3))
+        self.assertGreater(result.rows_per_second, 0)
+        with open(result.rejected_path, encoding="utf-8") as f:
+            rejected = [json.loads(line) for line in f]
+        self.assertEqual([entry["line"] for entry in rejected], [7, 52, 72])
+        self.assertEqual(rejected[2]["record"]["owner_name"], "Luis")
+        self.assertEqual(len(self.clinic.pets), 117)
+        self.assertEqual(len(self.clinic.owners), 1)
+        self.assertEqual(len(Database(self.db_path).get_all_pets()), 117)
+
+    def test_owner_resolved_by_name_and_phone(self):
+        path = self.write_pets_csv([
+            ("Rex", "Perro", "Beagle", 3, "Ana Garcia", "111", "Calle Sol"),
+            ("Misu", "Gato", "Persa", 2, "Ana Garcia", "222", "Calle Luna"),
+            ("Toby", "Perro", "Mestizo", 4, "Ana Garcia", "111", "Calle Mar"),
+            ("Coco", "Gato", "Persa", 1, "Ana Garcia", "", ""),
+        ])
+        result = ingest_file(self.clinic, path, "pets")
+        self.assertEqual((result.accepted, result.rejected), (4, 0))
+        rex, misu, toby, coco = (self.clinic.find_pet(name) for name in ("Rex", "Misu", "Toby", "Coco"))
+        self.assertIs(rex.owner, toby.owner)
+        self.assertIs(coco.owner, rex.owner)
+        self.assertEqual((misu.owner.phone, misu.owner.address), ("222", "Calle Luna"))
+        self.assertEqual(rex.owner.address, "Calle Mar")
+        self.assertEqual(len(self.clinic.owners), 2)
+        self.assertEqual(self.clinic.db.get_owner_by_name("Ana Garcia").phone, "111")
+        self.assertEqual(len(self.clinic.db.conn.execute("SELECT * FROM owners").fetchall()), 2)
+
+    def test_ingest_consultations_jsonl(self):
+        pet = self.clinic.add_pet("Rex", "Perro", "Beagle", 3, "Ana", "600", "Calle Sol")
+        path = os.path.join(self.tmpdir.name, "consultas.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for day in range(1, 29):
+                f.write(json.dumps({"date": f"2025-02-{day:02d} 10:00", "reason": "Chequeo",
+                                    "diagnosis": "Sano", "pet_name": "Rex"}) + "\n")
+            f.write("{no es json\n")
+            f.write(json.dumps({"date": "2025-02-01 10:00", "reason": "Chequeo", "pet_name": "Rex"}) + "\n")
+        statements = []
+        self.clinic.db.conn.set_trace_callback(statements.append)
+        result = ingest_file(self.clinic, path, "consultations", batch_size=10)
+        self.clinic.db.conn.set_trace_callback(None)
+        self.assertEqual((result.accepted, result.rejected), (28, 2))
+        self.assertEqual(statements.count("COMMIT"), 3)
+        self.assertEqual(len(self.clinic.get_pet_consultations(pet.id)), 28)
+
+    def test_ingest_command(self):
+        import main
+        self.clinic.close()
+        path = self.write_pets_csv([("Rex", "Perro", "Beagle", 3, "Ana", "600", "Calle Sol")])
+        with mock.patch("builtins.print") as fake_print:
+            main.main(["ingest", path, "--kind", "pets", "--db", self.db_path])
+        self.assertIn("Cargadas 1 filas, rechazadas 0", fake_print.call_args_list[0].args[0])
+        self.assertIn("filas/s", fake_print.call_args_list[0].args[0])
+        self.clinic = Clinic(Database(self.db_path))
+        self.assertEqual([pet.name for pet in self.clinic.pets], ["Rex"])
+
+
+class TestRenderer(unittest.TestCase):
+    """
+    Pruebas de la capa de presentación:
+     - Cada lote de filas se envía con una única escritura
+     - Los formatos table, csv y jsonl producen la salida esperada
+     - El paginador solo pide las filas de las páginas que se muestran
+    """
+
+    COLUMNS = (Column("id", "ID", lambda row: row[0]), Column("name", "Nombre", lambda row: row[1]))
+
+    def test_one_write_per_batch(self):
+        stream = mock.Mock()
+        renderer = Renderer(self.COLUMNS, "text", stream=stream, batch_size=100)
+        self.assertEqual(renderer.write((i, f"Mascota {i}") for i in range(1000)), 1000)
+        self.assertEqual(stream.write.call_count, 10)
+        self.assertEqual(stream.write.call_args_list[0].args[0].count("Nombre: Mascota"), 100)
+
+    def test_formats(self):
+        rows = [(1, "Rex"), (12, "Misu, la gata")]
+        outputs = {}
+        for output_format in ("table", "csv", "jsonl"):
+            outputs[output_format] = io.StringIO()
+            # csv con lotes de una fila: la cabecera no debe repetirse
+            batch_size = 1 if output_format == "csv" else 100
+            Renderer(self.COLUMNS, output_format, stream=outputs[output_format], batch_size=batch_size).write(rows)
+        self.assertEqual(outputs["table"].getvalue().splitlines(), [
+            "ID | Nombre", "---+--------------", "1  | Rex", "12 | Misu, la gata",
+        ])
+        self.assertEqual(list(csv.reader(io.StringIO(outputs["csv"].getvalue()))),
+                         [["id", "name"], ["1", "Rex"], ["12", "Misu, la gata"]])
+        self.assertEqual([json.loads(line) for line in outputs["jsonl"].getvalue().splitlines()],
+                         [{"id": 1, "name": "Rex"}, {"id": 12, "name": "Misu, la gata"}])
+        with self.assertRaises(ValueError):
+            Renderer(self.COLUMNS, "xml")
+
+    def test_pager_fetches_only_shown_pages(self):
+        rows = [(i, f"Mascota {i}") for i in range(100)]
+        fetch = mock.Mock(side_effect=lambda offset, limit: rows[offset:offset + limit])
+        output = io.StringIO()
+        with mock.patch("builtins.input", side_effect=["", "q"]):
+            shown = Renderer(self.COLUMNS, "jsonl", stream=output).page(fetch, page_size=10)
+        self.assertEqual(shown, 20)
+        self.assertEqual([call.args for call in fetch.call_args_list], [(0, 11), (10, 11)])
+        self.assertEqual(len(output.getvalue().splitlines()), 20)
+
+    def test_list_command_exports_csv(self):
+        import main
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = os.path.join(tmpdir, "clinica.db")
+            with Database(db_path) as db:
+                seed_clinic(db, owners=30, pets_per_owner=2, consultations_per_pet=0)
+            with mock.patch("sys.stdout", new_callable=io.StringIO) as stdout:
+                main.main(["list", "--db", db_path, "--format", "csv"])
+        rows = list(csv.DictReader(io.StringIO(stdout.getvalue())))
+        self.assertEqual(len(rows), 60)
+        self.assertEqual(rows[0]["id"], "1")
+
+
 if __name__ == "__main__":
     unittest.main(verbosity=2)
 """